@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import discord
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_KEYS = 50000
+BULK_DELETE_DELAY_SECONDS = 1.0
+BULK_DELETE_LIMIT = 100
+# Shorter normalized texts ("lol", "gm", "+1") are repeated legitimately all the time.
+MIN_FINGERPRINT_LENGTH = 12
+
+_MENTION = re.compile(r"<(?:@[!&]?|#)\d+>")
+_NON_LETTERS = re.compile(r"[\W\d_]+")
+_REPEATS = re.compile(r"(.)\1+")
+
+
+class _SpamWindow:
+    """Fixed-size ring buffer of monotonic message times and ids for one key."""
+
+    __slots__ = ("stamps", "message_ids", "head", "size", "flagged", "last_seen")
+
+    def __init__(self, capacity: int):
+        self.stamps: List[float] = [0.0] * capacity
+        self.message_ids: List[Any] = [None] * capacity
+        self.head = 0
+        self.size = 0
+        self.flagged = False
+        self.last_seen = 0.0
+
+    def push(self, now: float, timeframe: float, message_id: Any) -> bool:
+        capacity = len(self.stamps)
+        cutoff = now - timeframe
+        while self.size and self.stamps[self.head] <= cutoff:
+            self.head = (self.head + 1) % capacity
+            self.size -= 1
+
+        if self.size < capacity:
+            slot = (self.head + self.size) % capacity
+            self.size += 1
+        else:
+            slot = self.head
+            self.head = (self.head + 1) % capacity
+        self.stamps[slot] = now
+        self.message_ids[slot] = message_id
+        self.last_seen = now
+
+        if self.size < capacity:
+            self.flagged = False
+            return False
+        if self.flagged:
+            return False
+        self.flagged = True
+        return True
+
+    def ids(self) -> List[Any]:
+        capacity = len(self.stamps)
+        slots = (self.message_ids[(self.head + offset) % capacity] for offset in range(self.size))
+        return [message_id for message_id in slots if message_id is not None]
+
+
+def content_fingerprint(content: str) -> Optional[int]:
+    """64-bit hash of ``content`` with the usual copy-paste variations removed, or None for short texts.
+
+    Mentions, digits, punctuation, whitespace and case are ignored and runs of
+    one letter are collapsed, so ``Claim FREE nitro!!! <@1> 123`` and
+    ``claim free   niiitro <@2> 456`` produce the same fingerprint.
+    """
+    normalized = _REPEATS.sub(r"\1", _NON_LETTERS.sub("", _MENTION.sub("", content).casefold()))
+    if len(normalized) < MIN_FINGERPRINT_LENGTH:
+        return None
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class SpamTracker:
+    """Sliding-window message counter per (guild, channel, user) key.
+
+    Each key holds at most ``threshold + 1`` timestamps, so appending and expiring
+    are O(1). Keys are kept in least-recently-seen order: idle keys are dropped by
+    ``sweep()`` and the oldest key is evicted once ``max_keys`` is reached.
+    """
+
+    def __init__(
+        self,
+        threshold: int,
+        timeframe: float,
+        max_keys: int = DEFAULT_MAX_KEYS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.threshold = threshold
+        self.timeframe = timeframe
+        self.max_keys = max(int(max_keys), 1)
+        self.evicted_keys = 0
+        self._capacity = threshold + 1
+        self._clock = clock
+        self._windows: "OrderedDict[Hashable, _SpamWindow]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    @property
+    def tracked_keys(self) -> int:
+        return len(self._windows)
+
+    def hit(self, key: Hashable, message_id: Any = None, now: Optional[float] = None) -> bool:
+        """Record one message and return True when the key first crosses the threshold.
+
+        ``message_id`` is kept as given, so a caller that needs more than the id
+        can pass a tuple, such as ``(channel, message_id, author)``.
+        """
+        now = self._clock() if now is None else now
+        window = self._windows.get(key)
+        if window is None:
+            while len(self._windows) >= self.max_keys:
+                self._windows.popitem(last=False)
+                self.evicted_keys += 1
+            window = _SpamWindow(self._capacity)
+            self._windows[key] = window
+        else:
+            self._windows.move_to_end(key)
+        return window.push(now, self.timeframe, message_id)
+
+    def count(self, key: Hashable) -> int:
+        """Messages inside the key's window as of its last hit, at most ``threshold + 1``."""
+        window = self._windows.get(key)
+        return window.size if window else 0
+
+    def message_ids(self, key: Hashable) -> List[Any]:
+        """Ids of the messages currently inside the key's window, oldest first."""
+        window = self._windows.get(key)
+        return window.ids() if window else []
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop keys with no message inside the window. Returns how many were removed."""
+        now = self._clock() if now is None else now
+        cutoff = now - self.timeframe
+        removed = 0
+        while self._windows:
+            key, window = next(iter(self._windows.items()))
+            if window.last_seen > cutoff:
+                break
+            del self._windows[key]
+            removed += 1
+        return removed
+
+
+class BulkDeleter:
+    """Coalesces message deletions per channel into bulk-delete requests.
+
+    Ids queued for the same channel within ``delay`` seconds are deleted together,
+    so several offenders spamming one channel cost one request instead of one
+    history scan each.
+    """
+
+    def __init__(self, delay: float = BULK_DELETE_DELAY_SECONDS):
+        self.delay = delay
+        self.requests = 0
+        self.deleted = 0
+        self._pending: Dict[int, Tuple[discord.abc.Messageable, Set[int]]] = {}
+        self._timers: Dict[int, asyncio.Task] = {}
+
+    @property
+    def pending_channels(self) -> int:
+        return len(self._pending)
+
+    def queue(self, channel: discord.abc.Messageable, message_ids: Iterable[int]) -> None:
+        pending = self._pending.get(channel.id)
+        if pending is None:
+            self._pending[channel.id] = (channel, set(message_ids))
+            self._timers[channel.id] = asyncio.create_task(self._flush_later(channel.id))
+        else:
+            pending[1].update(message_ids)
+
+    async def _flush_later(self, channel_id: int) -> None:
+        await asyncio.sleep(self.delay)
+        self._timers.pop(channel_id, None)
+        await self.flush(channel_id)
+
+    async def flush(self, channel_id: int) -> None:
+        channel, message_ids = self._pending.pop(channel_id, (None, None))
+        if not message_ids:
+            return
+
+        ordered = sorted(message_ids)
+        for start in range(0, len(ordered), BULK_DELETE_LIMIT):
+            chunk = [discord.Object(id=message_id) for message_id in ordered[start : start + BULK_DELETE_LIMIT]]
+            try:
+                await channel.delete_messages(chunk, reason="Anti-spam cleanup")
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as error:
+                logger.warning("Bulk delete of %s messages in channel %s failed: %s", len(chunk), channel_id, error)
+                continue
+            self.requests += 1
+            self.deleted += len(chunk)
+
+    async def flush_all(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for channel_id in list(self._pending):
+            await self.flush(channel_id)
@@ -0,0 +1,117 @@
+import ast
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+
+logger = logging.getLogger(__name__)
+
+
+def _call_name(node: ast.AST) -> str:
+    if isinstance(node, ast.Attribute):
+        return f"{_call_name(node.value)}.{node.attr}"
+    if isinstance(node, ast.Name):
+        return node.id
+    return ""
+
+
+def _keyword(call: ast.Call, name: str):
+    for keyword in call.keywords:
+        if keyword.arg == name and isinstance(keyword.value, ast.Constant):
+            return keyword.value.value
+    return None
+
+
+def discover_app_commands(path: Path) -> List[str]:
+    """Top-level slash command and group names declared in a cog file, found without importing it.
+
+    Recognises ``@app_commands.command(name=...)`` methods and
+    ``app_commands.Group(name=...)`` class attributes; a command without an
+    explicit name falls back to its function name.
+    """
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    names: List[str] = []
+    for cls in (node for node in tree.body if isinstance(node, ast.ClassDef)):
+        for node in cls.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                for decorator in node.decorator_list:
+                    if isinstance(decorator, ast.Call) and _call_name(decorator.func) == "app_commands.command":
+                        names.append(_keyword(decorator, "name") or node.name)
+            elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+                target = node.targets[0]
+                is_group = _call_name(node.value.func) == "app_commands.Group"
+                is_subgroup = any(keyword.arg == "parent" for keyword in node.value.keywords)
+                if is_group and not is_subgroup and isinstance(target, ast.Name):
+                    names.append(_keyword(node.value, "name") or target.id)
+    return names
+
+
+class LazyCommandTree(app_commands.CommandTree):
+    """Command tree that imports a lazy cog the first time one of its commands is invoked.
+
+    discord.py runs ``interaction_check`` before it resolves the command, so
+    loading the extension here makes the command available for the same
+    interaction.
+    """
+
+    def __init__(self, client: discord.Client, **kwargs):
+        super().__init__(client, **kwargs)
+        self.lazy_extensions: Dict[str, str] = {}
+        self._lazy_lock = asyncio.Lock()
+
+    def register_lazy(self, extension: str, command_names: Iterable[str]) -> None:
+        for name in command_names:
+            self.lazy_extensions[name] = extension
+
+    async def load_lazy(self, extension: str) -> None:
+        async with self._lazy_lock:
+            if extension in self.client.extensions:
+                return
+            started = time.perf_counter()
+            await self.client.load_extension(extension)
+            logger.info("Lazily loaded %s in %.1f ms.", extension, (time.perf_counter() - started) * 1000)
+            self.lazy_extensions = {
+                name: pending for name, pending in self.lazy_extensions.items() if pending != extension
+            }
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Start of the command latency measured by the completion and error hooks.
+        interaction.extras.setdefault("started_at", time.perf_counter())
+        # Named so the loop watchdog can attribute a stall to the command.
+        task = asyncio.current_task()
+        if task is not None and interaction.type is discord.InteractionType.application_command:
+            task.set_name(f"command:{(interaction.data or {}).get('name')}")
+        if self.lazy_extensions and interaction.type in (
+            discord.InteractionType.application_command,
+            discord.InteractionType.autocomplete,
+        ):
+            extension = self.lazy_extensions.get((interaction.data or {}).get("name"))
+            if extension is not None:
+                try:
+                    await self.load_lazy(extension)
+                except Exception:
+                    logger.exception("Failed to lazily load cog %s.", extension)
+        return True
+
+
+async def load_extensions(bot: commands.Bot, extensions: Iterable[str]) -> Dict[str, float]:
+    """Load extensions concurrently. Returns the load time in seconds of each one that succeeded."""
+    timings: Dict[str, float] = {}
+
+    async def load(extension: str) -> None:
+        started = time.perf_counter()
+        try:
+            await bot.load_extension(extension)
+        except Exception:
+            logger.exception("Failed to load cog %s.", extension)
+            return
+        timings[extension] = time.perf_counter() - started
+
+    await asyncio.gather(*(load(extension) for extension in extensions))
+    return timings
@@ -8,6 +8,8 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 
+from guild_config import ChatGuildConfig, ChatPolicy
+
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,15 @@ DEFAULT_PERSONA = (
     "You can access real-time information using the 'google_search' tool for current events or specific data. "
     "Keep your answers concise and engaging."
 )
+DEFAULT_GUILD_CONFIG = ChatGuildConfig(openai_key=None, persona=None)
+DEFAULT_POLICY = ChatPolicy(
+    enabled=True,
+    cooldown_seconds=8,
+    daily_usage_limit=None,
+    allowed_channel_ids=(),
+    blocked_channel_ids=(),
+    allowed_role_ids=(),
+)
 
 
 class Chat(commands.Cog):
@@ -33,11 +44,21 @@ class Chat(commands.Cog):
         self.chat_cooldowns: Dict[Tuple[int, int], discord.utils.utcnow] = {}
         self.conversation_last_used: Dict[Tuple[Any, ...], discord.utils.utcnow] = {}
         self.load_config()
-        self.bot.loop.create_task(self.setup_database())
+        self.bot.guild_config.register("chat_config", self._load_guild_config)
+        self.bot.guild_config.register("chat_policy", self._load_policy)
         self._prune_cooldowns.start()
 
     def cog_unload(self):
         self._prune_cooldowns.cancel()
+        self.bot.guild_config.unregister("chat_config")
+        self.bot.guild_config.unregister("chat_policy")
+
+    def memory_stats(self) -> Dict[str, Tuple[int, Any]]:
+        return {
+            "conversations": (len(self.conversations), self.conversations),
+            "chat_cooldowns": (len(self.chat_cooldowns), self.chat_cooldowns),
+            "conversation_last_used": (len(self.conversation_last_used), self.conversation_last_used),
+        }
 
     def load_config(self):
         config = getattr(self.bot, "config", {})
@@ -57,50 +78,6 @@ class Chat(commands.Cog):
         for key in expired:
             del self.chat_cooldowns[key]
 
-    async def setup_database(self):
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS guild_configs (
-                    guild_id INTEGER PRIMARY KEY,
-                    openai_key TEXT,
-                    persona TEXT
-                )
-                """
-            )
-            await cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS chat_policies (
-                    guild_id INTEGER PRIMARY KEY,
-                    enabled INTEGER NOT NULL DEFAULT 1,
-                    cooldown_seconds INTEGER NOT NULL DEFAULT 8,
-                    daily_usage_limit INTEGER,
-                    allowed_channel_ids TEXT,
-                    blocked_channel_ids TEXT,
-                    allowed_role_ids TEXT
-                )
-                """
-            )
-            await cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS chat_usage (
-                    guild_id INTEGER NOT NULL,
-                    usage_date TEXT NOT NULL,
-                    usage_count INTEGER NOT NULL DEFAULT 0,
-                    PRIMARY KEY (guild_id, usage_date)
-                )
-                """
-            )
-
-            columns = await self._table_columns(cursor, "guild_configs")
-            if "persona" not in columns:
-                await cursor.execute("ALTER TABLE guild_configs ADD COLUMN persona TEXT")
-        await self.bot.db.commit()
-
-    async def _table_columns(self, cursor, table_name: str) -> List[str]:
-        await cursor.execute(f"PRAGMA table_info({table_name})")
-        return [row[1] for row in await cursor.fetchall()]
-
     @property
     def session(self):
         return self.bot.http_session
@@ -123,38 +100,41 @@ class Chat(commands.Cog):
             return []
         return [int(item) for item in values if str(item).isdigit()]
 
-    async def get_guild_config(self, guild_id: Optional[int]):
+    async def get_guild_config(self, guild_id: Optional[int]) -> ChatGuildConfig:
         if not guild_id:
-            return None, None
-        async with self.bot.db.cursor() as cursor:
+            return DEFAULT_GUILD_CONFIG
+        return await self.bot.guild_config.get("chat_config", guild_id)
+
+    async def _load_guild_config(self, guild_id: int) -> ChatGuildConfig:
+        async with self.bot.storage.read() as db, db.cursor() as cursor:
             await cursor.execute("SELECT openai_key, persona FROM guild_configs WHERE guild_id = ?", (guild_id,))
-            return await cursor.fetchone()
+            row = await cursor.fetchone()
+        if row is None:
+            return DEFAULT_GUILD_CONFIG
+        return ChatGuildConfig(openai_key=row[0], persona=row[1])
+
+    async def _update_guild_config(self, guild_id: int, field: str, value: Optional[str]):
+        try:
+            async with self.bot.storage.write().cursor() as cursor:
+                await cursor.execute("INSERT OR IGNORE INTO guild_configs (guild_id) VALUES (?)", (guild_id,))
+                await cursor.execute(f"UPDATE guild_configs SET {field} = ? WHERE guild_id = ?", (value, guild_id))
+            await self.bot.storage.commit()
+        finally:
+            self.bot.guild_config.invalidate("chat_config", guild_id)
 
     async def set_guild_key(self, guild_id: int, key: Optional[str] = None):
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute("INSERT OR IGNORE INTO guild_configs (guild_id) VALUES (?)", (guild_id,))
-            await cursor.execute("UPDATE guild_configs SET openai_key = ? WHERE guild_id = ?", (key, guild_id))
-        await self.bot.db.commit()
+        await self._update_guild_config(guild_id, "openai_key", key)
 
     async def set_guild_persona(self, guild_id: int, persona: Optional[str] = None):
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute("INSERT OR IGNORE INTO guild_configs (guild_id) VALUES (?)", (guild_id,))
-            await cursor.execute("UPDATE guild_configs SET persona = ? WHERE guild_id = ?", (persona, guild_id))
-        await self.bot.db.commit()
-
-    async def get_policy(self, guild_id: Optional[int]) -> Dict[str, Any]:
-        default_policy = {
-            "enabled": True,
-            "cooldown_seconds": 8,
-            "daily_usage_limit": None,
-            "allowed_channel_ids": [],
-            "blocked_channel_ids": [],
-            "allowed_role_ids": [],
-        }
+        await self._update_guild_config(guild_id, "persona", persona)
+
+    async def get_policy(self, guild_id: Optional[int]) -> ChatPolicy:
         if not guild_id:
-            return default_policy
+            return DEFAULT_POLICY
+        return await self.bot.guild_config.get("chat_policy", guild_id)
 
-        async with self.bot.db.cursor() as cursor:
+    async def _load_policy(self, guild_id: int) -> ChatPolicy:
+        async with self.bot.storage.read() as db, db.cursor() as cursor:
             await cursor.execute(
                 """
                 SELECT enabled, cooldown_seconds, daily_usage_limit, allowed_channel_ids,
@@ -167,30 +147,31 @@ class Chat(commands.Cog):
             row = await cursor.fetchone()
 
         if row is None:
-            return default_policy
+            return DEFAULT_POLICY
 
         enabled, cooldown_seconds, daily_usage_limit, allowed_channel_ids, blocked_channel_ids, allowed_role_ids = row
-        return {
-            "enabled": bool(enabled),
-            "cooldown_seconds": (
-                default_policy["cooldown_seconds"] if cooldown_seconds is None else int(cooldown_seconds)
-            ),
-            "daily_usage_limit": daily_usage_limit,
-            "allowed_channel_ids": self._deserialize_ids(allowed_channel_ids),
-            "blocked_channel_ids": self._deserialize_ids(blocked_channel_ids),
-            "allowed_role_ids": self._deserialize_ids(allowed_role_ids),
-        }
+        return ChatPolicy(
+            enabled=bool(enabled),
+            cooldown_seconds=DEFAULT_POLICY.cooldown_seconds if cooldown_seconds is None else int(cooldown_seconds),
+            daily_usage_limit=daily_usage_limit,
+            allowed_channel_ids=tuple(self._deserialize_ids(allowed_channel_ids)),
+            blocked_channel_ids=tuple(self._deserialize_ids(blocked_channel_ids)),
+            allowed_role_ids=tuple(self._deserialize_ids(allowed_role_ids)),
+        )
 
     async def update_policy(self, guild_id: int, **fields):
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute("INSERT OR IGNORE INTO chat_policies (guild_id) VALUES (?)", (guild_id,))
-            for field, value in fields.items():
-                await cursor.execute(f"UPDATE chat_policies SET {field} = ? WHERE guild_id = ?", (value, guild_id))
-        await self.bot.db.commit()
+        try:
+            async with self.bot.storage.write().cursor() as cursor:
+                await cursor.execute("INSERT OR IGNORE INTO chat_policies (guild_id) VALUES (?)", (guild_id,))
+                for field, value in fields.items():
+                    await cursor.execute(f"UPDATE chat_policies SET {field} = ? WHERE guild_id = ?", (value, guild_id))
+            await self.bot.storage.commit()
+        finally:
+            self.bot.guild_config.invalidate("chat_policy", guild_id)
 
     async def mutate_id_list(self, guild_id: int, field: str, value: int, add: bool):
         policy = await self.get_policy(guild_id)
-        current = set(policy[field])
+        current = set(getattr(policy, field))
         if add:
             current.add(value)
         else:
@@ -200,7 +181,7 @@ class Chat(commands.Cog):
 
     async def get_usage_count(self, guild_id: int) -> int:
         usage_date = discord.utils.utcnow().date().isoformat()
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 "SELECT usage_count FROM chat_usage WHERE guild_id = ? AND usage_date = ?",
                 (guild_id, usage_date),
@@ -210,7 +191,7 @@ class Chat(commands.Cog):
 
     async def increment_usage(self, guild_id: int):
         usage_date = discord.utils.utcnow().date().isoformat()
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 """
                 INSERT INTO chat_usage (guild_id, usage_date, usage_count)
@@ -220,7 +201,7 @@ class Chat(commands.Cog):
                 """,
                 (guild_id, usage_date),
             )
-        await self.bot.db.commit()
+        await self.bot.storage.commit()
 
     async def validate_api_key(self, api_key: str) -> Tuple[bool, str]:
         headers = {"Authorization": f"Bearer {api_key}"}
@@ -238,24 +219,24 @@ class Chat(commands.Cog):
         except Exception as error:
             return False, str(error)
 
-    async def enforce_policy(self, interaction: discord.Interaction, policy: Dict[str, Any]) -> Optional[str]:
+    async def enforce_policy(self, interaction: discord.Interaction, policy: ChatPolicy) -> Optional[str]:
         if not interaction.guild_id:
             return None
-        if not policy["enabled"]:
+        if not policy.enabled:
             return "AI chat is disabled in this server."
-        if interaction.channel_id in policy["blocked_channel_ids"]:
+        if interaction.channel_id in policy.blocked_channel_ids:
             return "AI chat is disabled in this channel."
-        if policy["allowed_channel_ids"] and interaction.channel_id not in policy["allowed_channel_ids"]:
+        if policy.allowed_channel_ids and interaction.channel_id not in policy.allowed_channel_ids:
             return "AI chat is only allowed in specific channels configured by the server admins."
-        if policy["allowed_role_ids"]:
+        if policy.allowed_role_ids:
             member = interaction.user if isinstance(interaction.user, discord.Member) else None
             if member is None:
                 return "AI chat is restricted to specific roles in this server."
             member_role_ids = {role.id for role in member.roles}
-            if not member_role_ids.intersection(policy["allowed_role_ids"]):
+            if not member_role_ids.intersection(policy.allowed_role_ids):
                 return "You do not have one of the roles required to use AI chat here."
 
-        cooldown_seconds = max(int(policy["cooldown_seconds"]), 0)
+        cooldown_seconds = max(int(policy.cooldown_seconds), 0)
         if cooldown_seconds > 0:
             cooldown_key = (interaction.guild_id, interaction.user.id)
             now = discord.utils.utcnow()
@@ -264,7 +245,7 @@ class Chat(commands.Cog):
                 remaining = cooldown_seconds - int((now - last_used).total_seconds())
                 return f"You're on cooldown for this server. Try again in {remaining}s."
 
-        usage_limit = policy["daily_usage_limit"]
+        usage_limit = policy.daily_usage_limit
         if usage_limit:
             usage_count = await self.get_usage_count(interaction.guild_id)
             if usage_count >= usage_limit:
@@ -478,8 +459,8 @@ class Chat(commands.Cog):
     @app_commands.checks.has_permissions(manage_guild=True)
     async def view_config(self, interaction: discord.Interaction):
         self._prune_runtime_state()
-        guild_config = await self.get_guild_config(interaction.guild.id) or (None, None)
-        guild_key, guild_persona = guild_config
+        guild_config = await self.get_guild_config(interaction.guild.id)
+        guild_key, guild_persona = guild_config.openai_key, guild_config.persona
         policy = await self.get_policy(interaction.guild.id)
         usage_count = await self.get_usage_count(interaction.guild.id)
 
@@ -503,26 +484,26 @@ class Chat(commands.Cog):
             value=self._truncate_field_value(", ".join(f"`{model}`" for model in self.allowed_models)),
             inline=False,
         )
-        embed.add_field(name="Chat Enabled", value="Yes" if policy["enabled"] else "No", inline=True)
-        embed.add_field(name="Cooldown", value=f"{policy['cooldown_seconds']}s", inline=True)
+        embed.add_field(name="Chat Enabled", value="Yes" if policy.enabled else "No", inline=True)
+        embed.add_field(name="Cooldown", value=f"{policy.cooldown_seconds}s", inline=True)
         embed.add_field(
             name="Daily Usage Cap",
-            value="Not set" if policy["daily_usage_limit"] is None else f"{usage_count}/{policy['daily_usage_limit']}",
+            value="Not set" if policy.daily_usage_limit is None else f"{usage_count}/{policy.daily_usage_limit}",
             inline=True,
         )
         embed.add_field(
             name="Allowed Channels",
-            value=self._truncate_field_value(self._channel_labels(interaction.guild, policy["allowed_channel_ids"])),
+            value=self._truncate_field_value(self._channel_labels(interaction.guild, policy.allowed_channel_ids)),
             inline=False,
         )
         embed.add_field(
             name="Blocked Channels",
-            value=self._truncate_field_value(self._channel_labels(interaction.guild, policy["blocked_channel_ids"])),
+            value=self._truncate_field_value(self._channel_labels(interaction.guild, policy.blocked_channel_ids)),
             inline=False,
         )
         embed.add_field(
             name="Allowed Roles",
-            value=self._truncate_field_value(self._role_labels(interaction.guild, policy["allowed_role_ids"])),
+            value=self._truncate_field_value(self._role_labels(interaction.guild, policy.allowed_role_ids)),
             inline=False,
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -530,9 +511,8 @@ class Chat(commands.Cog):
     @chat_config.command(name="test", description="Validate the effective API key for this server.")
     @app_commands.checks.has_permissions(manage_guild=True)
     async def test_config(self, interaction: discord.Interaction):
-        guild_config = await self.get_guild_config(interaction.guild.id) or (None, None)
-        guild_key, _ = guild_config
-        api_key = guild_key or self.default_api_key
+        guild_config = await self.get_guild_config(interaction.guild.id)
+        api_key = guild_config.openai_key or self.default_api_key
         if not api_key:
             await interaction.response.send_message("No API key is configured to test.", ephemeral=True)
             return
@@ -585,9 +565,9 @@ class Chat(commands.Cog):
                 await interaction.response.send_message(policy_error, ephemeral=True)
                 return
 
-        guild_config = await self.get_guild_config(guild_id) or (None, None)
-        api_key, persona = guild_config
-        api_key = api_key or self.default_api_key
+        guild_config = await self.get_guild_config(guild_id)
+        api_key = guild_config.openai_key or self.default_api_key
+        persona = guild_config.persona
         if not api_key:
             await interaction.response.send_message(
                 "AI chat is not configured. An admin must set an API key.",
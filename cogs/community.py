@@ -1,11 +1,13 @@
 import string
 from datetime import timedelta
-from typing import Dict, Optional
+from typing import Optional
 
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 
+from guild_config import CommunitySettings
+
 
 DEFAULT_WELCOME_MESSAGE = "Welcome to {guild}, {member.mention}!"
 DEFAULT_GOODBYE_MESSAGE = "{member} left {guild}."
@@ -31,61 +33,18 @@ def parse_duration(value: str) -> Optional[int]:
 class Community(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.bot.guild_config.register("community", self._load_settings)
         self.schedule_loop.start()
 
     def cog_unload(self):
         self.schedule_loop.cancel()
+        self.bot.guild_config.unregister("community")
 
-    async def setup_database(self):
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS guild_settings (
-                    guild_id INTEGER PRIMARY KEY,
-                    welcome_channel_id INTEGER,
-                    goodbye_channel_id INTEGER,
-                    announcement_channel_id INTEGER,
-                    modlog_channel_id INTEGER,
-                    welcome_message TEXT,
-                    goodbye_message TEXT
-                )
-                """
-            )
-            await cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS scheduled_announcements (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER NOT NULL,
-                    channel_id INTEGER NOT NULL,
-                    author_id INTEGER NOT NULL,
-                    message TEXT NOT NULL,
-                    send_at TEXT NOT NULL,
-                    interval_seconds INTEGER
-                )
-                """
-            )
-            await cursor.execute("PRAGMA table_info(scheduled_announcements)")
-            announcement_columns = [row[1] for row in await cursor.fetchall()]
-            if "delivery_failures" not in announcement_columns:
-                await cursor.execute(
-                    "ALTER TABLE scheduled_announcements ADD COLUMN delivery_failures INTEGER NOT NULL DEFAULT 0"
-                )
-            if "disabled" not in announcement_columns:
-                await cursor.execute(
-                    "ALTER TABLE scheduled_announcements ADD COLUMN disabled INTEGER NOT NULL DEFAULT 0"
-                )
-            if "last_error" not in announcement_columns:
-                await cursor.execute("ALTER TABLE scheduled_announcements ADD COLUMN last_error TEXT")
-            await cursor.execute(
-                "CREATE INDEX IF NOT EXISTS idx_scheduled_announcements_due ON scheduled_announcements(disabled, send_at)"
-            )
-            await cursor.execute(
-                "CREATE INDEX IF NOT EXISTS idx_scheduled_announcements_guild_send_at ON scheduled_announcements(guild_id, send_at)"
-            )
-        await self.bot.db.commit()
+    async def get_settings(self, guild_id: int) -> CommunitySettings:
+        return await self.bot.guild_config.get("community", guild_id)
 
-    async def get_settings(self, guild_id: int) -> Dict[str, Optional[int]]:
-        async with self.bot.db.cursor() as cursor:
+    async def _load_settings(self, guild_id: int) -> CommunitySettings:
+        async with self.bot.storage.read() as db, db.cursor() as cursor:
             await cursor.execute(
                 """
                 SELECT guild_id, welcome_channel_id, goodbye_channel_id, announcement_channel_id,
@@ -98,32 +57,25 @@ class Community(commands.Cog):
             row = await cursor.fetchone()
 
         if row is None:
-            return {
-                "guild_id": guild_id,
-                "welcome_channel_id": None,
-                "goodbye_channel_id": None,
-                "announcement_channel_id": None,
-                "modlog_channel_id": None,
-                "welcome_message": None,
-                "goodbye_message": None,
-            }
-
-        keys = [
-            "guild_id",
-            "welcome_channel_id",
-            "goodbye_channel_id",
-            "announcement_channel_id",
-            "modlog_channel_id",
-            "welcome_message",
-            "goodbye_message",
-        ]
-        return dict(zip(keys, row))
+            return CommunitySettings(
+                guild_id=guild_id,
+                welcome_channel_id=None,
+                goodbye_channel_id=None,
+                announcement_channel_id=None,
+                modlog_channel_id=None,
+                welcome_message=None,
+                goodbye_message=None,
+            )
+        return CommunitySettings(**dict(zip(CommunitySettings.__slots__, row)))
 
     async def update_setting(self, guild_id: int, field: str, value):
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute("INSERT OR IGNORE INTO guild_settings (guild_id) VALUES (?)", (guild_id,))
-            await cursor.execute(f"UPDATE guild_settings SET {field} = ? WHERE guild_id = ?", (value, guild_id))
-        await self.bot.db.commit()
+        try:
+            async with self.bot.storage.write().cursor() as cursor:
+                await cursor.execute("INSERT OR IGNORE INTO guild_settings (guild_id) VALUES (?)", (guild_id,))
+                await cursor.execute(f"UPDATE guild_settings SET {field} = ? WHERE guild_id = ?", (value, guild_id))
+            await self.bot.storage.commit()
+        finally:
+            self.bot.guild_config.invalidate("community", guild_id)
 
     def validate_template(self, template: str) -> Optional[str]:
         formatter = string.Formatter()
@@ -186,7 +138,7 @@ class Community(commands.Cog):
 
     async def _log_to_modlog(self, guild: discord.Guild, title: str, description: str, color: discord.Color):
         settings = await self.get_settings(guild.id)
-        channel_id = settings["modlog_channel_id"]
+        channel_id = settings.modlog_channel_id
         if channel_id is None:
             return
 
@@ -205,7 +157,7 @@ class Community(commands.Cog):
         send_at,
         interval_seconds: Optional[int] = None,
     ) -> int:
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 """
                 INSERT INTO scheduled_announcements (guild_id, channel_id, author_id, message, send_at, interval_seconds)
@@ -214,7 +166,7 @@ class Community(commands.Cog):
                 (guild_id, channel_id, author_id, message, send_at.isoformat(), interval_seconds),
             )
             announcement_id = cursor.lastrowid
-        await self.bot.db.commit()
+        await self.bot.storage.commit()
         return announcement_id
 
     server_config = app_commands.Group(
@@ -233,22 +185,22 @@ class Community(commands.Cog):
     async def view(self, interaction: discord.Interaction):
         settings = await self.get_settings(interaction.guild_id)
         embed = discord.Embed(title=f"Server Config: {interaction.guild.name}", color=discord.Color.green())
-        embed.add_field(name="Welcome Channel", value=self._channel_value(settings["welcome_channel_id"]), inline=False)
-        embed.add_field(name="Goodbye Channel", value=self._channel_value(settings["goodbye_channel_id"]), inline=False)
+        embed.add_field(name="Welcome Channel", value=self._channel_value(settings.welcome_channel_id), inline=False)
+        embed.add_field(name="Goodbye Channel", value=self._channel_value(settings.goodbye_channel_id), inline=False)
         embed.add_field(
             name="Announcement Channel",
-            value=self._channel_value(settings["announcement_channel_id"]),
+            value=self._channel_value(settings.announcement_channel_id),
             inline=False,
         )
-        embed.add_field(name="Mod Log Channel", value=self._channel_value(settings["modlog_channel_id"]), inline=False)
+        embed.add_field(name="Mod Log Channel", value=self._channel_value(settings.modlog_channel_id), inline=False)
         embed.add_field(
             name="Welcome Message",
-            value=settings["welcome_message"] or DEFAULT_WELCOME_MESSAGE,
+            value=settings.welcome_message or DEFAULT_WELCOME_MESSAGE,
             inline=False,
         )
         embed.add_field(
             name="Goodbye Message",
-            value=settings["goodbye_message"] or DEFAULT_GOODBYE_MESSAGE,
+            value=settings.goodbye_message or DEFAULT_GOODBYE_MESSAGE,
             inline=False,
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -308,7 +260,7 @@ class Community(commands.Cog):
     async def preview_welcome(self, interaction: discord.Interaction):
         settings = await self.get_settings(interaction.guild_id)
         content, error = self.try_render_template(
-            settings["welcome_message"], interaction.user, interaction.guild, DEFAULT_WELCOME_MESSAGE
+            settings.welcome_message, interaction.user, interaction.guild, DEFAULT_WELCOME_MESSAGE
         )
         if error:
             await interaction.response.send_message(
@@ -323,7 +275,7 @@ class Community(commands.Cog):
     async def preview_goodbye(self, interaction: discord.Interaction):
         settings = await self.get_settings(interaction.guild_id)
         content, error = self.try_render_template(
-            settings["goodbye_message"], interaction.user, interaction.guild, DEFAULT_GOODBYE_MESSAGE
+            settings.goodbye_message, interaction.user, interaction.guild, DEFAULT_GOODBYE_MESSAGE
         )
         if error:
             await interaction.response.send_message(
@@ -372,7 +324,7 @@ class Community(commands.Cog):
             return
 
         settings = await self.get_settings(interaction.guild_id)
-        target_channel_id = settings["announcement_channel_id"] or interaction.channel_id
+        target_channel_id = settings.announcement_channel_id or interaction.channel_id
         channel = await self._resolve_channel(target_channel_id)
         if channel is None:
             await interaction.response.send_message(
@@ -436,7 +388,7 @@ class Community(commands.Cog):
             return
 
         settings = await self.get_settings(interaction.guild_id)
-        target_channel_id = channel.id if channel else settings["announcement_channel_id"] or interaction.channel_id
+        target_channel_id = channel.id if channel else settings.announcement_channel_id or interaction.channel_id
         target_channel = await self._resolve_channel(target_channel_id)
         if target_channel is None:
             await interaction.response.send_message("The target announcement channel is unavailable.", ephemeral=True)
@@ -461,7 +413,7 @@ class Community(commands.Cog):
     @announcements.command(name="list", description="List scheduled announcements for this server.")
     @app_commands.checks.has_permissions(manage_guild=True)
     async def list_scheduled(self, interaction: discord.Interaction):
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.read() as db, db.cursor() as cursor:
             await cursor.execute(
                 """
                 SELECT id, channel_id, send_at, interval_seconds, message, delivery_failures, disabled, last_error
@@ -494,7 +446,7 @@ class Community(commands.Cog):
     @app_commands.checks.has_permissions(manage_guild=True)
     @app_commands.describe(announcement_id="The announcement id from /announcements list.")
     async def diagnose_scheduled(self, interaction: discord.Interaction, announcement_id: int):
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 """
                 SELECT id, channel_id, author_id, message, send_at, interval_seconds,
@@ -530,13 +482,13 @@ class Community(commands.Cog):
     @announcements.command(name="cancel", description="Cancel a scheduled announcement.")
     @app_commands.checks.has_permissions(manage_guild=True)
     async def cancel_scheduled(self, interaction: discord.Interaction, announcement_id: int):
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 "DELETE FROM scheduled_announcements WHERE id = ? AND guild_id = ?",
                 (announcement_id, interaction.guild_id),
             )
             deleted = cursor.rowcount
-        await self.bot.db.commit()
+        await self.bot.storage.commit()
         if deleted:
             await interaction.response.send_message(f"Scheduled announcement `{announcement_id}` canceled.", ephemeral=True)
         else:
@@ -545,7 +497,7 @@ class Community(commands.Cog):
     @tasks.loop(seconds=SCHEDULE_POLL_SECONDS)
     async def schedule_loop(self):
         now = discord.utils.utcnow().isoformat()
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 """
                 SELECT id, guild_id, channel_id, author_id, message, send_at, interval_seconds, delivery_failures
@@ -580,7 +532,7 @@ class Community(commands.Cog):
             else:
                 failure_reason = "the configured announcement channel is unavailable"
 
-            async with self.bot.db.cursor() as cursor:
+            async with self.bot.storage.write().cursor() as cursor:
                 if delivered and interval_seconds:
                     next_time = discord.utils.parse_time(send_at)
                     while next_time <= discord.utils.utcnow():
@@ -623,20 +575,19 @@ class Community(commands.Cog):
                             """,
                             (retry_at.isoformat(), next_failures, failure_reason, announcement_id),
                         )
-            await self.bot.db.commit()
+            await self.bot.storage.commit()
 
     @schedule_loop.before_loop
     async def before_schedule_loop(self):
         await self.bot.wait_until_ready()
-        await self.setup_database()
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         settings = await self.get_settings(member.guild.id)
-        if settings["welcome_channel_id"]:
+        if settings.welcome_channel_id:
             try:
-                text = self.render_template(settings["welcome_message"], member, member.guild, DEFAULT_WELCOME_MESSAGE)
-                await self._send_to_channel(settings["welcome_channel_id"], content=text)
+                text = self.render_template(settings.welcome_message, member, member.guild, DEFAULT_WELCOME_MESSAGE)
+                await self._send_to_channel(settings.welcome_channel_id, content=text)
             except Exception:
                 await self._log_to_modlog(
                     member.guild,
@@ -655,10 +606,10 @@ class Community(commands.Cog):
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
         settings = await self.get_settings(member.guild.id)
-        if settings["goodbye_channel_id"]:
+        if settings.goodbye_channel_id:
             try:
-                text = self.render_template(settings["goodbye_message"], member, member.guild, DEFAULT_GOODBYE_MESSAGE)
-                await self._send_to_channel(settings["goodbye_channel_id"], content=text)
+                text = self.render_template(settings.goodbye_message, member, member.guild, DEFAULT_GOODBYE_MESSAGE)
+                await self._send_to_channel(settings.goodbye_channel_id, content=text)
             except Exception:
                 await self._log_to_modlog(
                     member.guild,
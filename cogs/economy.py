@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import random
+import sqlite3
 
 import discord
 from discord import app_commands
@@ -31,11 +32,43 @@ ROB_COOLDOWN = 1800  # 30 minutes
 SLOTS_MIN_BET = 10
 
 
+def _fetch_or_create_balance(connection: sqlite3.Connection, guild_id: int, user_id: int) -> int:
+    row = connection.execute(
+        "SELECT balance FROM users WHERE guild_id = ? AND user_id = ?",
+        (guild_id, user_id),
+    ).fetchone()
+    if row is None:
+        connection.execute(
+            "INSERT INTO users (guild_id, user_id, balance) VALUES (?, ?, ?)",
+            (guild_id, user_id, DEFAULT_BALANCE),
+        )
+        return DEFAULT_BALANCE
+    return row[0]
+
+
+def _transfer(connection: sqlite3.Connection, guild_id: int, sender_id: int, receiver_id: int, amount: int):
+    sender_balance = _fetch_or_create_balance(connection, guild_id, sender_id)
+    if sender_balance < amount:
+        raise ValueError("You do not have enough coins to make this transfer.")
+
+    receiver_balance = _fetch_or_create_balance(connection, guild_id, receiver_id)
+    connection.executemany(
+        "UPDATE users SET balance = ? WHERE guild_id = ? AND user_id = ?",
+        [
+            (sender_balance - amount, guild_id, sender_id),
+            (receiver_balance + amount, guild_id, receiver_id),
+        ],
+    )
+    return sender_balance - amount, receiver_balance + amount
+
+
 class Economy(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self._guild_locks: dict[int, asyncio.Lock] = {}
-        self.bot.loop.create_task(self.setup_database())
+
+    def memory_stats(self) -> dict[str, tuple[int, object]]:
+        return {"guild_locks": (len(self._guild_locks), self._guild_locks)}
 
     def _guild_lock(self, guild_id: int) -> asyncio.Lock:
         lock = self._guild_locks.get(guild_id)
@@ -44,57 +77,13 @@ class Economy(commands.Cog):
             self._guild_locks[guild_id] = lock
         return lock
 
-    async def setup_database(self):
-        columns = []
-        async with self.bot.db.execute("PRAGMA table_info(users)") as cursor:
-            columns = [row[1] for row in await cursor.fetchall()]
-
-        if columns and "guild_id" not in columns:
-            async with self.bot.db.cursor() as cursor:
-                await cursor.execute("ALTER TABLE users RENAME TO users_legacy")
-                await cursor.execute(
-                    """
-                    CREATE TABLE users (
-                        guild_id INTEGER NOT NULL,
-                        user_id INTEGER NOT NULL,
-                        balance INTEGER NOT NULL DEFAULT 100,
-                        PRIMARY KEY (guild_id, user_id)
-                    )
-                    """
-                )
-                await cursor.execute(
-                    """
-                    INSERT OR IGNORE INTO users (guild_id, user_id, balance)
-                    SELECT DISTINCT COALESCE(messages.guild_id, 0), legacy.user_id, legacy.balance
-                    FROM users_legacy AS legacy
-                    LEFT JOIN messages
-                        ON messages.user_id = legacy.user_id
-                       AND messages.guild_id IS NOT NULL
-                    """
-                )
-            logger.info("Migrated global economy balances to per-guild records.")
-        else:
-            async with self.bot.db.cursor() as cursor:
-                await cursor.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS users (
-                        guild_id INTEGER NOT NULL,
-                        user_id INTEGER NOT NULL,
-                        balance INTEGER NOT NULL DEFAULT 100,
-                        PRIMARY KEY (guild_id, user_id)
-                    )
-                    """
-                )
-
-        await self.bot.db.commit()
-
     def _get_guild_id(self, interaction: discord.Interaction) -> int:
         if interaction.guild_id is None:
             raise app_commands.CheckFailure("This command can only be used in a server.")
         return interaction.guild_id
 
     async def _get_or_create_user_unlocked(self, guild_id: int, user_id: int) -> int:
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 "SELECT balance FROM users WHERE guild_id = ? AND user_id = ?",
                 (guild_id, user_id),
@@ -105,7 +94,7 @@ class Economy(commands.Cog):
                     "INSERT INTO users (guild_id, user_id, balance) VALUES (?, ?, ?)",
                     (guild_id, user_id, DEFAULT_BALANCE),
                 )
-                await self.bot.db.commit()
+                await self.bot.storage.commit()
                 return DEFAULT_BALANCE
             return result[0]
 
@@ -120,42 +109,27 @@ class Economy(commands.Cog):
             if new_balance < 0:
                 raise ValueError("Balance cannot be negative.")
 
-            async with self.bot.db.cursor() as cursor:
+            async with self.bot.storage.write().cursor() as cursor:
                 await cursor.execute(
                     "UPDATE users SET balance = ? WHERE guild_id = ? AND user_id = ?",
                     (new_balance, guild_id, user_id),
                 )
-            await self.bot.db.commit()
+            await self.bot.storage.commit()
             return new_balance
 
     async def transfer_balance(self, guild_id: int, sender_id: int, receiver_id: int, amount: int) -> tuple[int, int]:
         async with self._guild_lock(guild_id):
-            sender_balance = await self._get_or_create_user_unlocked(guild_id, sender_id)
-            if sender_balance < amount:
-                raise ValueError("You do not have enough coins to make this transfer.")
-
-            receiver_balance = await self._get_or_create_user_unlocked(guild_id, receiver_id)
-            async with self.bot.db.cursor() as cursor:
-                await cursor.execute(
-                    "UPDATE users SET balance = ? WHERE guild_id = ? AND user_id = ?",
-                    (sender_balance - amount, guild_id, sender_id),
-                )
-                await cursor.execute(
-                    "UPDATE users SET balance = ? WHERE guild_id = ? AND user_id = ?",
-                    (receiver_balance + amount, guild_id, receiver_id),
-                )
-            await self.bot.db.commit()
-            return sender_balance - amount, receiver_balance + amount
+            return await self.bot.storage.transaction(_transfer, guild_id, sender_id, receiver_id, amount)
 
     async def set_balance(self, guild_id: int, user_id: int, amount: int) -> int:
         async with self._guild_lock(guild_id):
             await self._get_or_create_user_unlocked(guild_id, user_id)
-            async with self.bot.db.cursor() as cursor:
+            async with self.bot.storage.write().cursor() as cursor:
                 await cursor.execute(
                     "UPDATE users SET balance = ? WHERE guild_id = ? AND user_id = ?",
                     (amount, guild_id, user_id),
                 )
-            await self.bot.db.commit()
+            await self.bot.storage.commit()
             return amount
 
     jobs = app_commands.Group(name="jobs", description="Perform various jobs to earn coins.", guild_only=True)
@@ -302,7 +276,7 @@ class Economy(commands.Cog):
         guild_id = self._get_guild_id(interaction)
         await interaction.response.defer()
 
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.read() as db, db.cursor() as cursor:
             await cursor.execute(
                 "SELECT user_id, balance FROM users WHERE guild_id = ? ORDER BY balance DESC LIMIT 10",
                 (guild_id,),
@@ -387,7 +361,7 @@ class Economy(commands.Cog):
                 )
                 return
 
-            async with self.bot.db.cursor() as cursor:
+            async with self.bot.storage.write().cursor() as cursor:
                 if random.random() < ROB_SUCCESS_RATE:
                     robbed_amount = random.randint(int(victim_balance * 0.1), int(victim_balance * 0.25))
                     await cursor.execute(
@@ -410,7 +384,7 @@ class Economy(commands.Cog):
                         f"**{fine_amount}**."
                     )
 
-            await self.bot.db.commit()
+            await self.bot.storage.commit()
 
         await interaction.response.send_message(message)
 
@@ -501,9 +475,9 @@ class Economy(commands.Cog):
     async def admin_reset_guild(self, interaction: discord.Interaction):
         guild_id = self._get_guild_id(interaction)
         async with self._guild_lock(guild_id):
-            async with self.bot.db.cursor() as cursor:
+            async with self.bot.storage.write().cursor() as cursor:
                 await cursor.execute("DELETE FROM users WHERE guild_id = ?", (guild_id,))
-            await self.bot.db.commit()
+            await self.bot.storage.commit()
         await interaction.response.send_message("The server economy has been reset.", ephemeral=True)
 
 
@@ -1,6 +1,7 @@
 import logging
 import math
 import random
+import sqlite3
 from datetime import datetime, timedelta
 
 import discord
@@ -17,10 +18,26 @@ BOUNTIFUL_REWARD_MULTIPLIER = 1.5
 BOUNTIFUL_XP_MULTIPLIER = 1.5
 
 
+def _apply_harvest(connection: sqlite3.Connection, guild_id: int, user_id: int, reward: int, level: int, xp: int):
+    # The users.balance column default is the starting balance for new accounts.
+    connection.execute("INSERT OR IGNORE INTO users (guild_id, user_id) VALUES (?, ?)", (guild_id, user_id))
+    connection.execute(
+        "UPDATE users SET balance = balance + ? WHERE guild_id = ? AND user_id = ?",
+        (reward, guild_id, user_id),
+    )
+    connection.execute(
+        """
+        UPDATE farms
+        SET crop = NULL, plant_time = NULL, level = ?, xp = ?
+        WHERE guild_id = ? AND user_id = ?
+        """,
+        (level, xp, guild_id, user_id),
+    )
+
+
 class Farming(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.bot.loop.create_task(self.setup_database())
 
         self.crops = {
             "wheat": {"name": "Wheat 🌾", "cost": 10, "growth": 600, "reward": 25, "xp": 5, "level": 1},
@@ -35,71 +52,13 @@ class Farming(commands.Cog):
             3: {"name": "Fertile Land", "mod": 0.75, "cost": 5000},
         }
 
-    async def setup_database(self):
-        columns = []
-        async with self.bot.db.execute("PRAGMA table_info(farms)") as cursor:
-            columns = [row[1] for row in await cursor.fetchall()]
-
-        if columns and "guild_id" not in columns:
-            async with self.bot.db.cursor() as cursor:
-                await cursor.execute("ALTER TABLE farms RENAME TO farms_legacy")
-                await cursor.execute(
-                    """
-                    CREATE TABLE farms (
-                        guild_id INTEGER NOT NULL,
-                        user_id INTEGER NOT NULL,
-                        crop TEXT,
-                        plant_time TEXT,
-                        land_type INTEGER DEFAULT 1,
-                        level INTEGER DEFAULT 1,
-                        xp INTEGER DEFAULT 0,
-                        PRIMARY KEY (guild_id, user_id)
-                    )
-                    """
-                )
-                await cursor.execute(
-                    """
-                    INSERT OR IGNORE INTO farms (guild_id, user_id, crop, plant_time, land_type, level, xp)
-                    SELECT DISTINCT
-                        COALESCE(messages.guild_id, 0),
-                        legacy.user_id,
-                        legacy.crop,
-                        legacy.plant_time,
-                        legacy.land_type,
-                        legacy.level,
-                        legacy.xp
-                    FROM farms_legacy AS legacy
-                    LEFT JOIN messages
-                        ON messages.user_id = legacy.user_id
-                       AND messages.guild_id IS NOT NULL
-                    """
-                )
-            logger.info("Migrated global farm data to per-guild records.")
-        else:
-            async with self.bot.db.cursor() as cursor:
-                await cursor.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS farms (
-                        guild_id INTEGER NOT NULL,
-                        user_id INTEGER NOT NULL,
-                        crop TEXT,
-                        plant_time TEXT,
-                        land_type INTEGER DEFAULT 1,
-                        level INTEGER DEFAULT 1,
-                        xp INTEGER DEFAULT 0,
-                        PRIMARY KEY (guild_id, user_id)
-                    )
-                    """
-                )
-        await self.bot.db.commit()
-
     async def get_farm_data(self, guild_id: int, user_id: int):
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute("SELECT * FROM farms WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
             result = await cursor.fetchone()
             if not result:
                 await cursor.execute("INSERT INTO farms (guild_id, user_id) VALUES (?, ?)", (guild_id, user_id))
-                await self.bot.db.commit()
+                await self.bot.storage.commit()
                 await cursor.execute("SELECT * FROM farms WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
                 result = await cursor.fetchone()
 
@@ -205,7 +164,7 @@ class Farming(commands.Cog):
                 )
                 return
 
-            async with self.bot.db.cursor() as cursor:
+            async with self.bot.storage.write().cursor() as cursor:
                 await cursor.execute(
                     "UPDATE users SET balance = ? WHERE guild_id = ? AND user_id = ?",
                     (user_balance - crop_data["cost"], guild_id, interaction.user.id),
@@ -214,7 +173,7 @@ class Farming(commands.Cog):
                     "UPDATE farms SET crop = ?, plant_time = ? WHERE guild_id = ? AND user_id = ?",
                     (crop_name, datetime.utcnow().isoformat(), guild_id, interaction.user.id),
                 )
-            await self.bot.db.commit()
+            await self.bot.storage.commit()
 
         land_mod = self.land_types[farm_data["land_type"]]["mod"]
         growth_seconds = crop_data["growth"] * land_mod
@@ -275,21 +234,9 @@ class Farming(commands.Cog):
             level_up_message += f"\n🎉 **LEVEL UP! You are now Farm Level {current_level}!** 🎉"
 
         async with economy_cog._guild_lock(guild_id):
-            user_balance = await economy_cog._get_or_create_user_unlocked(guild_id, interaction.user.id)
-            async with self.bot.db.cursor() as cursor:
-                await cursor.execute(
-                    "UPDATE users SET balance = ? WHERE guild_id = ? AND user_id = ?",
-                    (user_balance + reward, guild_id, interaction.user.id),
-                )
-                await cursor.execute(
-                    """
-                    UPDATE farms
-                    SET crop = NULL, plant_time = NULL, level = ?, xp = ?
-                    WHERE guild_id = ? AND user_id = ?
-                    """,
-                    (current_level, new_xp, guild_id, interaction.user.id),
-                )
-            await self.bot.db.commit()
+            await self.bot.storage.transaction(
+                _apply_harvest, guild_id, interaction.user.id, reward, current_level, new_xp
+            )
 
         await interaction.response.send_message(
             f"You harvested your **{crop_data['name']}** and earned 🪙 **{reward}** and **{xp_gain} XP**!"
@@ -323,7 +270,7 @@ class Farming(commands.Cog):
                 )
                 return
 
-            async with self.bot.db.cursor() as cursor:
+            async with self.bot.storage.write().cursor() as cursor:
                 await cursor.execute(
                     "UPDATE users SET balance = ? WHERE guild_id = ? AND user_id = ?",
                     (user_balance - upgrade_data["cost"], guild_id, interaction.user.id),
@@ -332,7 +279,7 @@ class Farming(commands.Cog):
                     "UPDATE farms SET land_type = ? WHERE guild_id = ? AND user_id = ?",
                     (next_land_level, guild_id, interaction.user.id),
                 )
-            await self.bot.db.commit()
+            await self.bot.storage.commit()
 
         await interaction.response.send_message(
             f"Congratulations! You've spent 🪙 {upgrade_data['cost']} to upgrade your farm to **{upgrade_data['name']}**!"
@@ -2,10 +2,12 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import random
-from PIL import Image, ImageDraw, ImageFont
 import io
+import logging
 import textwrap
 
+logger = logging.getLogger(__name__)
+
 
 class Fun(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -257,6 +259,9 @@ class Fun(commands.Cog):
     @app_commands.describe(text="The content of the tweet (max 280 chars).")
     @app_commands.checks.cooldown(1, 15, key=lambda i: i.user.id)
     async def tweet(self, interaction: discord.Interaction, text: str):
+        # Pillow is only needed here, so it is imported on first use instead of at cog load.
+        from PIL import Image, ImageDraw, ImageFont
+
         await interaction.response.defer()
 
         if len(text) > 280:
@@ -278,7 +283,7 @@ class Fun(commands.Cog):
                     draw_mask.ellipse((0, 0) + avatar.size, fill=255)
                     bg.paste(avatar, (50, 50), mask)
         except Exception as e:
-            print(f"Tweet avatar error: {e}")
+            logger.warning("Could not draw the avatar for a tweet: %s", e)
 
         draw = ImageDraw.Draw(bg)
         try:
@@ -286,7 +291,7 @@ class Fun(commands.Cog):
             font_regular = ImageFont.truetype("arial.ttf", 50)
             font_handle = ImageFont.truetype("arial.ttf", 45)
         except IOError:
-            print("Arial font not found, using default font for tweet command.")
+            logger.warning("Arial font not found, using default font for tweet command.")
             font_bold = ImageFont.load_default(size=60)
             font_regular = ImageFont.load_default(size=50)
             font_handle = ImageFont.load_default(size=45)
@@ -113,6 +113,9 @@ class Games(commands.Cog):
         self.bot = bot
         self.active_guess_games = set()
 
+    def memory_stats(self) -> dict[str, tuple[int, object]]:
+        return {"active_guess_games": (len(self.active_guess_games), self.active_guess_games)}
+
     @app_commands.command(name="eightball", description="Ask the magic 8-ball a question.")
     @app_commands.describe(question="The question you want to ask.")
     @app_commands.checks.cooldown(1, 5, key=lambda i: i.user.id)
@@ -1,7 +1,11 @@
+import logging
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+logger = logging.getLogger(__name__)
+
 
 class Interactions(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -15,7 +19,7 @@ class Interactions(commands.Cog):
                     data = await response.json()
                     return data.get("url")
         except Exception as e:
-            print(f"Could not fetch GIF for category {category}: {e}")
+            logger.warning("Could not fetch GIF for category %s: %s", category, e)
             return None
 
     async def create_interaction_embed(
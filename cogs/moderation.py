@@ -1,55 +1,58 @@
+import asyncio
 import json
 import re
+import time
 from datetime import timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
+
+from antispam import SpamTracker, content_fingerprint
+from guild_config import AutomodSettings
+from message_pipeline import MessageContext
+from word_matcher import compile_words
 
 
 INVITE_RE = re.compile(r"(discord\.gg/|discord\.com/invite/)", re.IGNORECASE)
 LINK_RE = re.compile(r"https?://", re.IGNORECASE)
+FLOOD_THRESHOLD = 4
+FLOOD_WINDOW_SECONDS = 30
+FLOOD_TRACKER_MAX_KEYS = 20000
+FLOOD_SWEEP_SECONDS = 60
 
 
 class Moderation(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.bot.loop.create_task(self.setup_database())
+        self.bot.guild_config.register("automod", self._load_automod_settings)
+        # Keyed by (guild, content fingerprint): copies of one text count together whoever posts them, wherever.
+        self.flood_tracker = SpamTracker(FLOOD_THRESHOLD, FLOOD_WINDOW_SECONDS, max_keys=FLOOD_TRACKER_MAX_KEYS)
+        # (guild, author) -> monotonic time their last flood was acted on; swept with the tracker.
+        self.flood_reported: Dict[Tuple[int, int], float] = {}
+        self.bot.message_pipeline.register("automod", self.automod_stage, order=20, guild_only=True)
+        self.bot.message_pipeline.register("flood", self.flood_stage, order=25, guild_only=True)
+        self._sweep_flood_tracker.start()
+
+    def cog_unload(self):
+        self._sweep_flood_tracker.cancel()
+        self.bot.message_pipeline.unregister("flood")
+        self.bot.message_pipeline.unregister("automod")
+        self.bot.guild_config.unregister("automod")
+
+    def memory_stats(self) -> Dict[str, Tuple[int, object]]:
+        return {
+            "flood_tracker": (len(self.flood_tracker), self.flood_tracker),
+            "flood_reported": (len(self.flood_reported), self.flood_reported),
+        }
 
-    async def setup_database(self):
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS automod_settings (
-                    guild_id INTEGER PRIMARY KEY,
-                    filter_invites INTEGER NOT NULL DEFAULT 0,
-                    filter_links INTEGER NOT NULL DEFAULT 0,
-                    bad_words TEXT,
-                    whitelist_channel_ids TEXT,
-                    action TEXT NOT NULL DEFAULT 'delete'
-                )
-                """
-            )
-            await cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS moderation_warnings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    moderator_id INTEGER NOT NULL,
-                    reason TEXT NOT NULL,
-                    created_at TEXT NOT NULL
-                )
-                """
-            )
-            await cursor.execute(
-                """
-                CREATE INDEX IF NOT EXISTS idx_moderation_warnings_guild_user_created_at
-                ON moderation_warnings(guild_id, user_id, created_at DESC)
-                """
-            )
-        await self.bot.db.commit()
+    @tasks.loop(seconds=FLOOD_SWEEP_SECONDS)
+    async def _sweep_flood_tracker(self):
+        self.flood_tracker.sweep()
+        cutoff = time.monotonic() - FLOOD_WINDOW_SECONDS
+        for key in [key for key, reported in self.flood_reported.items() if reported <= cutoff]:
+            del self.flood_reported[key]
 
     def _serialize_ids(self, ids: List[int]) -> Optional[str]:
         cleaned = sorted({int(item) for item in ids})
@@ -64,11 +67,14 @@ class Moderation(commands.Cog):
             return []
         return [int(item) for item in values if str(item).isdigit()]
 
-    async def get_automod_settings(self, guild_id: int) -> Dict[str, object]:
-        async with self.bot.db.cursor() as cursor:
+    async def get_automod_settings(self, guild_id: int) -> AutomodSettings:
+        return await self.bot.guild_config.get("automod", guild_id)
+
+    async def _load_automod_settings(self, guild_id: int) -> AutomodSettings:
+        async with self.bot.storage.read() as db, db.cursor() as cursor:
             await cursor.execute(
                 """
-                SELECT filter_invites, filter_links, bad_words, whitelist_channel_ids, action
+                SELECT filter_invites, filter_links, filter_floods, bad_words, whitelist_channel_ids, action
                 FROM automod_settings
                 WHERE guild_id = ?
                 """,
@@ -77,33 +83,42 @@ class Moderation(commands.Cog):
             row = await cursor.fetchone()
 
         if row is None:
-            return {
-                "filter_invites": False,
-                "filter_links": False,
-                "bad_words": [],
-                "whitelist_channel_ids": [],
-                "action": "delete",
-            }
-
-        filter_invites, filter_links, bad_words, whitelist_channel_ids, action = row
-        return {
-            "filter_invites": bool(filter_invites),
-            "filter_links": bool(filter_links),
-            "bad_words": [word for word in (bad_words or "").split(",") if word],
-            "whitelist_channel_ids": self._deserialize_ids(whitelist_channel_ids),
-            "action": action or "delete",
-        }
+            return AutomodSettings(
+                filter_invites=False,
+                filter_links=False,
+                filter_floods=False,
+                bad_words=(),
+                bad_word_matcher=compile_words(()),
+                whitelist_channel_ids=(),
+                action="delete",
+            )
+
+        filter_invites, filter_links, filter_floods, bad_words, whitelist_channel_ids, action = row
+        words = tuple(word for word in (bad_words or "").split(",") if word)
+        return AutomodSettings(
+            filter_invites=bool(filter_invites),
+            filter_links=bool(filter_links),
+            filter_floods=bool(filter_floods),
+            bad_words=words,
+            # Building the automaton for a long list takes a while; keep it off the event loop.
+            bad_word_matcher=await asyncio.to_thread(compile_words, words),
+            whitelist_channel_ids=tuple(self._deserialize_ids(whitelist_channel_ids)),
+            action=action or "delete",
+        )
 
     async def update_automod(self, guild_id: int, **fields):
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute("INSERT OR IGNORE INTO automod_settings (guild_id) VALUES (?)", (guild_id,))
-            for field, value in fields.items():
-                await cursor.execute(f"UPDATE automod_settings SET {field} = ? WHERE guild_id = ?", (value, guild_id))
-        await self.bot.db.commit()
+        try:
+            async with self.bot.storage.write().cursor() as cursor:
+                await cursor.execute("INSERT OR IGNORE INTO automod_settings (guild_id) VALUES (?)", (guild_id,))
+                for field, value in fields.items():
+                    await cursor.execute(f"UPDATE automod_settings SET {field} = ? WHERE guild_id = ?", (value, guild_id))
+            await self.bot.storage.commit()
+        finally:
+            self.bot.guild_config.invalidate("automod", guild_id)
 
     async def mutate_whitelist(self, guild_id: int, channel_id: int, add: bool) -> List[int]:
         settings = await self.get_automod_settings(guild_id)
-        current = set(settings["whitelist_channel_ids"])
+        current = set(settings.whitelist_channel_ids)
         if add:
             current.add(channel_id)
         else:
@@ -112,7 +127,7 @@ class Moderation(commands.Cog):
         return sorted(current)
 
     async def add_warning(self, guild_id: int, user_id: int, moderator_id: int, reason: str) -> int:
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 """
                 INSERT INTO moderation_warnings (guild_id, user_id, moderator_id, reason, created_at)
@@ -121,7 +136,7 @@ class Moderation(commands.Cog):
                 (guild_id, user_id, moderator_id, reason, discord.utils.utcnow().isoformat()),
             )
             warning_id = cursor.lastrowid
-        await self.bot.db.commit()
+        await self.bot.storage.commit()
         return warning_id
 
     async def log_action(self, guild: discord.Guild, title: str, description: str, color: discord.Color):
@@ -135,12 +150,13 @@ class Moderation(commands.Cog):
     @app_commands.checks.has_permissions(manage_guild=True)
     async def automod_view(self, interaction: discord.Interaction):
         settings = await self.get_automod_settings(interaction.guild_id)
-        whitelist = ", ".join(f"<#{channel_id}>" for channel_id in settings["whitelist_channel_ids"]) or "Not set"
-        bad_words = ", ".join(f"`{word}`" for word in settings["bad_words"]) or "Not set"
+        whitelist = ", ".join(f"<#{channel_id}>" for channel_id in settings.whitelist_channel_ids) or "Not set"
+        bad_words = ", ".join(f"`{word}`" for word in settings.bad_words) or "Not set"
         embed = discord.Embed(title="Automod Settings", color=discord.Color.orange())
-        embed.add_field(name="Invite Filter", value="On" if settings["filter_invites"] else "Off", inline=True)
-        embed.add_field(name="Link Filter", value="On" if settings["filter_links"] else "Off", inline=True)
-        embed.add_field(name="Action", value=settings["action"], inline=True)
+        embed.add_field(name="Invite Filter", value="On" if settings.filter_invites else "Off", inline=True)
+        embed.add_field(name="Link Filter", value="On" if settings.filter_links else "Off", inline=True)
+        embed.add_field(name="Flood Filter", value="On" if settings.filter_floods else "Off", inline=True)
+        embed.add_field(name="Action", value=settings.action, inline=True)
         embed.add_field(name="Bad Words", value=bad_words, inline=False)
         embed.add_field(name="Whitelisted Channels", value=whitelist, inline=False)
         await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -157,6 +173,14 @@ class Moderation(commands.Cog):
         await self.update_automod(interaction.guild_id, filter_links=int(enabled))
         await interaction.response.send_message(f"Link filtering is now {'on' if enabled else 'off'}.", ephemeral=True)
 
+    @automod.command(
+        name="toggle-floods", description="Turn detection of the same message posted repeatedly across the server on or off."
+    )
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def automod_toggle_floods(self, interaction: discord.Interaction, enabled: bool):
+        await self.update_automod(interaction.guild_id, filter_floods=int(enabled))
+        await interaction.response.send_message(f"Flood filtering is now {'on' if enabled else 'off'}.", ephemeral=True)
+
     @automod.command(name="set-action", description="Choose what automod should do when it triggers.")
     @app_commands.checks.has_permissions(manage_guild=True)
     @app_commands.choices(
@@ -222,7 +246,7 @@ class Moderation(commands.Cog):
     @app_commands.guild_only()
     @app_commands.checks.has_permissions(manage_messages=True)
     async def warnings(self, interaction: discord.Interaction, member: discord.Member):
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.read() as db, db.cursor() as cursor:
             await cursor.execute(
                 """
                 SELECT id, moderator_id, reason, created_at
@@ -254,13 +278,13 @@ class Moderation(commands.Cog):
     @app_commands.guild_only()
     @app_commands.checks.has_permissions(manage_messages=True)
     async def clear_warning(self, interaction: discord.Interaction, warning_id: int):
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 "DELETE FROM moderation_warnings WHERE id = ? AND guild_id = ?",
                 (warning_id, interaction.guild_id),
             )
             deleted = cursor.rowcount
-        await self.bot.db.commit()
+        await self.bot.storage.commit()
         if not deleted:
             await interaction.response.send_message("Warning not found.", ephemeral=True)
             return
@@ -274,80 +298,114 @@ class Moderation(commands.Cog):
         await interaction.response.send_message(f"Warning `{warning_id}` removed.", ephemeral=True)
 
     async def handle_violation(self, message: discord.Message, reason: str, action: str):
-        deleted = False
         try:
             await message.delete()
-            deleted = True
         except (discord.Forbidden, discord.HTTPException):
-            deleted = False
-
-        details = [f"User: {message.author.mention}", f"Channel: {message.channel.mention}", f"Reason: {reason}"]
-        if not deleted:
+            details = [f"User: {message.author.mention}", f"Channel: {message.channel.mention}", f"Reason: {reason}"]
             details.append("Action skipped because the original message could not be deleted")
             await self.log_action(message.guild, "Automod Triggered", "\n".join(details), discord.Color.red())
             return
+        await self.penalize(message.guild, message.channel, message.author, reason, action)
 
+    async def penalize(
+        self, guild: discord.Guild, channel: discord.abc.Messageable, author: discord.abc.User, reason: str, action: str
+    ):
+        """Apply ``action`` to ``author`` for a message already removed from ``channel``, and log it."""
+        details = [f"User: {author.mention}", f"Channel: {channel.mention}", f"Reason: {reason}"]
         if action == "warn":
-            warning_id = await self.add_warning(message.guild.id, message.author.id, self.bot.user.id, f"Automod: {reason}")
+            warning_id = await self.add_warning(guild.id, author.id, self.bot.user.id, f"Automod: {reason}")
             details.append(f"Warning ID: `{warning_id}`")
             try:
-                await message.channel.send(
-                    f"{message.author.mention}, your message was removed by automod: {reason}",
+                await channel.send(
+                    f"{author.mention}, your message was removed by automod: {reason}",
                     delete_after=10,
                 )
             except (discord.Forbidden, discord.HTTPException):
                 pass
-        elif action == "timeout" and isinstance(message.author, discord.Member):
+        elif action == "timeout" and isinstance(author, discord.Member):
             try:
-                await message.author.timeout(discord.utils.utcnow() + timedelta(minutes=10), reason=f"Automod: {reason}")
+                await author.timeout(discord.utils.utcnow() + timedelta(minutes=10), reason=f"Automod: {reason}")
                 details.append("Action: timeout")
             except (discord.Forbidden, discord.HTTPException):
                 details.append("Action: timeout failed, message removed only")
                 try:
-                    await message.channel.send(
-                        f"{message.author.mention}, automod tried to time you out but lacked permission. Message removed.",
+                    await channel.send(
+                        f"{author.mention}, automod tried to time you out but lacked permission. Message removed.",
                         delete_after=10,
                     )
                 except (discord.Forbidden, discord.HTTPException):
                     pass
 
-        await self.log_action(message.guild, "Automod Triggered", "\n".join(details), discord.Color.red())
-
-    @commands.Cog.listener("on_message")
-    async def automod_listener(self, message: discord.Message):
-        if message.author.bot or message.guild is None:
-            return
-        if not isinstance(message.author, discord.Member):
-            return
-        if not isinstance(message.channel, (discord.TextChannel, discord.Thread)):
-            return
-        if message.author.guild_permissions.manage_messages:
-            return
-
-        settings = await self.get_automod_settings(message.guild.id)
-        whitelisted = settings["whitelist_channel_ids"]
-        parent_id = getattr(message.channel, "parent_id", None)
-        if message.channel.id in whitelisted or (parent_id and parent_id in whitelisted):
+        await self.log_action(guild, "Automod Triggered", "\n".join(details), discord.Color.red())
+
+    async def _exempt(self, context: MessageContext) -> bool:
+        if not isinstance(context.author, discord.Member):
+            return True
+        if not isinstance(context.channel, (discord.TextChannel, discord.Thread)):
+            return True
+        if context.permissions.manage_messages:
+            return True
+        settings = await context.guild_settings("automod", self.get_automod_settings)
+        whitelisted = settings.whitelist_channel_ids
+        parent_id = getattr(context.channel, "parent_id", None)
+        return context.channel.id in whitelisted or bool(parent_id and parent_id in whitelisted)
+
+    async def automod_stage(self, context: MessageContext):
+        if await self._exempt(context):
             return
 
-        lowered = message.content.lower()
+        message = context.message
+        settings = await context.guild_settings("automod", self.get_automod_settings)
         violation = None
-        if settings["filter_invites"] and INVITE_RE.search(message.content):
+        if settings.filter_invites and INVITE_RE.search(message.content):
             violation = "Discord invite links are not allowed."
-        elif settings["filter_links"] and LINK_RE.search(message.content):
+        elif settings.filter_links and LINK_RE.search(message.content):
             violation = "Links are not allowed."
         else:
-            for word in settings["bad_words"]:
-                if not word:
-                    continue
-                pattern = re.compile(rf"(?<!\w){re.escape(word)}(?!\w)", re.IGNORECASE)
-                if pattern.search(lowered):
-                    violation = f"Blocked word detected: `{word}`"
-                    break
+            word = settings.bad_word_matcher.search(context.lowered)
+            if word:
+                violation = f"Blocked word detected: `{word}`"
 
         if violation:
-            await self.handle_violation(message, violation, settings["action"])
+            context.stop()
+            await self.handle_violation(message, violation, settings.action)
+
+    async def flood_stage(self, context: MessageContext):
+        settings = await context.guild_settings("automod", self.get_automod_settings)
+        if not settings.filter_floods or await self._exempt(context):
+            return
+        fingerprint = content_fingerprint(context.message.content)
+        if fingerprint is None:
+            return
 
+        key = (context.guild.id, fingerprint)
+        copy = (context.channel, context.message.id, context.author)
+        crossed = self.flood_tracker.hit(key, copy)
+        if self.flood_tracker.count(key) <= FLOOD_THRESHOLD:
+            return
+
+        context.stop()
+        # Crossing the threshold removes the copies let through before it as well; later copies only add their own.
+        copies = self.flood_tracker.message_ids(key) if crossed else [copy]
+        offenders = {}
+        for channel, message_id, author in copies:
+            self.bot.spam_deleter.queue(channel, (message_id,))
+            offenders[author.id] = (channel, author)
+
+        # One warning, timeout and modlog entry per author however many copies they post.
+        now = time.monotonic()
+        for channel, author in offenders.values():
+            author_key = (context.guild.id, author.id)
+            if now - self.flood_reported.get(author_key, float("-inf")) < FLOOD_WINDOW_SECONDS:
+                continue
+            self.flood_reported[author_key] = now
+            await self.penalize(
+                context.guild,
+                channel,
+                author,
+                "The same message was posted too many times across the server.",
+                settings.action,
+            )
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Moderation(bot))
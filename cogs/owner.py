@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from command_sync import sync_commands
+from memory_report import (
+    format_memory_report,
+    memory_report,
+    start_allocation_tracing,
+    stop_allocation_tracing,
+    top_allocations,
+)
+from query_stats import format_top_queries
+from rest_stats import format_rest_stats
+from retention import enable_incremental_vacuum
+from sampling_profiler import MAX_DURATION_SECONDS, SamplingProfiler, write_profile
+
+logger = logging.getLogger(__name__)
+
+
+class Owner(commands.Cog):
+    """Maintenance commands restricted to the bot owner."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._profiling = False
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await self.bot.is_owner(interaction.user)
+
+    owner = app_commands.Group(
+        name="owner",
+        description="Bot owner maintenance commands.",
+        default_permissions=discord.Permissions(administrator=True),
+    )
+
+    @owner.command(name="sync", description="Re-sync slash commands with Discord.")
+    @app_commands.describe(force="Sync even if the command tree has not changed since the last sync.")
+    async def sync(self, interaction: discord.Interaction, force: bool = True):
+        await interaction.response.defer(ephemeral=True)
+
+        # A partial tree would unregister the commands of cogs that have not been loaded yet.
+        for extension in sorted(set(self.bot.tree.lazy_extensions.values())):
+            await self.bot.tree.load_lazy(extension)
+
+        try:
+            synced = await sync_commands(self.bot, self.bot.config.get("DEV_GUILD_IDS", []), force=force)
+        except discord.HTTPException as error:
+            logger.exception("Slash command sync failed.")
+            await interaction.followup.send(f"Sync failed: {error}", ephemeral=True)
+            return
+
+        if synced:
+            await interaction.followup.send(f"Synced slash commands for {', '.join(synced)}.", ephemeral=True)
+        else:
+            await interaction.followup.send("Slash commands are already up to date.", ephemeral=True)
+
+    @owner.command(name="top-queries", description="Show the SQL statements that took the most time.")
+    @app_commands.describe(
+        limit="How many statements to show.",
+        order="How to rank the statements.",
+        reset="Clear the statistics afterwards.",
+    )
+    @app_commands.choices(
+        order=[
+            app_commands.Choice(name="Total time", value="total_seconds"),
+            app_commands.Choice(name="Average time", value="average_seconds"),
+            app_commands.Choice(name="Slowest call", value="max_seconds"),
+            app_commands.Choice(name="Calls", value="calls"),
+        ]
+    )
+    async def top_queries(
+        self,
+        interaction: discord.Interaction,
+        limit: app_commands.Range[int, 1, 25] = 10,
+        order: str = "total_seconds",
+        reset: bool = False,
+    ):
+        recorder = self.bot.storage.recorder
+        if recorder is None:
+            await interaction.response.send_message("Query statistics are not being collected.", ephemeral=True)
+            return
+
+        report = format_top_queries(recorder.top(limit, order), width=80)
+        if reset:
+            recorder.reset()
+        if len(report) > 1900:
+            report = report[:1900].rsplit("\n", 1)[0] + "\n..."
+        await interaction.response.send_message(f"```\n{report}\n```", ephemeral=True)
+
+    @owner.command(name="rest-stats", description="Show which Discord API routes each cog calls and where rate limits hit.")
+    @app_commands.describe(
+        limit="How many routes to show.",
+        order="How to rank the routes.",
+        reset="Clear the statistics afterwards.",
+    )
+    @app_commands.choices(
+        order=[
+            app_commands.Choice(name="Calls", value="calls"),
+            app_commands.Choice(name="429 responses", value="rate_limited"),
+            app_commands.Choice(name="Bucket wait", value="wait_seconds"),
+            app_commands.Choice(name="HTTP time", value="http_seconds"),
+            app_commands.Choice(name="Errors", value="errors"),
+        ]
+    )
+    async def rest_stats(
+        self,
+        interaction: discord.Interaction,
+        limit: app_commands.Range[int, 1, 25] = 10,
+        order: str = "calls",
+        reset: bool = False,
+    ):
+        recorder = getattr(self.bot, "rest_stats", None)
+        if recorder is None:
+            await interaction.response.send_message("REST statistics are not being collected.", ephemeral=True)
+            return
+
+        report = format_rest_stats(recorder.top(limit, order), width=60)
+        if reset:
+            recorder.reset()
+        if len(report) > 1900:
+            report = report[:1900].rsplit("\n", 1)[0] + "\n..."
+        await interaction.response.send_message(f"```\n{report}\n```", ephemeral=True)
+
+    @owner.command(name="profile", description="Sample the event loop and database threads for a while.")
+    @app_commands.describe(seconds="How long to profile for.")
+    async def profile(
+        self, interaction: discord.Interaction, seconds: app_commands.Range[int, 1, MAX_DURATION_SECONDS] = 10
+    ):
+        if self._profiling:
+            await interaction.response.send_message("A profiling session is already running.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        threads = {threading.get_ident(): "event-loop", **self.bot.storage.worker_threads()}
+        self._profiling = True
+        try:
+            result = await SamplingProfiler(threads).run(seconds)
+            path = await asyncio.to_thread(write_profile, result)
+        finally:
+            self._profiling = False
+
+        logger.info("Wrote a %ss profile to %s.", seconds, path)
+        report = result.summary(limit=15, width=70)
+        if len(report) > 1800:
+            report = report[:1800].rsplit("\n", 1)[0] + "\n..."
+        await interaction.followup.send(f"Collapsed stacks written to `{path}`.\n```\n{report}\n```", ephemeral=True)
+
+    @owner.command(name="vacuum", description="Rebuild the database so pruned rows shrink the file.")
+    async def vacuum(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            # The rebuild holds the writer for a while; let message log rows queue up instead of piling on.
+            async with self.bot.message_log.paused():
+                converted = await enable_incremental_vacuum(self.bot.storage, rebuild=True)
+        except sqlite3.Error as error:
+            logger.exception("Database rebuild failed.")
+            await interaction.followup.send(f"Rebuild failed: {error}", ephemeral=True)
+            return
+
+        if converted:
+            await interaction.followup.send("Database rebuilt with incremental auto-vacuum.", ephemeral=True)
+        else:
+            await interaction.followup.send("The database already uses incremental auto-vacuum.", ephemeral=True)
+
+    @owner.command(name="memory", description="Show the size of in-process caches, and optionally allocation hot spots.")
+    @app_commands.describe(allocations="Control tracemalloc allocation tracing.")
+    @app_commands.choices(
+        allocations=[
+            app_commands.Choice(name="Start tracing", value="start"),
+            app_commands.Choice(name="Show top allocators", value="top"),
+            app_commands.Choice(name="Stop tracing", value="stop"),
+        ]
+    )
+    async def memory(self, interaction: discord.Interaction, allocations: Optional[str] = None):
+        await interaction.response.defer(ephemeral=True)
+        sections = [format_memory_report(memory_report(self.bot))]
+        if allocations == "start":
+            started = start_allocation_tracing()
+            sections.append("Allocation tracing started." if started else "Allocation tracing was already running.")
+        elif allocations == "top":
+            top = await top_allocations(10)
+            sections.append(top or "Allocation tracing is not running; start it first.")
+        elif allocations == "stop":
+            stopped = stop_allocation_tracing()
+            sections.append("Allocation tracing stopped." if stopped else "Allocation tracing was not running.")
+
+        report = "\n\n".join(sections)
+        if len(report) > 1900:
+            report = report[:1900].rsplit("\n", 1)[0] + "\n..."
+        await interaction.followup.send(f"```\n{report}\n```", ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Owner(bot))
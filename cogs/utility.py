@@ -9,6 +9,9 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 
+from message_pipeline import MessageContext
+from storage import execute_statements
+
 
 REMINDER_LIMIT_SECONDS = 30 * 24 * 60 * 60
 REMINDER_POLL_SECONDS = 30
@@ -31,63 +34,30 @@ class Utility(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.afk_cache: dict[tuple[int, int], tuple[str, str]] = {}
+        self.afk_cache_hits = 0
+        self.afk_cache_misses = 0
         if not hasattr(bot, "start_time"):
             self.bot.start_time = discord.utils.utcnow()
+        self.bot.message_pipeline.register("afk", self.afk_stage, order=30, guild_only=True)
         self.reminder_loop.start()
 
     def cog_unload(self):
+        self.bot.message_pipeline.unregister("afk")
         self.reminder_loop.cancel()
 
-    async def setup_database(self):
-        async with self.bot.db.cursor() as cursor:
-            await cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS reminders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    channel_id INTEGER,
-                    guild_id INTEGER,
-                    remind_at TEXT NOT NULL,
-                    reason TEXT NOT NULL,
-                    recurring_seconds INTEGER,
-                    delivery_failures INTEGER NOT NULL DEFAULT 0
-                )
-                """
-            )
-            await cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS afk_statuses (
-                    guild_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    reason TEXT NOT NULL,
-                    set_at TEXT NOT NULL,
-                    PRIMARY KEY (guild_id, user_id)
-                )
-                """
-            )
-            await cursor.execute("PRAGMA table_info(reminders)")
-            reminder_columns = [row[1] for row in await cursor.fetchall()]
-            if "recurring_seconds" not in reminder_columns:
-                await cursor.execute("ALTER TABLE reminders ADD COLUMN recurring_seconds INTEGER")
-            if "delivery_failures" not in reminder_columns:
-                await cursor.execute("ALTER TABLE reminders ADD COLUMN delivery_failures INTEGER NOT NULL DEFAULT 0")
-            if "disabled" not in reminder_columns:
-                await cursor.execute("ALTER TABLE reminders ADD COLUMN disabled INTEGER NOT NULL DEFAULT 0")
-            if "last_error" not in reminder_columns:
-                await cursor.execute("ALTER TABLE reminders ADD COLUMN last_error TEXT")
-            await cursor.execute(
-                "CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders(disabled, remind_at)"
-            )
-            await cursor.execute(
-                "CREATE INDEX IF NOT EXISTS idx_reminders_user_remind_at ON reminders(user_id, remind_at)"
-            )
-        await self.bot.db.commit()
+    def cache_stats(self) -> dict[str, tuple[int, int]]:
+        return {"afk": (self.afk_cache_hits, self.afk_cache_misses)}
+
+    def memory_stats(self) -> dict[str, tuple[int, object]]:
+        return {"afk_cache": (len(self.afk_cache), self.afk_cache)}
 
     async def get_afk_status(self, guild_id: int, user_id: int):
         cache_key = (guild_id, user_id)
         if cache_key in self.afk_cache:
+            self.afk_cache_hits += 1
             return self.afk_cache[cache_key]
-        async with self.bot.db.cursor() as cursor:
+        self.afk_cache_misses += 1
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 "SELECT reason, set_at FROM afk_statuses WHERE guild_id = ? AND user_id = ?",
                 (guild_id, user_id),
@@ -108,11 +78,13 @@ class Utility(commands.Cog):
             else:
                 missing_ids.append(user_id)
 
+        self.afk_cache_hits += len(statuses)
+        self.afk_cache_misses += len(missing_ids)
         if not missing_ids:
             return statuses
 
         placeholders = ",".join("?" for _ in missing_ids)
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 f"""
                 SELECT user_id, reason, set_at
@@ -132,7 +104,7 @@ class Utility(commands.Cog):
 
     async def set_afk_status(self, guild_id: int, user_id: int, reason: str):
         set_at = discord.utils.utcnow().isoformat()
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 """
                 INSERT INTO afk_statuses (guild_id, user_id, reason, set_at)
@@ -142,20 +114,20 @@ class Utility(commands.Cog):
                 """,
                 (guild_id, user_id, reason, set_at),
             )
-        await self.bot.db.commit()
+        await self.bot.storage.commit()
         self.afk_cache[(guild_id, user_id)] = (reason, set_at)
 
     async def clear_afk_status(self, guild_id: int, user_id: int):
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 "DELETE FROM afk_statuses WHERE guild_id = ? AND user_id = ?",
                 (guild_id, user_id),
             )
-        await self.bot.db.commit()
+        await self.bot.storage.commit()
         self.afk_cache.pop((guild_id, user_id), None)
 
     async def list_user_reminders(self, user_id: int):
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.read() as db, db.cursor() as cursor:
             await cursor.execute(
                 """
                 SELECT id, guild_id, channel_id, remind_at, reason, recurring_seconds, delivery_failures, disabled, last_error
@@ -180,7 +152,7 @@ class Utility(commands.Cog):
         reason: str,
         recurring_seconds: Optional[int] = None,
     ) -> int:
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 """
                 INSERT INTO reminders (user_id, channel_id, guild_id, remind_at, reason, recurring_seconds)
@@ -189,7 +161,7 @@ class Utility(commands.Cog):
                 (user_id, channel_id, guild_id, remind_at.isoformat(), reason, recurring_seconds),
             )
             reminder_id = cursor.lastrowid
-        await self.bot.db.commit()
+        await self.bot.storage.commit()
         return reminder_id
 
     help_group = app_commands.Group(name="help", description="Get help with the bot's commands.")
@@ -599,13 +571,13 @@ class Utility(commands.Cog):
     @reminders_group.command(name="cancel", description="Cancel one reminder by id.")
     @app_commands.describe(reminder_id="The reminder id shown by /reminders list.")
     async def reminders_cancel(self, interaction: discord.Interaction, reminder_id: int):
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 "DELETE FROM reminders WHERE id = ? AND user_id = ?",
                 (reminder_id, interaction.user.id),
             )
             deleted = cursor.rowcount
-        await self.bot.db.commit()
+        await self.bot.storage.commit()
 
         if deleted:
             await interaction.response.send_message(f"Reminder `{reminder_id}` canceled.", ephemeral=True)
@@ -623,7 +595,7 @@ class Utility(commands.Cog):
             )
             return
         new_time = discord.utils.utcnow() + timedelta(seconds=seconds)
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 """
                 UPDATE reminders
@@ -633,7 +605,7 @@ class Utility(commands.Cog):
                 (new_time.isoformat(), reminder_id, interaction.user.id),
             )
             updated = cursor.rowcount
-        await self.bot.db.commit()
+        await self.bot.storage.commit()
         if updated:
             await interaction.response.send_message(
                 f"Reminder `{reminder_id}` snoozed for `{delay.lower()}`.",
@@ -644,10 +616,10 @@ class Utility(commands.Cog):
 
     @reminders_group.command(name="clear", description="Clear all of your reminders.")
     async def reminders_clear(self, interaction: discord.Interaction):
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute("DELETE FROM reminders WHERE user_id = ?", (interaction.user.id,))
             deleted = cursor.rowcount
-        await self.bot.db.commit()
+        await self.bot.storage.commit()
         await interaction.response.send_message(f"Cleared {deleted} reminder(s).", ephemeral=True)
 
     @app_commands.command(name="afk", description="Set or update your AFK status in this server.")
@@ -663,11 +635,8 @@ class Utility(commands.Cog):
         await self.clear_afk_status(interaction.guild_id, interaction.user.id)
         await interaction.response.send_message("Your AFK status has been cleared.", ephemeral=True)
 
-    @commands.Cog.listener("on_message")
-    async def afk_message_listener(self, message: discord.Message):
-        if message.author.bot or not message.guild:
-            return
-
+    async def afk_stage(self, context: MessageContext):
+        message = context.message
         own_status = await self.get_afk_status(message.guild.id, message.author.id)
         if own_status:
             await self.clear_afk_status(message.guild.id, message.author.id)
@@ -707,7 +676,7 @@ class Utility(commands.Cog):
     @tasks.loop(seconds=REMINDER_POLL_SECONDS)
     async def reminder_loop(self):
         now = discord.utils.utcnow().isoformat()
-        async with self.bot.db.cursor() as cursor:
+        async with self.bot.storage.write().cursor() as cursor:
             await cursor.execute(
                 """
                 SELECT id, user_id, channel_id, reason, remind_at, recurring_seconds, delivery_failures
@@ -763,48 +732,48 @@ class Utility(commands.Cog):
                         delivered = False
                         failure_reason = "failed to send the reminder in the fallback channel"
 
-            async with self.bot.db.cursor() as cursor:
-                if delivered and recurring_seconds:
-                    next_time = discord.utils.parse_time(remind_at)
-                    while next_time <= discord.utils.utcnow():
-                        next_time += timedelta(seconds=recurring_seconds)
-                    await cursor.execute(
+            if delivered and recurring_seconds:
+                next_time = discord.utils.parse_time(remind_at)
+                while next_time <= discord.utils.utcnow():
+                    next_time += timedelta(seconds=recurring_seconds)
+                update = (
+                    """
+                    UPDATE reminders
+                    SET remind_at = ?, delivery_failures = 0, disabled = 0, last_error = NULL
+                    WHERE id = ?
+                    """,
+                    (next_time.isoformat(), reminder_id),
+                )
+            elif delivered:
+                update = ("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+            else:
+                next_failures = delivery_failures + 1
+                if next_failures >= MAX_REMINDER_DELIVERY_FAILURES:
+                    update = (
                         """
                         UPDATE reminders
-                        SET remind_at = ?, delivery_failures = 0, disabled = 0, last_error = NULL
+                        SET delivery_failures = ?, disabled = 1, last_error = ?
                         WHERE id = ?
                         """,
-                        (next_time.isoformat(), reminder_id),
+                        (next_failures, failure_reason, reminder_id),
                     )
-                elif delivered:
-                    await cursor.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
                 else:
-                    next_failures = delivery_failures + 1
-                    if next_failures >= MAX_REMINDER_DELIVERY_FAILURES:
-                        await cursor.execute(
-                            """
-                            UPDATE reminders
-                            SET delivery_failures = ?, disabled = 1, last_error = ?
-                            WHERE id = ?
-                            """,
-                            (next_failures, failure_reason, reminder_id),
-                        )
-                    else:
-                        retry_at = discord.utils.utcnow() + self.reminder_retry_delay(next_failures)
-                        await cursor.execute(
-                            """
-                            UPDATE reminders
-                            SET remind_at = ?, delivery_failures = ?, last_error = ?
-                            WHERE id = ?
-                            """,
-                            (retry_at.isoformat(), next_failures, failure_reason, reminder_id),
-                        )
-        await self.bot.db.commit()
+                    retry_at = discord.utils.utcnow() + self.reminder_retry_delay(next_failures)
+                    update = (
+                        """
+                        UPDATE reminders
+                        SET remind_at = ?, delivery_failures = ?, last_error = ?
+                        WHERE id = ?
+                        """,
+                        (retry_at.isoformat(), next_failures, failure_reason, reminder_id),
+                    )
+
+            # Written per reminder: if a later send raises, the ones already delivered must not be sent again.
+            await self.bot.storage.transaction(execute_statements, [update])
 
     @reminder_loop.before_loop
     async def before_reminder_loop(self):
         await self.bot.wait_until_ready()
-        await self.setup_database()
 
 
 async def setup(bot: commands.Bot):
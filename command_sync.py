@@ -0,0 +1,74 @@
+import hashlib
+import json
+import logging
+import sqlite3
+from typing import Iterable, List, Optional
+
+import discord
+from discord import app_commands
+
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+
+
+def tree_fingerprint(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Stable sha256 of the payload ``tree.sync(guild=guild)`` would upload."""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command.get("type", 1), command["name"]),
+    )
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _scope(guild: Optional[discord.abc.Snowflake]) -> str:
+    return GLOBAL_SCOPE if guild is None else f"guild:{guild.id}"
+
+
+def _store_fingerprint(connection: sqlite3.Connection, scope: str, fingerprint: str, synced_at: str) -> None:
+    connection.execute(
+        """
+        INSERT INTO command_sync_state (scope, fingerprint, synced_at) VALUES (?, ?, ?)
+        ON CONFLICT(scope) DO UPDATE SET fingerprint = excluded.fingerprint, synced_at = excluded.synced_at
+        """,
+        (scope, fingerprint, synced_at),
+    )
+
+
+async def _stored_fingerprint(bot, scope: str) -> Optional[str]:
+    async with bot.storage.read() as db, db.execute(
+        "SELECT fingerprint FROM command_sync_state WHERE scope = ?", (scope,)
+    ) as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else None
+
+
+async def sync_commands(bot, dev_guild_ids: Iterable[int] = (), *, force: bool = False) -> List[str]:
+    """Sync the command tree only where its fingerprint changed. Returns the scopes that were synced.
+
+    With development guilds configured, global commands are copied into each of
+    those guilds and synced there (guild syncs apply instantly); otherwise the
+    global tree is synced.
+    """
+    tree = bot.tree
+    guilds: List[Optional[discord.Object]] = [discord.Object(id=guild_id) for guild_id in dev_guild_ids]
+    for guild in guilds:
+        tree.copy_global_to(guild=guild)
+    if not guilds:
+        guilds = [None]
+
+    synced = []
+    for guild in guilds:
+        scope = _scope(guild)
+        fingerprint = tree_fingerprint(tree, guild=guild)
+        if not force and await _stored_fingerprint(bot, scope) == fingerprint:
+            logger.info("Slash commands for %s are unchanged; skipping sync.", scope)
+            continue
+
+        await tree.sync(guild=guild)
+        await bot.storage.transaction(_store_fingerprint, scope, fingerprint, discord.utils.utcnow().isoformat())
+        synced.append(scope)
+        logger.info("Synced slash commands for %s (%s).", scope, fingerprint[:12])
+    return synced
@@ -5,13 +5,29 @@ from typing import Any
 
 from dotenv import load_dotenv
 
+from antispam import DEFAULT_MAX_KEYS as DEFAULT_SPAM_TRACKER_MAX_KEYS
+from guild_config import DEFAULT_MAX_ENTRIES as DEFAULT_GUILD_CONFIG_CACHE_MAX_ENTRIES
+from logging_setup import DEFAULT_LOG_LEVEL, LOG_FORMAT_TEXT as DEFAULT_LOG_FORMAT
+from loop_watchdog import DEFAULT_STALL_MS as DEFAULT_LOOP_STALL_MS
+from message_log import (
+    DEFAULT_MAX_QUEUE as DEFAULT_MESSAGE_LOG_QUEUE_MAX,
+    OVERFLOW_DROP_OLDEST as DEFAULT_MESSAGE_LOG_OVERFLOW,
+)
+from metrics import DEFAULT_METRICS_HOST
+from query_stats import DEFAULT_SLOW_QUERY_MS
+from retention import (
+    DEFAULT_CHAT_USAGE_RETENTION_DAYS,
+    DEFAULT_DISABLED_REMINDER_RETENTION_DAYS,
+    DEFAULT_MESSAGE_LOG_RETENTION_DAYS,
+)
+from storage import DEFAULT_COMMIT_WINDOW_MS, DEFAULT_READERS as DEFAULT_DATABASE_READERS
+
 
 CONFIG_PATH = Path("config.json")
 DEFAULT_API_BASE = "https://api.openai.com/v1"
 DEFAULT_CHAT_MODEL = "gpt-4o-mini"
 DEFAULT_ALLOWED_MODELS = [DEFAULT_CHAT_MODEL, "gpt-4o"]
 
-
 def _load_file_config() -> dict[str, Any]:
     if not CONFIG_PATH.exists():
         return {}
@@ -34,6 +50,17 @@ def _get_bool(name: str, default: bool, file_config: dict[str, Any]) -> bool:
     return bool(value)
 
 
+def _get_int(name: str, default: int, file_config: dict[str, Any]) -> int:
+    value = os.getenv(name)
+    if value is None:
+        value = file_config.get(name, default)
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
 def _get_list(name: str, default: list[str], file_config: dict[str, Any]) -> list[str]:
     value = os.getenv(name)
     if value is None:
@@ -63,4 +90,31 @@ def load_runtime_config() -> dict[str, Any]:
         "ALLOWED_CHAT_MODELS": _get_list("ALLOWED_CHAT_MODELS", DEFAULT_ALLOWED_MODELS, file_config),
         "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", file_config.get("GOOGLE_API_KEY", "")),
         "GOOGLE_CSE_ID": os.getenv("GOOGLE_CSE_ID", file_config.get("GOOGLE_CSE_ID", "")),
+        "LAZY_COGS": _get_list("LAZY_COGS", [], file_config),
+        "DEV_GUILD_IDS": [int(item) for item in _get_list("DEV_GUILD_IDS", [], file_config) if item.isdigit()],
+        "SPAM_TRACKER_MAX_KEYS": _get_int("SPAM_TRACKER_MAX_KEYS", DEFAULT_SPAM_TRACKER_MAX_KEYS, file_config),
+        "GUILD_CONFIG_CACHE_MAX_ENTRIES": _get_int(
+            "GUILD_CONFIG_CACHE_MAX_ENTRIES", DEFAULT_GUILD_CONFIG_CACHE_MAX_ENTRIES, file_config
+        ),
+        "MESSAGE_LOG_QUEUE_MAX": _get_int("MESSAGE_LOG_QUEUE_MAX", DEFAULT_MESSAGE_LOG_QUEUE_MAX, file_config),
+        "MESSAGE_LOG_OVERFLOW": os.getenv(
+            "MESSAGE_LOG_OVERFLOW", file_config.get("MESSAGE_LOG_OVERFLOW", DEFAULT_MESSAGE_LOG_OVERFLOW)
+        ).strip().lower(),
+        "DATABASE_READERS": _get_int("DATABASE_READERS", DEFAULT_DATABASE_READERS, file_config),
+        "COMMIT_WINDOW_MS": _get_int("COMMIT_WINDOW_MS", DEFAULT_COMMIT_WINDOW_MS, file_config),
+        "MESSAGE_LOG_RETENTION_DAYS": _get_int(
+            "MESSAGE_LOG_RETENTION_DAYS", DEFAULT_MESSAGE_LOG_RETENTION_DAYS, file_config
+        ),
+        "CHAT_USAGE_RETENTION_DAYS": _get_int("CHAT_USAGE_RETENTION_DAYS", DEFAULT_CHAT_USAGE_RETENTION_DAYS, file_config),
+        "DISABLED_REMINDER_RETENTION_DAYS": _get_int(
+            "DISABLED_REMINDER_RETENTION_DAYS", DEFAULT_DISABLED_REMINDER_RETENTION_DAYS, file_config
+        ),
+        "SLOW_QUERY_MS": _get_int("SLOW_QUERY_MS", DEFAULT_SLOW_QUERY_MS, file_config),
+        "LOOP_STALL_MS": _get_int("LOOP_STALL_MS", DEFAULT_LOOP_STALL_MS, file_config),
+        "METRICS_HOST": os.getenv("METRICS_HOST", file_config.get("METRICS_HOST", DEFAULT_METRICS_HOST)).strip(),
+        "METRICS_PORT": _get_int("METRICS_PORT", 0, file_config),
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", file_config.get("LOG_LEVEL", DEFAULT_LOG_LEVEL)).strip().upper(),
+        "LOG_FORMAT": os.getenv("LOG_FORMAT", file_config.get("LOG_FORMAT", DEFAULT_LOG_FORMAT)).strip().lower(),
+        "LOG_SAMPLE_RATES": _get_list("LOG_SAMPLE_RATES", [], file_config),
+        "GATEWAY_RECORD_PATH": os.getenv("GATEWAY_RECORD_PATH", file_config.get("GATEWAY_RECORD_PATH", "")).strip(),
     }
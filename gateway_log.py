@@ -0,0 +1,265 @@
+import gzip
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import IO, Any, Dict, Iterator, List, Optional
+
+import discord
+
+
+logger = logging.getLogger(__name__)
+
+FLUSH_EVERY = 256
+# Deletes of older messages get a fresh number; replay only keeps this many messages around anyway.
+MAX_MESSAGE_IDS = 10_000
+MESSAGE_CREATE = "message_create"
+MESSAGE_DELETE = "message_delete"
+MEMBER_JOIN = "member_join"
+MEMBER_REMOVE = "member_remove"
+INTERACTION = "interaction"
+EVENT_KINDS = (MESSAGE_CREATE, MESSAGE_DELETE, MEMBER_JOIN, MEMBER_REMOVE, INTERACTION)
+
+_SPECIAL = re.compile(
+    r"<(?P<kind>@[!&]?|#)(?P<id>\d+)>"
+    r"|(?P<invite>\S*(?:discord\.gg/|discord\.com/invite/)\S*)"
+    r"|(?P<url>https?://\S+)",
+    re.IGNORECASE,
+)
+_WORD = re.compile(r"[^\W\d_]+")
+_DIGITS = re.compile(r"\d")
+_SUBCOMMAND_TYPES = (
+    discord.AppCommandOptionType.subcommand.value,
+    discord.AppCommandOptionType.subcommand_group.value,
+)
+
+
+def _scrub(text: str) -> str:
+    return _DIGITS.sub("0", _WORD.sub(lambda match: "x" * len(match.group()), text))
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, f"{mode}t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Anonymizer:
+    """Replaces Discord IDs with small sequential numbers and text with same-shaped filler.
+
+    Mentions keep their syntax (with the replacement ID), links and invites
+    keep a recognizable shape so link filters still fire on replay, and every
+    other word becomes a run of ``x`` of the same length. The mapping only
+    lives in memory, so a log cannot be joined back to real accounts.
+    Message IDs are numbered separately and only the latest
+    ``max_message_ids`` are remembered, so the map does not grow with traffic.
+    """
+
+    def __init__(self, max_message_ids: int = MAX_MESSAGE_IDS):
+        self.max_message_ids = max(int(max_message_ids), 1)
+        self._ids: Dict[int, int] = {}
+        self._message_ids: "OrderedDict[int, int]" = OrderedDict()
+        self._messages = 0
+
+    def id(self, value: Optional[int]) -> Optional[int]:
+        if value is None:
+            return None
+        mapped = self._ids.get(value)
+        if mapped is None:
+            mapped = self._ids[value] = len(self._ids) + 1
+        return mapped
+
+    def message_id(self, value: int, forget: bool = False) -> int:
+        """Sequential number for a message; ``forget`` drops the mapping, for deletes."""
+        mapped = self._message_ids.pop(value, None) if forget else self._message_ids.get(value)
+        if mapped is not None:
+            return mapped
+        self._messages += 1
+        if not forget:
+            self._message_ids[value] = self._messages
+            if len(self._message_ids) > self.max_message_ids:
+                self._message_ids.popitem(last=False)
+        return self._messages
+
+    def _special(self, match: re.Match) -> str:
+        if match.group("invite"):
+            return "discord.gg/invite"
+        if match.group("url"):
+            return "https://example.com/link"
+        return f"<{match.group('kind')}{self.id(int(match.group('id')))}>"
+
+    def text(self, content: str) -> str:
+        parts = []
+        position = 0
+        for match in _SPECIAL.finditer(content):
+            parts.append(_scrub(content[position : match.start()]))
+            parts.append(self._special(match))
+            position = match.end()
+        parts.append(_scrub(content[position:]))
+        return "".join(parts)
+
+    def option(self, option: Dict[str, Any]) -> Any:
+        value = option.get("value")
+        if option.get("type") in (
+            discord.AppCommandOptionType.user.value,
+            discord.AppCommandOptionType.channel.value,
+            discord.AppCommandOptionType.role.value,
+            discord.AppCommandOptionType.mentionable.value,
+        ):
+            return self.id(int(value))
+        if isinstance(value, str):
+            return self.text(value)
+        return value
+
+
+def _interaction_command(data: Dict[str, Any], anonymizer: Anonymizer) -> tuple[str, Dict[str, Any]]:
+    names = [data.get("name", "")]
+    options = data.get("options") or []
+    while len(options) == 1 and options[0].get("type") in _SUBCOMMAND_TYPES:
+        names.append(options[0]["name"])
+        options = options[0].get("options") or []
+    return " ".join(names), {option["name"]: anonymizer.option(option) for option in options}
+
+
+class GatewayRecorder:
+    """Appends anonymized gateway events to a JSON lines log (gzip-compressed when the path ends in ``.gz``).
+
+    Each line is ``{"t": seconds since recording started, "k": kind, "d": data}``.
+    Lines are buffered and handed to a writer thread every ``FLUSH_EVERY``
+    events and on close, so the listeners never touch the file themselves.
+    """
+
+    def __init__(self, path: str, anonymizer: Optional[Anonymizer] = None):
+        self.path = path
+        self.anonymizer = anonymizer or Anonymizer()
+        self.events = 0
+        self._started = time.monotonic()
+        self._buffer: List[str] = []
+        self._file: Optional[IO[str]] = None
+        self._batches: "queue.SimpleQueue[Optional[List[str]]]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+
+    def attach(self, bot: discord.Client) -> None:
+        bot.add_listener(self.on_message, "on_message")
+        bot.add_listener(self.on_raw_message_delete, "on_raw_message_delete")
+        bot.add_listener(self.on_member_join, "on_member_join")
+        bot.add_listener(self.on_member_remove, "on_member_remove")
+        bot.add_listener(self.on_interaction, "on_interaction")
+
+    def record(self, kind: str, data: Dict[str, Any]) -> None:
+        line = json.dumps({"t": round(time.monotonic() - self._started, 3), "k": kind, "d": data}, separators=(",", ":"))
+        self._buffer.append(line)
+        self.events += 1
+        if len(self._buffer) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        """Hand the buffered lines to the writer thread."""
+        if not self._buffer:
+            return
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_batches, name="gateway-recorder", daemon=True)
+            self._writer.start()
+        self._batches.put(self._buffer)
+        self._buffer = []
+
+    def close(self) -> None:
+        """Flush, then wait for the writer thread to finish and close the file."""
+        self.flush()
+        if self._writer is not None:
+            self._batches.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def _write_batches(self) -> None:
+        while True:
+            lines = self._batches.get()
+            if lines is None:
+                break
+            try:
+                if self._file is None:
+                    self._file = _open(self.path, "a")
+                self._file.write("\n".join(lines) + "\n")
+                self._file.flush()
+            except OSError:
+                logger.exception("Could not write %s gateway events to %s; dropping them.", len(lines), self.path)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def on_message(self, message: discord.Message) -> None:
+        if message.guild is None:
+            return
+        anonymize = self.anonymizer
+        self.record(
+            MESSAGE_CREATE,
+            {
+                "g": anonymize.id(message.guild.id),
+                "c": anonymize.id(message.channel.id),
+                "u": anonymize.id(message.author.id),
+                "m": anonymize.message_id(message.id),
+                "bot": message.author.bot,
+                "text": anonymize.text(message.content),
+                "mentions": [anonymize.id(member.id) for member in message.mentions],
+                "attachments": len(message.attachments),
+                "embeds": len(message.embeds),
+            },
+        )
+
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        if payload.guild_id is None:
+            return
+        anonymize = self.anonymizer
+        self.record(
+            MESSAGE_DELETE,
+            {
+                "g": anonymize.id(payload.guild_id),
+                "c": anonymize.id(payload.channel_id),
+                "m": anonymize.message_id(payload.message_id, forget=True),
+            },
+        )
+
+    async def on_member_join(self, member: discord.Member) -> None:
+        self.record(MEMBER_JOIN, {"g": self.anonymizer.id(member.guild.id), "u": self.anonymizer.id(member.id)})
+
+    async def on_member_remove(self, member: discord.Member) -> None:
+        self.record(MEMBER_REMOVE, {"g": self.anonymizer.id(member.guild.id), "u": self.anonymizer.id(member.id)})
+
+    async def on_interaction(self, interaction: discord.Interaction) -> None:
+        if interaction.type is not discord.InteractionType.application_command or interaction.guild_id is None:
+            return
+        command, options = _interaction_command(interaction.data or {}, self.anonymizer)
+        anonymize = self.anonymizer
+        self.record(
+            INTERACTION,
+            {
+                "g": anonymize.id(interaction.guild_id),
+                "c": anonymize.id(interaction.channel_id),
+                "u": anonymize.id(interaction.user.id),
+                "command": command,
+                "options": options,
+            },
+        )
+
+
+class GatewayEvent:
+    __slots__ = ("offset", "kind", "data")
+
+    def __init__(self, offset: float, kind: str, data: Dict[str, Any]):
+        self.offset = offset
+        self.kind = kind
+        self.data = data
+
+
+def read_events(path: str) -> Iterator[GatewayEvent]:
+    """Events from a recorder log in order; unknown kinds from newer recorders are skipped."""
+    with _open(path, "r") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry["k"] in EVENT_KINDS:
+                yield GatewayEvent(entry["t"], entry["k"], entry["d"])
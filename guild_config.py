@@ -0,0 +1,190 @@
+import asyncio
+import collections
+import functools
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Counter, Dict, Optional, Tuple
+
+from word_matcher import WordMatcher
+
+
+DEFAULT_MAX_ENTRIES = 20000
+
+Key = Tuple[str, int]
+
+
+class Snapshot:
+    """Immutable settings record; subclasses name their fields in ``__slots__``."""
+
+    __slots__ = ()
+
+    def __init__(self, **fields: Any):
+        unknown = set(fields) - set(self.__slots__)
+        if unknown:
+            raise TypeError(f"{type(self).__name__} has no field(s) {', '.join(sorted(unknown))}")
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _values(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self) -> int:
+        return hash((type(self), self._values()))
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class AutomodSettings(Snapshot):
+    __slots__ = (
+        "filter_invites",
+        "filter_links",
+        "filter_floods",
+        "bad_words",
+        "bad_word_matcher",
+        "whitelist_channel_ids",
+        "action",
+    )
+
+    filter_invites: bool
+    filter_links: bool
+    filter_floods: bool
+    bad_words: Tuple[str, ...]
+    bad_word_matcher: WordMatcher
+    whitelist_channel_ids: Tuple[int, ...]
+    action: str
+
+
+class CommunitySettings(Snapshot):
+    __slots__ = (
+        "guild_id",
+        "welcome_channel_id",
+        "goodbye_channel_id",
+        "announcement_channel_id",
+        "modlog_channel_id",
+        "welcome_message",
+        "goodbye_message",
+    )
+
+    guild_id: int
+    welcome_channel_id: Optional[int]
+    goodbye_channel_id: Optional[int]
+    announcement_channel_id: Optional[int]
+    modlog_channel_id: Optional[int]
+    welcome_message: Optional[str]
+    goodbye_message: Optional[str]
+
+
+class ChatPolicy(Snapshot):
+    __slots__ = (
+        "enabled",
+        "cooldown_seconds",
+        "daily_usage_limit",
+        "allowed_channel_ids",
+        "blocked_channel_ids",
+        "allowed_role_ids",
+    )
+
+    enabled: bool
+    cooldown_seconds: int
+    daily_usage_limit: Optional[int]
+    allowed_channel_ids: Tuple[int, ...]
+    blocked_channel_ids: Tuple[int, ...]
+    allowed_role_ids: Tuple[int, ...]
+
+
+class ChatGuildConfig(Snapshot):
+    __slots__ = ("openai_key", "persona")
+
+    openai_key: Optional[str]
+    persona: Optional[str]
+
+
+Loader = Callable[[int], Awaitable[Snapshot]]
+
+
+class GuildConfigCache:
+    """Read-through cache of per-guild settings snapshots, shared by every cog.
+
+    Each cog registers a loader for its section (``"automod"``, ``"chat_policy"``
+    and so on); ``get`` returns the cached snapshot or runs the loader once,
+    however many callers miss at the same time. Writers call ``invalidate``
+    after their commit. A load that was in flight when its key was invalidated
+    still answers the callers already waiting on it but is not cached, so a
+    snapshot read before a write can never outlive it. At most
+    ``max_entries`` snapshots are kept; the least recently used goes first.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max(int(max_entries), 1)
+        self._loaders: Dict[str, Loader] = {}
+        self._snapshots: "OrderedDict[Key, Snapshot]" = OrderedDict()
+        self._loading: Dict[Key, "asyncio.Future[Snapshot]"] = {}
+        self._hits: Counter[str] = collections.Counter()
+        self._misses: Counter[str] = collections.Counter()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def register(self, section: str, loader: Loader) -> None:
+        self._loaders[section] = loader
+
+    def unregister(self, section: str) -> None:
+        self._loaders.pop(section, None)
+        for key in [key for key in self._snapshots if key[0] == section]:
+            del self._snapshots[key]
+        for key in [key for key in self._loading if key[0] == section]:
+            del self._loading[key]
+
+    async def get(self, section: str, guild_id: int) -> Snapshot:
+        key = (section, guild_id)
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None:
+            self._snapshots.move_to_end(key)
+            self._hits[section] += 1
+            return snapshot
+
+        load = self._loading.get(key)
+        if load is None:
+            self._misses[section] += 1
+            load = self._loading[key] = asyncio.ensure_future(self._loaders[section](guild_id))
+            load.add_done_callback(functools.partial(self._loaded, key))
+        else:
+            # Joining a load already in flight costs no query of its own.
+            self._hits[section] += 1
+        # A caller that gives up must not cancel the load for everyone else waiting on it.
+        return await asyncio.shield(load)
+
+    def _loaded(self, key: Key, load: "asyncio.Future[Snapshot]") -> None:
+        # Checked first so a failure nobody is left waiting for is still marked as retrieved.
+        failed = load.cancelled() or load.exception() is not None
+        if self._loading.get(key) is not load:
+            return
+        del self._loading[key]
+        if failed:
+            return
+        self._snapshots[key] = load.result()
+        self._snapshots.move_to_end(key)
+        while len(self._snapshots) > self.max_entries:
+            self._snapshots.popitem(last=False)
+
+    def invalidate(self, section: str, guild_id: int) -> None:
+        key = (section, guild_id)
+        self._snapshots.pop(key, None)
+        self._loading.pop(key, None)
+
+    def cache_stats(self) -> Dict[str, Tuple[int, int]]:
+        return {
+            f"guild_config.{section}": (self._hits[section], self._misses[section]) for section in sorted(self._loaders)
+        }
@@ -0,0 +1,138 @@
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from typing import Dict, Iterable, Optional, TextIO
+
+
+DEFAULT_LOG_LEVEL = "INFO"
+LOG_FORMAT_TEXT = "text"
+LOG_FORMAT_JSON = "json"
+LOG_FORMATS = (LOG_FORMAT_TEXT, LOG_FORMAT_JSON)
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+def parse_sample_rates(items: Iterable[str]) -> Dict[str, int]:
+    """``["cogs.interactions=10"]`` -> ``{"cogs.interactions": 10}``; malformed entries are ignored."""
+    rates = {}
+    for item in items:
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip().isdigit() and int(rate) > 1:
+            rates[name.strip()] = int(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Passes only one in every N records from the configured loggers (and their children).
+
+    The first record is always kept. A kept record carries the number of
+    records dropped since the previous one as ``record.suppressed``. CRITICAL
+    records are never dropped.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _rate_for(self, name: str) -> Optional[tuple[str, int]]:
+        while name:
+            rate = self.rates.get(name)
+            if rate is not None:
+                return name, rate
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.CRITICAL:
+            return True
+        match = self._rate_for(record.name)
+        if match is None:
+            return True
+        name, rate = match
+        with self._lock:
+            seen = self._seen.get(name, 0)
+            self._seen[name] = seen + 1
+        if seen % rate:
+            return False
+        record.suppressed = rate - 1 if seen else 0
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (+{suppressed} similar suppressed)" if suppressed else text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and, when present, the traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler folds the traceback into the message; keep it separate so the JSON output can too.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(
+    level: str = DEFAULT_LOG_LEVEL,
+    log_format: str = LOG_FORMAT_TEXT,
+    sample_rates: Optional[Dict[str, int]] = None,
+    stream: Optional[TextIO] = None,
+) -> logging.handlers.QueueListener:
+    """Route every log record through a queue to a background thread that does the actual writing.
+
+    Callers on the event loop only pay for formatting the message and a queue
+    put; a slow stdout pipe blocks the listener thread instead. Returns the
+    started listener; stop it on shutdown to flush what is still queued.
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if log_format == LOG_FORMAT_JSON else TextFormatter())
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    resolved = logging.getLevelName(level.strip().upper())
+    root.setLevel(resolved if isinstance(resolved, int) else logging.INFO)
+
+    listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    return listener
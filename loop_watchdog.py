@@ -0,0 +1,159 @@
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Deque, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 0.1
+DEFAULT_STALL_MS = 250
+DEFAULT_WINDOW = 1200
+MAX_STACK_FRAMES = 25
+MAX_STALL_REPORTS = 20
+
+
+def _current_task_name(loop: asyncio.AbstractEventLoop) -> Optional[str]:
+    # asyncio keeps the running task per loop in a plain dict; reading it from
+    # another thread is safe under the GIL, unlike asyncio.current_task().
+    current_tasks = getattr(asyncio.tasks, "_current_tasks", None)
+    task = current_tasks.get(loop) if current_tasks is not None else None
+    return task.get_name() if task is not None else None
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class StallReport:
+    __slots__ = ("detected_at", "task_name", "stack", "duration")
+
+    def __init__(self, detected_at: float, task_name: Optional[str], stack: str):
+        self.detected_at = detected_at
+        self.task_name = task_name
+        self.stack = stack
+        self.duration: Optional[float] = None
+
+
+class LoopWatchdog:
+    """Measures event loop lag and captures what is blocking the loop when it stalls.
+
+    A heartbeat task sleeps for ``interval`` and records how late it woke up.
+    A daemon thread checks the heartbeat; once the loop has been silent for
+    longer than ``stall_ms`` it grabs the loop thread's stack and the name of
+    the running task and logs them, while the blocking code is still on the
+    stack. Give tasks descriptive names (for example ``command:tweet``) so a
+    stall can be attributed to the command or listener that caused it.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = DEFAULT_INTERVAL_SECONDS,
+        stall_ms: float = DEFAULT_STALL_MS,
+        window: int = DEFAULT_WINDOW,
+    ):
+        self.interval = interval
+        self.stall_seconds = max(float(stall_ms), 0.0) / 1000
+        self.lags: Deque[float] = collections.deque(maxlen=max(int(window), 1))
+        self.stalls: Deque[StallReport] = collections.deque(maxlen=MAX_STALL_REPORTS)
+        self.stall_count = 0
+        self.max_lag = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._pending: Optional[StallReport] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = self._loop.create_task(self._heartbeat(), name="watchdog-heartbeat")
+        if self.stall_seconds:
+            self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._beat(max(loop.time() - expected, 0.0))
+
+    def _beat(self, lag: float) -> None:
+        self._last_beat = time.monotonic()
+        self.lags.append(lag)
+        if lag > self.max_lag:
+            self.max_lag = lag
+        report, self._pending = self._pending, None
+        if report is not None:
+            report.duration = lag + self.interval
+            logger.warning(
+                "Event loop resumed after a %.0f ms stall in %s.",
+                report.duration * 1000,
+                report.task_name or "an unnamed callback",
+            )
+
+    def _monitor(self) -> None:
+        poll = min(self.interval, self.stall_seconds) / 2
+        while not self._stopped.wait(poll):
+            silent = time.monotonic() - self._last_beat
+            if self._pending is None and silent > self.stall_seconds + self.interval:
+                self._capture(silent)
+
+    def _capture(self, silent: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame)[-MAX_STACK_FRAMES:])
+        report = StallReport(time.time(), _current_task_name(self._loop), stack)
+        self._pending = report
+        self.stalls.append(report)
+        self.stall_count += 1
+        logger.warning(
+            "Event loop blocked for %.0f ms in %s:\n%s",
+            silent * 1000,
+            report.task_name or "an unnamed callback",
+            stack.rstrip(),
+        )
+
+    def percentiles(self) -> Dict[str, float]:
+        ordered = sorted(self.lags)
+        return {
+            "p50": percentile(ordered, 0.50),
+            "p95": percentile(ordered, 0.95),
+            "p99": percentile(ordered, 0.99),
+        }
+
+    def stats(self) -> Dict[str, float]:
+        return {**self.percentiles(), "max": self.max_lag, "samples": len(self.lags), "stalls": self.stall_count}
@@ -1,8 +1,7 @@
 import asyncio
 import os
 import sys
-from collections import defaultdict
-import datetime
+import time
 from pathlib import Path
 from typing import Optional
 import logging
@@ -28,7 +27,8 @@ def _maybe_reexec_into_local_venv() -> None:
     os.execv(str(venv_python), [str(venv_python), __file__, *sys.argv[1:]])
 
 
-_maybe_reexec_into_local_venv()
+if __name__ == "__main__":
+    _maybe_reexec_into_local_venv()
 
 try:
     import aiohttp
@@ -37,7 +37,27 @@ try:
     from discord import app_commands
     from discord.ext import commands, tasks
 
+    from antispam import DEFAULT_MAX_KEYS as DEFAULT_SPAM_TRACKER_MAX_KEYS, BulkDeleter, SpamTracker
+    from cog_loader import LazyCommandTree, discover_app_commands, load_extensions
+    from command_sync import sync_commands
     from config_loader import load_runtime_config
+    from gateway_log import GatewayRecorder
+    from guild_config import DEFAULT_MAX_ENTRIES as DEFAULT_GUILD_CONFIG_CACHE_MAX_ENTRIES, GuildConfigCache
+    from logging_setup import parse_sample_rates, setup_logging
+    from message_log import (
+        DEFAULT_MAX_QUEUE as DEFAULT_MESSAGE_LOG_QUEUE_MAX,
+        INSERT_MESSAGE_SQL,
+        OVERFLOW_DROP_OLDEST,
+        MessageLogWriter,
+    )
+    from loop_watchdog import DEFAULT_STALL_MS, LoopWatchdog
+    from message_pipeline import MessageContext, MessagePipeline
+    from metrics import DEFAULT_METRICS_HOST, MetricsRegistry, MetricsServer, http_trace_config, register_bot_metrics
+    from migrations import migrate
+    from query_stats import DEFAULT_SLOW_QUERY_MS, QueryRecorder
+    from rest_stats import RestRecorder
+    from retention import RetentionPruner, default_policies, enable_incremental_vacuum
+    from storage import DEFAULT_COMMIT_WINDOW_MS, DEFAULT_READERS, Storage
 except ModuleNotFoundError as exc:
     missing_package = exc.name or "a required package"
     print(
@@ -50,8 +70,6 @@ except ModuleNotFoundError as exc:
     )
     sys.exit(1)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 # Constants
@@ -59,17 +77,8 @@ DATABASE_PATH = "database/main.db"
 COGS_FOLDER = "cogs"
 SPAM_THRESHOLD = 5
 SPAM_TIMEFRAME = 7  # seconds
-MESSAGE_LOG_BATCH_SIZE = 50
-MESSAGE_LOG_FLUSH_SECONDS = 2
-MESSAGE_LOG_RETENTION_DAYS = 30
-
-
-config = load_runtime_config()
-TOKEN = config["DISCORD_TOKEN"]
-
-if not TOKEN:
-    logger.critical("FATAL ERROR: DISCORD_TOKEN not found in config.")
-    sys.exit(1)
+SPAM_SWEEP_SECONDS = 60
+RETENTION_INTERVAL_MINUTES = 15
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -77,212 +86,287 @@ intents.members = True
 
 
 class FunBot(commands.Bot):
-    def __init__(self, runtime_config: dict):
-        super().__init__(command_prefix="!", intents=intents)
+    def __init__(self, runtime_config: dict, database_path: str = DATABASE_PATH):
+        rest_stats = RestRecorder()
+        super().__init__(
+            command_prefix="!", intents=intents, tree_cls=LazyCommandTree, http_trace=rest_stats.trace_config()
+        )
         self.config = runtime_config
+        self.rest_stats = rest_stats
+        self.rest_stats.install(self.http)
+        self.tree.on_error = self.on_app_command_error
+        self.storage = Storage(
+            database_path,
+            readers=runtime_config.get("DATABASE_READERS", DEFAULT_READERS),
+            commit_window_ms=runtime_config.get("COMMIT_WINDOW_MS", DEFAULT_COMMIT_WINDOW_MS),
+            recorder=QueryRecorder(slow_ms=runtime_config.get("SLOW_QUERY_MS", DEFAULT_SLOW_QUERY_MS)),
+        )
         self.db: Optional[aiosqlite.Connection] = None
+        self.guild_config = GuildConfigCache(
+            max_entries=runtime_config.get("GUILD_CONFIG_CACHE_MAX_ENTRIES", DEFAULT_GUILD_CONFIG_CACHE_MAX_ENTRIES)
+        )
         self.http_session: Optional[aiohttp.ClientSession] = None
-        self.user_message_timestamps = defaultdict(list)
-        self.message_log_queue: asyncio.Queue[Optional[tuple[int, int, int, str]]] = asyncio.Queue()
-        self.message_log_task: Optional[asyncio.Task] = None
+        self.spam_tracker = SpamTracker(
+            SPAM_THRESHOLD,
+            SPAM_TIMEFRAME,
+            max_keys=runtime_config.get("SPAM_TRACKER_MAX_KEYS", DEFAULT_SPAM_TRACKER_MAX_KEYS),
+        )
+        self.spam_deleter = BulkDeleter()
+        self.message_log = MessageLogWriter(
+            self._flush_message_logs,
+            max_queue=runtime_config.get("MESSAGE_LOG_QUEUE_MAX", DEFAULT_MESSAGE_LOG_QUEUE_MAX),
+            overflow=runtime_config.get("MESSAGE_LOG_OVERFLOW", OVERFLOW_DROP_OLDEST),
+        )
+        self.retention: Optional[RetentionPruner] = None
+        self.cog_load_timings: dict[str, float] = {}
+        self.message_pipeline = MessagePipeline()
+        self.message_pipeline.register("message-log", self._log_message_stage, order=0, guild_only=True)
+        self.message_pipeline.register("anti-spam", self._anti_spam_stage, order=10, guild_only=True)
         self.start_time = discord.utils.utcnow()
+        self.watchdog = LoopWatchdog(stall_ms=runtime_config.get("LOOP_STALL_MS", DEFAULT_STALL_MS))
+        self.metrics = MetricsRegistry()
+        self.command_latency = self.metrics.histogram(
+            "milo_command_duration_seconds", "Slash command latency.", ("command", "outcome")
+        )
+        self.http_latency = self.metrics.histogram(
+            "milo_http_request_duration_seconds", "Outbound HTTP request latency per upstream host.", ("host", "status")
+        )
+        register_bot_metrics(self.metrics, self)
+        self.metrics_server: Optional[MetricsServer] = None
+        self.gateway_recorder: Optional[GatewayRecorder] = None
 
     async def setup_hook(self):
         """Initialize database and load cogs."""
-        # Ensure database directory exists
-        os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
+        self.watchdog.start()
+        await self.open_database()
+        self.http_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=30), trace_configs=[http_trace_config(self.http_latency)]
+        )
+        self.retention = RetentionPruner(self.storage, default_policies(self.config))
+        self._retention_task.start()
+        self._sweep_spam_tracker_task.start()
 
-        # Connect to database
-        self.db = await aiosqlite.connect(DATABASE_PATH)
-        await self.db.execute("PRAGMA journal_mode=WAL")
-        await self.db.execute("PRAGMA foreign_keys=ON")
-        logger.info("Successfully connected to the database.")
-        self.http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
-
-        # Initialize database schema
-        async with self.db.cursor() as cursor:
-            await cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS messages (
-                    message_id INTEGER PRIMARY KEY,
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    timestamp TEXT
-                )
-            """
-            )
-            await cursor.execute(
-                "CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp)"
+        if self.config.get("METRICS_PORT"):
+            server = MetricsServer(
+                self.metrics, self.config.get("METRICS_HOST") or DEFAULT_METRICS_HOST, self.config["METRICS_PORT"]
             )
-        await self.db.commit()
-        self.message_log_task = asyncio.create_task(self._message_log_worker())
-        self._prune_message_logs_task.start()
-
-        # Load all cogs
-        for filename in os.listdir(COGS_FOLDER):
-            if filename.endswith(".py"):
-                try:
-                    await self.load_extension(f"{COGS_FOLDER}.{filename[:-3]}")
-                    logger.info(f"Loaded cog: {filename}")
-                except Exception as e:
-                    logger.error(f"Failed to load cog {filename}: {e}")
-
-        # Sync slash commands
-        await self.tree.sync()
-        logger.info("Slash commands have been synced.")
+            try:
+                await server.start()
+            except OSError:
+                logger.exception("Could not start the metrics endpoint; continuing without it.")
+            else:
+                self.metrics_server = server
+
+        if self.config.get("GATEWAY_RECORD_PATH"):
+            self.gateway_recorder = GatewayRecorder(self.config["GATEWAY_RECORD_PATH"])
+            self.gateway_recorder.attach(self)
+            logger.warning("Recording anonymized gateway events to %s.", self.config["GATEWAY_RECORD_PATH"])
+
+        await self._load_cogs()
+
+        # Lazy cogs are missing from the local tree, and syncing it would unregister their commands.
+        if self.tree.lazy_extensions:
+            logger.warning("Lazy cogs are enabled; skipping slash command sync. Use /owner sync after command changes.")
+        else:
+            await sync_commands(self, self.config.get("DEV_GUILD_IDS", []))
+
+    async def open_database(self):
+        """Open storage, migrate the schema and start the message log writer."""
+        # Connect the writer and the read-only pool
+        self.db = await self.storage.open()
+        await enable_incremental_vacuum(self.storage)
+        logger.info("Successfully connected to the database.")
+
+        # Bring every component's schema up to date in one transaction
+        await self.storage.transaction(migrate)
+        self.message_log.start()
+
+    async def _load_cogs(self):
+        """Load eager cogs concurrently and register lazy ones on the command tree."""
+        started = time.perf_counter()
+        lazy_names = {name.lower() for name in self.config.get("LAZY_COGS", [])}
+        eager = []
+        for path in sorted(Path(COGS_FOLDER).glob("*.py")):
+            extension = f"{COGS_FOLDER}.{path.stem}"
+            if path.stem.lower() not in lazy_names:
+                eager.append(extension)
+                continue
+            try:
+                commands_found = discover_app_commands(path)
+            except SyntaxError:
+                logger.exception("Could not scan lazy cog %s; loading it eagerly.", path.name)
+                eager.append(extension)
+                continue
+            self.tree.register_lazy(extension, commands_found)
+            logger.info("Deferred cog %s until one of %s is used.", path.stem, ", ".join(commands_found) or "its commands")
+
+        self.cog_load_timings = await load_extensions(self, eager)
+        breakdown = ", ".join(
+            f"{extension.split('.')[-1]}={seconds * 1000:.1f}ms"
+            for extension, seconds in sorted(self.cog_load_timings.items(), key=lambda item: item[1], reverse=True)
+        )
+        logger.info(
+            "Loaded %s/%s cogs in %.1f ms (%s).",
+            len(self.cog_load_timings),
+            len(eager),
+            (time.perf_counter() - started) * 1000,
+            breakdown,
+        )
 
     async def on_ready(self):
-        print(f"Logged in as {self.user.name}")
-        print(f"Bot ID: {self.user.id}")
-        print("------")
+        logger.info("Logged in as %s (ID: %s).", self.user.name, self.user.id)
 
-    async def _flush_message_logs(self, batch: list[tuple[int, int, int, str]]) -> None:
-        if not batch or not self.db:
+    def observe_command(self, interaction: discord.Interaction, outcome: str) -> None:
+        started = interaction.extras.get("started_at")
+        if started is None or interaction.command is None:
             return
-        async with self.db.cursor() as cursor:
-            await cursor.executemany(
-                "INSERT OR IGNORE INTO messages (message_id, guild_id, user_id, timestamp) VALUES (?, ?, ?, ?)",
-                batch,
+        self.command_latency.observe(
+            time.perf_counter() - started, command=interaction.command.qualified_name, outcome=outcome
+        )
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        self.observe_command(interaction, "ok")
+
+    async def on_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        self.observe_command(interaction, "error")
+        if isinstance(error, app_commands.CommandOnCooldown):
+            await interaction.response.send_message(
+                f"This command is on cooldown. Please try again in {error.retry_after:.2f}s.", ephemeral=True
+            )
+        elif isinstance(error, app_commands.MissingPermissions):
+            await interaction.response.send_message(
+                "You don't have the required permissions to use this command.", ephemeral=True
             )
-        await self.db.commit()
+        elif isinstance(error, app_commands.CheckFailure):
+            await interaction.response.send_message(
+                "A check failed, you might not be able to use this command.", ephemeral=True
+            )
+        else:
+            logger.error("Unhandled app command error.", exc_info=error)
+            if not interaction.response.is_done():
+                await interaction.response.send_message(
+                    "An unexpected error occurred. Please try again later.", ephemeral=True
+                )
+            else:
+                await interaction.followup.send("An unexpected error occurred. Please try again later.", ephemeral=True)
 
-    async def _message_log_worker(self) -> None:
-        batch: list[tuple[int, int, int, str]] = []
-        loop = asyncio.get_running_loop()
-        try:
-            while True:
-                item = await self.message_log_queue.get()
-                if item is None:
-                    break
-                batch.append(item)
-                deadline = loop.time() + MESSAGE_LOG_FLUSH_SECONDS
-                while len(batch) < MESSAGE_LOG_BATCH_SIZE:
-                    timeout = deadline - loop.time()
-                    if timeout <= 0:
-                        break
-                    try:
-                        item = await asyncio.wait_for(self.message_log_queue.get(), timeout=timeout)
-                    except asyncio.TimeoutError:
-                        break
-                    if item is None:
-                        await self._flush_message_logs(batch)
-                        return
-                    batch.append(item)
-                await self._flush_message_logs(batch)
-                batch.clear()
-        except asyncio.CancelledError:
-            if batch:
-                await self._flush_message_logs(batch)
-            raise
-
-        if batch:
-            await self._flush_message_logs(batch)
+    def cache_stats(self) -> dict[str, tuple[int, int]]:
+        return self.guild_config.cache_stats()
+
+    def memory_stats(self) -> dict[str, tuple[int, object]]:
+        return {
+            "guild_config": (len(self.guild_config), self.guild_config),
+            "spam_tracker": (len(self.spam_tracker), self.spam_tracker),
+            "spam_deleter": (self.spam_deleter.pending_channels, self.spam_deleter),
+            "message_log": (self.message_log.depth, self.message_log),
+        }
+
+    async def _flush_message_logs(self, batch: list[tuple[int, int, int]]) -> None:
+        if not batch or not self.db:
+            return
+        async with self.storage.write().cursor() as cursor:
+            await cursor.executemany(INSERT_MESSAGE_SQL, batch)
+        await self.storage.commit()
 
     async def on_message(self, message: discord.Message):
-        """Handle incoming messages for logging and spam detection."""
-        if message.author.bot:
+        """Run the message pipeline, then process prefix commands."""
+        context = await self.message_pipeline.dispatch(message)
+        if context is None:
+            return
+
+        await self.process_commands(message)
+
+    async def _log_message_stage(self, context: MessageContext):
+        if not self.db:
+            return
+        message = context.message
+        self.message_log.submit((message.id, context.guild.id, context.author.id))
+
+    async def _anti_spam_stage(self, context: MessageContext):
+        message = context.message
+        spam_key = (context.guild.id, context.channel.id, context.author.id)
+        if not self.spam_tracker.hit(spam_key, message.id):
             return
 
-        # Log message to database
-        if message.guild and self.db:
+        me = context.guild.me
+        if me is None or not context.channel.permissions_for(me).manage_messages:
             try:
-                await self.message_log_queue.put(
-                    (message.id, message.guild.id, message.author.id, message.created_at.isoformat())
+                await message.channel.send(
+                    f"Warning for {message.author.mention}: Spam detected, but I don't have permission to delete messages."
                 )
-            except Exception as e:
-                logger.error(f"Error logging message to database: {e}")
-
-        # Anti-spam detection
-        now = discord.utils.utcnow()
-        spam_key = (message.guild.id if message.guild else 0, message.channel.id, message.author.id)
-        user_timestamps = self.user_message_timestamps[spam_key]
-        user_timestamps.append(now)
-
-        # Clean old timestamps
-        user_timestamps = [t for t in user_timestamps if (now - t).total_seconds() < SPAM_TIMEFRAME]
-        self.user_message_timestamps[spam_key] = user_timestamps
-
-        if len(user_timestamps) > SPAM_THRESHOLD:
-            if len(user_timestamps) == SPAM_THRESHOLD + 1:
-                try:
-                    await message.channel.send(
-                        f"{message.author.mention}, please slow down! Your recent messages will be deleted.",
-                        delete_after=10,
-                    )
-
-                    def is_spam_message(m):
-                        return m.author == message.author and (now - m.created_at).total_seconds() < SPAM_TIMEFRAME
-
-                    try:
-                        await message.delete()
-                    except discord.HTTPException:
-                        pass
-                    await message.channel.purge(limit=SPAM_THRESHOLD + 1, check=is_spam_message, before=message)
-                except discord.Forbidden:
-                    await message.channel.send(
-                        f"Warning for {message.author.mention}: Spam detected, but I don't have permission to delete messages."
-                    )
-                except Exception as e:
-                    logger.error(f"An error occurred during spam cleanup: {e}")
-
-        # Process commands
-        await self.process_commands(message)
+            except discord.HTTPException:
+                pass
+            return
+
+        try:
+            await message.channel.send(
+                f"{message.author.mention}, please slow down! Your recent messages will be deleted.",
+                delete_after=10,
+            )
+        except discord.HTTPException as e:
+            logger.error("An error occurred during spam cleanup: %s", e)
+        self.spam_deleter.queue(context.channel, self.spam_tracker.message_ids(spam_key))
 
     async def close(self):
-        self._prune_message_logs_task.cancel()
-        if self.message_log_task:
-            await self.message_log_queue.put(None)
-            try:
-                await self.message_log_task
-            except Exception:
-                logger.exception("Error while flushing queued message logs during shutdown.")
+        self._retention_task.cancel()
+        self._sweep_spam_tracker_task.cancel()
+        await self.spam_deleter.flush_all()
+        try:
+            await self.message_log.close()
+        except Exception:
+            logger.exception("Error while flushing queued message logs during shutdown.")
+        if self.metrics_server:
+            await self.metrics_server.stop()
+            self.metrics_server = None
         if self.http_session and not self.http_session.closed:
             await self.http_session.close()
+        if self.gateway_recorder:
+            await asyncio.to_thread(self.gateway_recorder.close)
+        await self.watchdog.stop()
         if self.db:
-            await self.db.close()
-            print("Database connection closed.")
+            await self.storage.close()
+            self.db = None
+            logger.info("Database connection closed.")
         await super().close()
 
-    @tasks.loop(hours=24)
-    async def _prune_message_logs_task(self):
-        if not self.db:
+    @tasks.loop(minutes=RETENTION_INTERVAL_MINUTES)
+    async def _retention_task(self):
+        if not self.retention:
             return
-        cutoff = (discord.utils.utcnow() - datetime.timedelta(days=MESSAGE_LOG_RETENTION_DAYS)).isoformat()
-        async with self.db.cursor() as cursor:
-            await cursor.execute("DELETE FROM messages WHERE timestamp < ?", (cutoff,))
-        await self.db.commit()
+        removed = await self.retention.run()
+        if any(removed.values()):
+            logger.info("Retention pruned %s.", ", ".join(f"{count} {table}" for table, count in removed.items() if count))
+        await self.retention.reclaim_space()
 
-    @_prune_message_logs_task.before_loop
-    async def _before_prune_message_logs(self):
+    @_retention_task.before_loop
+    async def _before_retention(self):
         await self.wait_until_ready()
 
+    @tasks.loop(seconds=SPAM_SWEEP_SECONDS)
+    async def _sweep_spam_tracker_task(self):
+        removed = self.spam_tracker.sweep()
+        if removed:
+            logger.debug(
+                "Swept %s idle anti-spam keys; %s still tracked.", removed, self.spam_tracker.tracked_keys
+            )
 
-bot = FunBot(config)
 
+def main():
+    config = load_runtime_config()
+    log_listener = setup_logging(config["LOG_LEVEL"], config["LOG_FORMAT"], parse_sample_rates(config["LOG_SAMPLE_RATES"]))
+    try:
+        token = config["DISCORD_TOKEN"]
+        if not token:
+            logger.critical("FATAL ERROR: DISCORD_TOKEN not found in config.")
+            sys.exit(1)
 
-@bot.tree.error
-async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
-    if isinstance(error, app_commands.CommandOnCooldown):
-        await interaction.response.send_message(
-            f"This command is on cooldown. Please try again in {error.retry_after:.2f}s.", ephemeral=True
-        )
-    elif isinstance(error, app_commands.MissingPermissions):
-        await interaction.response.send_message(
-            "You don't have the required permissions to use this command.", ephemeral=True
-        )
-    elif isinstance(error, app_commands.CheckFailure):
-        await interaction.response.send_message(
-            "A check failed, you might not be able to use this command.", ephemeral=True
-        )
-    else:
-        print(f"An unhandled app command error occurred: {error}")
-        if not interaction.response.is_done():
-            await interaction.response.send_message(
-                "An unexpected error occurred. Please try again later.", ephemeral=True
-            )
-        else:
-            await interaction.followup.send("An unexpected error occurred. Please try again later.", ephemeral=True)
+        bot = FunBot(config)
+        logger.info("Configuration loaded. Starting bot...")
+        # discord.py would otherwise attach its own synchronous stderr handler.
+        bot.run(token, log_handler=None)
+    finally:
+        log_listener.stop()
 
 
-print("Configuration loaded. Starting bot...")
-bot.run(TOKEN)
+if __name__ == "__main__":
+    main()
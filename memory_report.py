@@ -0,0 +1,156 @@
+import asyncio
+import collections
+import itertools
+import sys
+import tracemalloc
+import types
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+DEFAULT_SAMPLE_LIMIT = 1000
+MAX_DEPTH = 32
+TRACEMALLOC_FRAMES = 10
+# Objects from these packages are counted shallowly; following them would walk into the client's whole cache.
+OPAQUE_PACKAGES = frozenset({"discord", "aiohttp", "asyncio", "aiosqlite", "sqlite3", "logging", "threading"})
+_ATOMIC = (str, bytes, bytearray, int, float, complex, bool, type(None))
+_SKIPPED = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.CoroutineType,
+    types.FrameType,
+    types.CodeType,
+)
+
+MemoryEntry = Tuple[str, Optional[int], int]
+
+
+def _descends_into(obj: Any) -> bool:
+    return type(obj).__module__.split(".")[0] not in OPAQUE_PACKAGES
+
+
+def _attributes(obj: Any) -> List[Any]:
+    values = [vars(obj)] if hasattr(obj, "__dict__") else []
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if name not in ("__dict__", "__weakref__") and hasattr(obj, name):
+                values.append(getattr(obj, name))
+    return values
+
+
+def _children(obj: Any) -> Tuple[int, Iterator[Tuple[Any, ...]]]:
+    """``(item count, iterator of item groups)``; dict items are (key, value) pairs."""
+    if isinstance(obj, dict):
+        return len(obj), iter(obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset, collections.deque)):
+        return len(obj), ((item,) for item in obj)
+    if _descends_into(obj):
+        attributes = _attributes(obj)
+        return len(attributes), ((value,) for value in attributes)
+    return 0, iter(())
+
+
+def deep_sizeof(root: Any, sample_limit: int = DEFAULT_SAMPLE_LIMIT) -> int:
+    """Approximate bytes held by ``root`` and everything it references.
+
+    Containers with more than ``sample_limit`` items are measured on their
+    first ``sample_limit`` items and scaled up, so the cost stays bounded for
+    large maps. Objects reachable from several places are counted once, and
+    discord.py, asyncio and similar library objects are counted without their
+    references.
+    """
+    seen = set()
+
+    def measure(obj: Any, depth: int) -> float:
+        if id(obj) in seen or isinstance(obj, _SKIPPED):
+            return 0
+        seen.add(id(obj))
+        size = sys.getsizeof(obj, 0)
+        if isinstance(obj, _ATOMIC) or depth >= MAX_DEPTH:
+            return size
+        count, groups = _children(obj)
+        if not count:
+            return size
+        sampled = 0
+        child_bytes = 0.0
+        for group in itertools.islice(groups, sample_limit):
+            sampled += 1
+            child_bytes += sum(measure(child, depth + 1) for child in group)
+        return size + (child_bytes * count / sampled if sampled else 0)
+
+    return int(measure(root, 0))
+
+
+def tracked_structures(bot) -> Dict[str, Tuple[Optional[int], Any]]:
+    """``{name: (entries, object)}`` from the bot and every cog that defines ``memory_stats()``."""
+    structures = {}
+    sources = [("bot", bot)] + [(name.lower(), cog) for name, cog in bot.cogs.items()]
+    for prefix, source in sources:
+        memory_stats = getattr(source, "memory_stats", None)
+        if memory_stats is None:
+            continue
+        for name, (entries, obj) in memory_stats().items():
+            structures[f"{prefix}.{name}"] = (entries, obj)
+    return structures
+
+
+def memory_report(bot, sample_limit: int = DEFAULT_SAMPLE_LIMIT) -> List[MemoryEntry]:
+    """``(name, entries, approximate bytes)`` for each tracked structure, largest first."""
+    report = [
+        (name, entries, deep_sizeof(obj, sample_limit)) for name, (entries, obj) in tracked_structures(bot).items()
+    ]
+    report.sort(key=lambda entry: entry[2], reverse=True)
+    return report
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def format_memory_report(entries: Iterable[MemoryEntry]) -> str:
+    lines = [f"{'entries':>9} {'size':>10}  structure"]
+    for name, count, size in entries:
+        lines.append(f"{'-' if count is None else count:>9} {_format_bytes(size):>10}  {name}")
+    return "\n".join(lines)
+
+
+def start_allocation_tracing() -> bool:
+    """Start tracemalloc; returns False if it was already tracing."""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    return True
+
+
+def stop_allocation_tracing() -> bool:
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    return True
+
+
+def _top_allocations(limit: int) -> str:
+    statistics = tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+    ).statistics("lineno")
+    lines = [f"{'size':>10} {'blocks':>8}  location"]
+    for stat in statistics[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{_format_bytes(stat.size):>10} {stat.count:>8}  {frame.filename}:{frame.lineno}")
+    traced, peak = tracemalloc.get_traced_memory()
+    lines.append(f"traced {_format_bytes(traced)}, peak {_format_bytes(peak)}")
+    return "\n".join(lines)
+
+
+async def top_allocations(limit: int = 10) -> Optional[str]:
+    """Top allocation sites since tracing started, or None when tracemalloc is not tracing."""
+    if not tracemalloc.is_tracing():
+        return None
+    # Snapshots of a busy process take a while to group; keep that off the event loop.
+    return await asyncio.to_thread(_top_allocations, limit)
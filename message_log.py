@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Sequence
+
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_DROP_OLDEST = "drop-oldest"
+OVERFLOW_SAMPLE = "sample"
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_SAMPLE)
+DEFAULT_MAX_QUEUE = 10000
+MIN_BATCH_SIZE = 50
+MAX_BATCH_SIZE = 500
+FLUSH_INTERVAL_SECONDS = 2.0
+SAMPLE_EVERY = 10
+
+INSERT_MESSAGE_SQL = "INSERT OR IGNORE INTO messages (message_id, guild_id, user_id) VALUES (?, ?, ?)"
+
+FlushCallback = Callable[[List[Sequence[Any]]], Awaitable[None]]
+
+
+class MessageLogWriter:
+    """Bounded, batching writer for message log rows.
+
+    Rows are buffered in memory and written by one background task. Under light
+    traffic a batch waits up to ``flush_interval`` seconds to reach ``min_batch``
+    rows; as the backlog grows, batches grow with it up to ``max_batch`` and are
+    flushed without waiting. When the buffer is full the overflow policy decides
+    what is lost: ``drop-oldest`` evicts the oldest row for every new one, while
+    ``sample`` keeps only one in every ``SAMPLE_EVERY`` overflowing rows.
+    """
+
+    def __init__(
+        self,
+        flush: FlushCallback,
+        *,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        overflow: str = OVERFLOW_DROP_OLDEST,
+        min_batch: int = MIN_BATCH_SIZE,
+        max_batch: int = MAX_BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            logger.warning("Unknown message log overflow policy %r; using %s.", overflow, OVERFLOW_DROP_OLDEST)
+            overflow = OVERFLOW_DROP_OLDEST
+        self._flush = flush
+        self.max_queue = max(int(max_queue), 1)
+        self.overflow = overflow
+        self.min_batch = max(int(min_batch), 1)
+        self.max_batch = max(int(max_batch), self.min_batch)
+        self.flush_interval = flush_interval
+        self._buffer: Deque[Sequence[Any]] = deque()
+        self._wakeup = asyncio.Event()
+        self._writing = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._overflowed = 0
+
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_seconds_total = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self._buffer)
+
+    def batch_size(self) -> int:
+        return max(self.min_batch, min(self.max_batch, len(self._buffer)))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def submit(self, row: Sequence[Any]) -> bool:
+        """Queue one row without awaiting. Returns False when the row was dropped."""
+        if self._closing:
+            return False
+
+        if len(self._buffer) >= self.max_queue:
+            self._overflowed += 1
+            if self.overflow == OVERFLOW_SAMPLE and self._overflowed % SAMPLE_EVERY:
+                self.dropped += 1
+                return False
+            self._buffer.popleft()
+            self.dropped += 1
+
+        self._buffer.append(row)
+        if len(self._buffer) == 1 or len(self._buffer) >= self.min_batch:
+            self._wakeup.set()
+        return True
+
+    @asynccontextmanager
+    async def paused(self) -> AsyncIterator[None]:
+        """Wait for the batch being written, then hold back further batches until the block exits.
+
+        Rows submitted meanwhile stay queued (subject to the overflow policy).
+        """
+        async with self._writing:
+            yield
+
+    async def close(self) -> None:
+        """Stop accepting rows and wait until everything buffered is written."""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._buffer:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            if len(self._buffer) < self.min_batch and not self._closing:
+                self._wakeup.clear()
+                timer = loop.call_later(self.flush_interval, self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    timer.cancel()
+
+            async with self._writing:
+                await self._write_batch(self.batch_size())
+
+    async def _write_batch(self, size: int) -> None:
+        count = min(size, len(self._buffer))
+        batch = [self._buffer.popleft() for _ in range(count)]
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        try:
+            await self._flush(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Failed to write %s message log rows.", len(batch))
+            return
+
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.rows_written += len(batch)
+        self.flush_seconds_total += elapsed
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "depth": self.depth,
+            "capacity": self.max_queue,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "rows_per_flush": self.rows_written / self.flushes if self.flushes else 0.0,
+            "last_flush_seconds": self.last_flush_seconds,
+            "max_flush_seconds": self.max_flush_seconds,
+            "average_flush_seconds": self.flush_seconds_total / self.flushes if self.flushes else 0.0,
+        }
@@ -0,0 +1,141 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+
+logger = logging.getLogger(__name__)
+
+SLOW_STAGE_SECONDS = 0.5
+
+StageHandler = Callable[["MessageContext"], Awaitable[None]]
+SettingsLoader = Callable[[int], Awaitable[Any]]
+
+
+class MessageContext:
+    """State computed once per message and shared by every pipeline stage."""
+
+    __slots__ = ("message", "guild", "author", "channel", "stopped", "_lowered", "_permissions", "_settings")
+
+    def __init__(self, message: discord.Message):
+        self.message = message
+        self.guild = message.guild
+        self.author = message.author
+        self.channel = message.channel
+        self.stopped = False
+        self._lowered: Optional[str] = None
+        self._permissions: Optional[discord.Permissions] = None
+        self._settings: Dict[str, Any] = {}
+
+    @property
+    def lowered(self) -> str:
+        if self._lowered is None:
+            self._lowered = (self.message.content or "").lower()
+        return self._lowered
+
+    @property
+    def permissions(self) -> Optional[discord.Permissions]:
+        if self._permissions is None and isinstance(self.author, discord.Member):
+            self._permissions = self.author.guild_permissions
+        return self._permissions
+
+    async def guild_settings(self, name: str, loader: SettingsLoader) -> Any:
+        if name not in self._settings:
+            self._settings[name] = await loader(self.guild.id)
+        return self._settings[name]
+
+    def stop(self) -> None:
+        self.stopped = True
+
+
+class StageTiming:
+    __slots__ = ("calls", "errors", "total_seconds", "max_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, elapsed: float, failed: bool) -> None:
+        self.calls += 1
+        self.total_seconds += elapsed
+        if elapsed > self.max_seconds:
+            self.max_seconds = elapsed
+        if failed:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        average = self.total_seconds / self.calls if self.calls else 0.0
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_seconds": self.total_seconds,
+            "average_seconds": average,
+            "max_seconds": self.max_seconds,
+        }
+
+
+class _Stage:
+    __slots__ = ("name", "handler", "order", "guild_only")
+
+    def __init__(self, name: str, handler: StageHandler, order: int, guild_only: bool):
+        self.name = name
+        self.handler = handler
+        self.order = order
+        self.guild_only = guild_only
+
+
+class MessagePipeline:
+    """Runs every human message through one ordered list of stages."""
+
+    def __init__(self):
+        self._stages: List[_Stage] = []
+        self._timings: Dict[str, StageTiming] = {}
+
+    def register(self, name: str, handler: StageHandler, *, order: int = 100, guild_only: bool = False) -> None:
+        self.unregister(name)
+        self._stages.append(_Stage(name, handler, order, guild_only))
+        self._stages.sort(key=lambda stage: stage.order)
+        self._timings.setdefault(name, StageTiming())
+
+    def unregister(self, name: str) -> None:
+        self._stages = [stage for stage in self._stages if stage.name != name]
+
+    @property
+    def stage_names(self) -> List[str]:
+        return [stage.name for stage in self._stages]
+
+    def prefilter(self, message: discord.Message) -> Optional[MessageContext]:
+        if message.author.bot:
+            return None
+        return MessageContext(message)
+
+    async def dispatch(self, message: discord.Message) -> Optional[MessageContext]:
+        context = self.prefilter(message)
+        if context is None:
+            return None
+
+        for stage in self._stages:
+            if context.stopped:
+                break
+            if stage.guild_only and context.guild is None:
+                continue
+
+            failed = False
+            started = time.perf_counter()
+            try:
+                await stage.handler(context)
+            except Exception:
+                failed = True
+                logger.exception("Message pipeline stage %s failed.", stage.name)
+            elapsed = time.perf_counter() - started
+            self._timings.setdefault(stage.name, StageTiming()).record(elapsed, failed)
+            if elapsed > SLOW_STAGE_SECONDS:
+                logger.warning("Message pipeline stage %s took %.3fs.", stage.name, elapsed)
+
+        return context
+
+    def timings(self) -> Dict[str, Dict[str, float]]:
+        return {name: timing.snapshot() for name, timing in self._timings.items()}
@@ -0,0 +1,371 @@
+import logging
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import aiohttp
+from aiohttp import web
+
+from memory_report import tracked_structures
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+QUANTILES = {"p50": "0.5", "p95": "0.95", "p99": "0.99"}
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        return ()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield self.name, self._labels(key), value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield self.name, self._labels(key), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        # Per series: one slot per bucket (non-cumulative), then sum.
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0.0] * (len(self.buckets) + 1)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-1] += value
+
+    def count(self, **labels: str) -> float:
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0.0
+
+    def samples(self):
+        for key, series in sorted(self._series.items()):
+            labels = self._labels(key)
+            cumulative = 0.0
+            for bound, hits in zip(self.buckets, series):
+                cumulative += hits
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, series[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class CallbackMetric(_Metric):
+    """Metric whose samples are read from ``collect()`` at scrape time.
+
+    Used to export counters that components already keep, such as queue depth
+    or cache hits, without threading a metrics object through them.
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, collect: Callable[[], Iterable[Sample]]):
+        super().__init__(name, documentation)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self):
+        for labels, value in self._collect():
+            yield self.name, labels, value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self, name: str, documentation: str, collect: Callable[[], Iterable[Sample]], kind: str = "gauge"
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, kind, collect))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                logger.exception("Failed to collect metric %s.", metric.name)
+        return "\n".join(lines) + "\n"
+
+
+def http_trace_config(histogram: Histogram) -> aiohttp.TraceConfig:
+    """aiohttp trace hooks that observe outbound request latency per upstream host."""
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.started_at = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        histogram.observe(
+            time.perf_counter() - context.started_at,
+            host=params.url.host or "",
+            status=f"{params.response.status // 100}xx",
+        )
+
+    async def on_request_exception(session, context, params):
+        histogram.observe(time.perf_counter() - context.started_at, host=params.url.host or "", status="error")
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+class MetricsServer:
+    """Serves ``GET /metrics`` in Prometheus text format with aiohttp's web server."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = DEFAULT_METRICS_HOST, port: int = 0):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.registry.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        addresses = self._runner.addresses
+        if addresses:
+            self.port = addresses[0][1]
+        logger.info("Serving metrics on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def _scalar(read: Callable[[], float]) -> Callable[[], List[Sample]]:
+    return lambda: [({}, read())]
+
+
+def register_bot_metrics(registry: MetricsRegistry, bot) -> None:
+    """Export the counters that the bot's components already keep, read at scrape time.
+
+    The bot and its cogs take part by defining ``cache_stats()`` returning ``{name: (hits, misses)}``.
+    """
+    storage = bot.storage
+    storage_metrics = (
+        ("milo_db_reads_total", "Read-only connections borrowed.", "counter", "reads"),
+        ("milo_db_read_waits_total", "Reads that waited for an idle connection.", "counter", "read_waits"),
+        ("milo_db_read_wait_seconds_total", "Time spent waiting for an idle read connection.", "counter", "read_wait_seconds"),
+        ("milo_db_commit_requests_total", "Commits requested by callers.", "counter", "commit_requests"),
+        ("milo_db_commits_total", "Group commits executed.", "counter", "commits"),
+        ("milo_db_commit_seconds_total", "Time spent in COMMIT.", "counter", "commit_seconds_total"),
+        ("milo_db_units_total", "Units of work run in the writer thread.", "counter", "units"),
+        ("milo_db_failed_units_total", "Units of work that raised and were rolled back.", "counter", "failed_units"),
+    )
+    for name, documentation, kind, attribute in storage_metrics:
+        registry.callback(name, documentation, _scalar(lambda attribute=attribute: getattr(storage, attribute)), kind)
+    registry.callback(
+        "milo_db_idle_readers", "Read-only connections currently idle.", _scalar(lambda: storage.stats()["idle_readers"])
+    )
+
+    recorder = getattr(storage, "recorder", None)
+    if recorder is not None:
+
+        def statement_samples(field: str) -> Callable[[], List[Sample]]:
+            return lambda: [
+                ({"statement": statement}, getattr(stats, field)) for statement, stats in list(recorder.statements.items())
+            ]
+
+        registry.callback("milo_db_query_calls_total", "SQL statements executed.", statement_samples("calls"), "counter")
+        registry.callback("milo_db_query_errors_total", "SQL statements that raised.", statement_samples("errors"), "counter")
+        registry.callback(
+            "milo_db_query_seconds_total",
+            "Time spent executing SQL statements and fetching their rows.",
+            statement_samples("total_seconds"),
+            "counter",
+        )
+
+    watchdog = getattr(bot, "watchdog", None)
+    if watchdog is not None:
+        registry.callback(
+            "milo_event_loop_lag_seconds",
+            "Recent event loop lag percentiles.",
+            lambda: [({"quantile": QUANTILES[name]}, value) for name, value in watchdog.percentiles().items()],
+        )
+        registry.callback("milo_event_loop_max_lag_seconds", "Largest event loop lag seen.", _scalar(lambda: watchdog.max_lag))
+        registry.callback(
+            "milo_event_loop_stalls_total", "Event loop stalls over the threshold.", _scalar(lambda: watchdog.stall_count), "counter"
+        )
+
+    rest_stats = getattr(bot, "rest_stats", None)
+    if rest_stats is not None:
+
+        def route_samples(field: str) -> Callable[[], List[Sample]]:
+            return lambda: [
+                ({"route": route, "cog": cog}, getattr(stats, field)) for (route, cog), stats in list(rest_stats.routes.items())
+            ]
+
+        registry.callback("milo_rest_calls_total", "Discord REST calls.", route_samples("calls"), "counter")
+        registry.callback("milo_rest_errors_total", "Discord REST calls that raised.", route_samples("errors"), "counter")
+        registry.callback(
+            "milo_rest_rate_limited_total", "429 responses from Discord, including retried ones.", route_samples("rate_limited"), "counter"
+        )
+        registry.callback(
+            "milo_rest_bucket_wait_seconds_total",
+            "Time REST calls spent held back by discord.py rate limit buckets.",
+            route_samples("wait_seconds"),
+            "counter",
+        )
+        registry.callback(
+            "milo_rest_http_seconds_total", "Time REST calls spent on the wire.", route_samples("http_seconds"), "counter"
+        )
+
+    message_log = bot.message_log
+    registry.callback("milo_message_log_queue_depth", "Message log rows waiting to be written.", _scalar(lambda: message_log.depth))
+    registry.callback("milo_message_log_queue_capacity", "Maximum buffered message log rows.", _scalar(lambda: message_log.max_queue))
+    for name, documentation, attribute in (
+        ("milo_message_log_dropped_total", "Message log rows dropped by the overflow policy.", "dropped"),
+        ("milo_message_log_failed_total", "Message log rows lost to failed flushes.", "failed"),
+        ("milo_message_log_rows_written_total", "Message log rows written.", "rows_written"),
+        ("milo_message_log_flushes_total", "Message log batches written.", "flushes"),
+        ("milo_message_log_flush_seconds_total", "Time spent writing message log batches.", "flush_seconds_total"),
+    ):
+        registry.callback(name, documentation, _scalar(lambda attribute=attribute: getattr(message_log, attribute)), "counter")
+
+    registry.callback("milo_spam_tracker_keys", "Keys tracked by the anti-spam tracker.", _scalar(lambda: bot.spam_tracker.tracked_keys))
+
+    def stage_samples(field: str) -> Callable[[], List[Sample]]:
+        return lambda: [
+            ({"stage": stage}, timing[field]) for stage, timing in sorted(bot.message_pipeline.timings().items())
+        ]
+
+    registry.callback("milo_message_stage_calls_total", "Message pipeline stage runs.", stage_samples("calls"), "counter")
+    registry.callback("milo_message_stage_errors_total", "Message pipeline stage failures.", stage_samples("errors"), "counter")
+    registry.callback(
+        "milo_message_stage_seconds_total", "Time spent in message pipeline stages.", stage_samples("total_seconds"), "counter"
+    )
+
+    def memory_entries() -> List[Sample]:
+        return [
+            ({"structure": name}, entries)
+            for name, (entries, _) in sorted(tracked_structures(bot).items())
+            if entries is not None
+        ]
+
+    registry.callback("milo_memory_entries", "Entries in in-process caches and state maps.", memory_entries)
+
+    def cache_samples(index: int) -> Callable[[], List[Sample]]:
+        def collect() -> List[Sample]:
+            samples = []
+            for source in [bot, *bot.cogs.values()]:
+                cache_stats = getattr(source, "cache_stats", None)
+                if cache_stats is not None:
+                    samples.extend(({"cache": name}, counts[index]) for name, counts in sorted(cache_stats().items()))
+            return samples
+
+        return collect
+
+    registry.callback("milo_cache_hits_total", "Cache lookups served from memory.", cache_samples(0), "counter")
+    registry.callback("milo_cache_misses_total", "Cache lookups that went to the database.", cache_samples(1), "counter")
@@ -0,0 +1,333 @@
+import logging
+import sqlite3
+from typing import Callable, Dict, List
+
+
+logger = logging.getLogger(__name__)
+
+Migration = Callable[[sqlite3.Connection], None]
+
+
+def _columns(connection: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in connection.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+# Version 1 of every component accepts databases created before schema versioning
+# existed: it probes the live schema and brings it up to date, so it is safe on
+# both fresh and legacy files.
+
+
+def _core_v1(connection: sqlite3.Connection) -> None:
+    # Message times are derived from the snowflake id; older files also stored an
+    # ISO timestamp column with its own index.
+    legacy = "timestamp" in _columns(connection, "messages")
+    if legacy:
+        connection.execute("DROP INDEX IF EXISTS idx_messages_timestamp")
+        connection.execute("ALTER TABLE messages RENAME TO messages_legacy")
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS messages (
+            message_id INTEGER PRIMARY KEY,
+            guild_id INTEGER,
+            user_id INTEGER
+        )
+        """
+    )
+    if legacy:
+        connection.execute(
+            """
+            INSERT OR IGNORE INTO messages (message_id, guild_id, user_id)
+            SELECT message_id, guild_id, user_id FROM messages_legacy
+            """
+        )
+        connection.execute("DROP TABLE messages_legacy")
+        logger.info("Migrated message log to snowflake-derived timestamps.")
+
+
+def _core_v2(connection: sqlite3.Connection) -> None:
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS command_sync_state (
+            scope TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            synced_at TEXT NOT NULL
+        )
+        """
+    )
+
+
+def _economy_v1(connection: sqlite3.Connection) -> None:
+    columns = _columns(connection, "users")
+    legacy = bool(columns) and "guild_id" not in columns
+    if legacy:
+        connection.execute("ALTER TABLE users RENAME TO users_legacy")
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            balance INTEGER NOT NULL DEFAULT 100,
+            PRIMARY KEY (guild_id, user_id)
+        )
+        """
+    )
+    if legacy:
+        connection.execute(
+            """
+            INSERT OR IGNORE INTO users (guild_id, user_id, balance)
+            SELECT DISTINCT COALESCE(messages.guild_id, 0), legacy.user_id, legacy.balance
+            FROM users_legacy AS legacy
+            LEFT JOIN messages
+                ON messages.user_id = legacy.user_id
+               AND messages.guild_id IS NOT NULL
+            """
+        )
+        logger.info("Migrated global economy balances to per-guild records.")
+
+
+def _farming_v1(connection: sqlite3.Connection) -> None:
+    columns = _columns(connection, "farms")
+    legacy = bool(columns) and "guild_id" not in columns
+    if legacy:
+        connection.execute("ALTER TABLE farms RENAME TO farms_legacy")
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS farms (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            crop TEXT,
+            plant_time TEXT,
+            land_type INTEGER DEFAULT 1,
+            level INTEGER DEFAULT 1,
+            xp INTEGER DEFAULT 0,
+            PRIMARY KEY (guild_id, user_id)
+        )
+        """
+    )
+    if legacy:
+        connection.execute(
+            """
+            INSERT OR IGNORE INTO farms (guild_id, user_id, crop, plant_time, land_type, level, xp)
+            SELECT DISTINCT
+                COALESCE(messages.guild_id, 0),
+                legacy.user_id,
+                legacy.crop,
+                legacy.plant_time,
+                legacy.land_type,
+                legacy.level,
+                legacy.xp
+            FROM farms_legacy AS legacy
+            LEFT JOIN messages
+                ON messages.user_id = legacy.user_id
+               AND messages.guild_id IS NOT NULL
+            """
+        )
+        logger.info("Migrated global farm data to per-guild records.")
+
+
+def _chat_v1(connection: sqlite3.Connection) -> None:
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS guild_configs (
+            guild_id INTEGER PRIMARY KEY,
+            openai_key TEXT,
+            persona TEXT
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_policies (
+            guild_id INTEGER PRIMARY KEY,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            cooldown_seconds INTEGER NOT NULL DEFAULT 8,
+            daily_usage_limit INTEGER,
+            allowed_channel_ids TEXT,
+            blocked_channel_ids TEXT,
+            allowed_role_ids TEXT
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_usage (
+            guild_id INTEGER NOT NULL,
+            usage_date TEXT NOT NULL,
+            usage_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, usage_date)
+        )
+        """
+    )
+    if "persona" not in _columns(connection, "guild_configs"):
+        connection.execute("ALTER TABLE guild_configs ADD COLUMN persona TEXT")
+
+
+def _moderation_v1(connection: sqlite3.Connection) -> None:
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS automod_settings (
+            guild_id INTEGER PRIMARY KEY,
+            filter_invites INTEGER NOT NULL DEFAULT 0,
+            filter_links INTEGER NOT NULL DEFAULT 0,
+            bad_words TEXT,
+            whitelist_channel_ids TEXT,
+            action TEXT NOT NULL DEFAULT 'delete'
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS moderation_warnings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            moderator_id INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_moderation_warnings_guild_user_created_at
+        ON moderation_warnings(guild_id, user_id, created_at DESC)
+        """
+    )
+
+
+def _moderation_v2(connection: sqlite3.Connection) -> None:
+    connection.execute("ALTER TABLE automod_settings ADD COLUMN filter_floods INTEGER NOT NULL DEFAULT 0")
+
+
+def _community_v1(connection: sqlite3.Connection) -> None:
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id INTEGER PRIMARY KEY,
+            welcome_channel_id INTEGER,
+            goodbye_channel_id INTEGER,
+            announcement_channel_id INTEGER,
+            modlog_channel_id INTEGER,
+            welcome_message TEXT,
+            goodbye_message TEXT
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scheduled_announcements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            author_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            send_at TEXT NOT NULL,
+            interval_seconds INTEGER
+        )
+        """
+    )
+    columns = _columns(connection, "scheduled_announcements")
+    if "delivery_failures" not in columns:
+        connection.execute("ALTER TABLE scheduled_announcements ADD COLUMN delivery_failures INTEGER NOT NULL DEFAULT 0")
+    if "disabled" not in columns:
+        connection.execute("ALTER TABLE scheduled_announcements ADD COLUMN disabled INTEGER NOT NULL DEFAULT 0")
+    if "last_error" not in columns:
+        connection.execute("ALTER TABLE scheduled_announcements ADD COLUMN last_error TEXT")
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_announcements_due ON scheduled_announcements(disabled, send_at)"
+    )
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_scheduled_announcements_guild_send_at ON scheduled_announcements(guild_id, send_at)"
+    )
+
+
+def _utility_v1(connection: sqlite3.Connection) -> None:
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            channel_id INTEGER,
+            guild_id INTEGER,
+            remind_at TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            recurring_seconds INTEGER,
+            delivery_failures INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS afk_statuses (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            set_at TEXT NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        )
+        """
+    )
+    columns = _columns(connection, "reminders")
+    if "recurring_seconds" not in columns:
+        connection.execute("ALTER TABLE reminders ADD COLUMN recurring_seconds INTEGER")
+    if "delivery_failures" not in columns:
+        connection.execute("ALTER TABLE reminders ADD COLUMN delivery_failures INTEGER NOT NULL DEFAULT 0")
+    if "disabled" not in columns:
+        connection.execute("ALTER TABLE reminders ADD COLUMN disabled INTEGER NOT NULL DEFAULT 0")
+    if "last_error" not in columns:
+        connection.execute("ALTER TABLE reminders ADD COLUMN last_error TEXT")
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders(disabled, remind_at)")
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_reminders_user_remind_at ON reminders(user_id, remind_at)")
+
+
+# Ordered migrations per component. Append new steps to the end of a list; never
+# edit or reorder a step that has shipped. Components run in this order, and the
+# legacy economy and farming steps read the core messages table.
+MIGRATIONS: Dict[str, List[Migration]] = {
+    "core": [_core_v1, _core_v2],
+    "economy": [_economy_v1],
+    "farming": [_farming_v1],
+    "chat": [_chat_v1],
+    "moderation": [_moderation_v1, _moderation_v2],
+    "community": [_community_v1],
+    "utility": [_utility_v1],
+}
+
+
+def migrate(connection: sqlite3.Connection, registry: Dict[str, List[Migration]] = MIGRATIONS) -> Dict[str, int]:
+    """Apply pending migrations. Returns the new version of every component that changed.
+
+    Meant to run as one unit of work, so a failing step leaves the whole schema
+    untouched. An up-to-date database costs a single SELECT.
+    """
+    try:
+        versions = dict(connection.execute("SELECT component, version FROM schema_version").fetchall())
+    except sqlite3.OperationalError:
+        connection.execute(
+            "CREATE TABLE schema_version (component TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+        versions = {}
+
+    applied: Dict[str, int] = {}
+    for component, steps in registry.items():
+        current = versions.get(component, 0)
+        if current > len(steps):
+            raise RuntimeError(
+                f"Database schema for {component} is at version {current}, newer than this build ({len(steps)})."
+            )
+        if current == len(steps):
+            continue
+
+        for step in steps[current:]:
+            step(connection)
+        connection.execute(
+            """
+            INSERT INTO schema_version (component, version) VALUES (?, ?)
+            ON CONFLICT(component) DO UPDATE SET version = excluded.version
+            """,
+            (component, len(steps)),
+        )
+        applied[component] = len(steps)
+        logger.info("Migrated %s schema from version %s to %s.", component, current, len(steps))
+
+    return applied
@@ -0,0 +1,247 @@
+import functools
+import logging
+import re
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import aiosqlite
+from aiosqlite.context import contextmanager  # Private as well; see AIOSQLITE_INTERNALS.
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_MS = 100
+# Private aiosqlite members the instrumented wrappers call into, on top of building ``aiosqlite.Cursor``
+# by hand. Storage checks them when it opens a connection; requirements.txt pins the tested range.
+AIOSQLITE_INTERNALS = ("_execute", "_conn", "_execute_fetchall")
+DEFAULT_MAX_STATEMENTS = 500
+OTHER_STATEMENTS = "(other statements)"
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+SORT_KEYS = ("total_seconds", "average_seconds", "max_seconds", "calls")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace, literals and ``IN (?, ?, ...)`` lists so equivalent statements share one entry."""
+    normalized = _STRING.sub("?", sql)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("IN (?)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+class QueryStats:
+    __slots__ = ("calls", "errors", "rows", "total_seconds", "max_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, elapsed: float, failed: bool) -> None:
+        self.calls += 1
+        self.total_seconds += elapsed
+        if elapsed > self.max_seconds:
+            self.max_seconds = elapsed
+        if failed:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_seconds": self.total_seconds,
+            "average_seconds": self.total_seconds / self.calls if self.calls else 0.0,
+            "max_seconds": self.max_seconds,
+        }
+
+
+class QueryRecorder:
+    """Per-statement timings, keyed by normalized SQL.
+
+    At most ``max_statements`` distinct statements are tracked; anything past
+    that is folded into a single catch-all entry so dynamic SQL cannot grow
+    the table without bound.
+    """
+
+    def __init__(self, slow_ms: float = DEFAULT_SLOW_QUERY_MS, max_statements: int = DEFAULT_MAX_STATEMENTS):
+        self.slow_seconds = max(float(slow_ms), 0.0) / 1000
+        self.max_statements = max(int(max_statements), 1)
+        self.statements: Dict[str, QueryStats] = {}
+        self.plans: Dict[str, str] = {}
+
+    def _stats(self, statement: str) -> QueryStats:
+        stats = self.statements.get(statement)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                statement = OTHER_STATEMENTS
+                stats = self.statements.get(statement)
+            if stats is None:
+                stats = self.statements[statement] = QueryStats()
+        return stats
+
+    def record(self, sql: str, elapsed: float, failed: bool = False, *, normalize: bool = True) -> str:
+        statement = normalize_sql(sql) if normalize else sql
+        self._stats(statement).record(elapsed, failed)
+        return statement
+
+    def record_fetch(self, sql: str, elapsed: float, rows: int) -> None:
+        """Add time spent stepping through a statement's result rows to that statement."""
+        stats = self._stats(normalize_sql(sql))
+        stats.total_seconds += elapsed
+        stats.rows += rows
+
+    def is_slow(self, elapsed: float) -> bool:
+        return bool(self.slow_seconds) and elapsed >= self.slow_seconds
+
+    def top(self, limit: int = 10, order: str = "total_seconds") -> List[Tuple[str, Dict[str, float]]]:
+        if order not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key {order!r}; expected one of {', '.join(SORT_KEYS)}.")
+        snapshots = [(statement, stats.snapshot()) for statement, stats in self.statements.items()]
+        snapshots.sort(key=lambda item: item[1][order], reverse=True)
+        return snapshots[:limit]
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.plans.clear()
+
+
+def _timed(fn: Callable, *args: Any) -> Tuple[Any, float, Optional[BaseException]]:
+    # Runs in the connection's worker thread, so queueing behind other work is not counted.
+    started = time.perf_counter()
+    try:
+        result = fn(*args)
+    except Exception as error:
+        return None, time.perf_counter() - started, error
+    return result, time.perf_counter() - started, None
+
+
+def _explain(connection: sqlite3.Connection, sql: str, parameters: Any) -> str:
+    rows = connection.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    depths: Dict[int, int] = {}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depths[node_id] = depths.get(parent_id, -1) + 1
+        lines.append(f"{'  ' * depths[node_id]}{detail}")
+    return "\n".join(lines)
+
+
+class InstrumentedConnection:
+    """Wraps an ``aiosqlite.Connection`` and times every statement it runs.
+
+    Statement and fetch calls are timed in the worker thread and recorded on
+    ``recorder``; everything else is delegated to the wrapped connection. The
+    first time a statement is slower than the recorder's threshold its
+    ``EXPLAIN QUERY PLAN`` output is captured and logged with it.
+    """
+
+    def __init__(self, connection: aiosqlite.Connection, recorder: QueryRecorder):
+        self._connection = connection
+        self.recorder = recorder
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+    async def run(self, sql: str, parameters: Any, fn: Callable, *args: Any) -> Any:
+        result, elapsed, error = await self._connection._execute(_timed, fn, *args)
+        statement = self.recorder.record(sql, elapsed, error is not None)
+        if error is None and self.recorder.is_slow(elapsed):
+            await self._log_slow(sql, statement, parameters, elapsed)
+        if error is not None:
+            raise error
+        return result
+
+    async def fetch(self, sql: Optional[str], fn: Callable, *args: Any) -> Any:
+        result, elapsed, error = await self._connection._execute(_timed, fn, *args)
+        if error is not None:
+            raise error
+        if sql is not None:
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+            self.recorder.record_fetch(sql, elapsed, rows)
+        return result
+
+    async def _log_slow(self, sql: str, statement: str, parameters: Any, elapsed: float) -> None:
+        plan = self.recorder.plans.get(statement)
+        if plan is None and sql.lstrip().upper().startswith(EXPLAINABLE):
+            try:
+                plan = await self._connection._execute(_explain, self._connection._conn, sql, parameters)
+            except Exception as error:
+                plan = f"(query plan unavailable: {error})"
+            self.recorder.plans[statement] = plan
+        if plan:
+            logger.warning("Slow query took %.1f ms: %s\n%s", elapsed * 1000, statement, plan)
+        else:
+            logger.warning("Slow query took %.1f ms: %s", elapsed * 1000, statement)
+
+    @contextmanager
+    async def cursor(self) -> "InstrumentedCursor":
+        return InstrumentedCursor(self, await self._connection._execute(self._connection._conn.cursor))
+
+    @contextmanager
+    async def execute(self, sql: str, parameters: Optional[Iterable[Any]] = None) -> "InstrumentedCursor":
+        parameters = [] if parameters is None else parameters
+        cursor = await self.run(sql, parameters, self._connection._conn.execute, sql, parameters)
+        return InstrumentedCursor(self, cursor, sql)
+
+    @contextmanager
+    async def executemany(self, sql: str, parameters: Iterable[Iterable[Any]]) -> "InstrumentedCursor":
+        parameters = list(parameters)
+        cursor = await self.run(sql, parameters[0] if parameters else [], self._connection._conn.executemany, sql, parameters)
+        return InstrumentedCursor(self, cursor, sql)
+
+    @contextmanager
+    async def execute_fetchall(self, sql: str, parameters: Optional[Iterable[Any]] = None) -> Iterable[sqlite3.Row]:
+        parameters = [] if parameters is None else parameters
+        return await self.run(sql, parameters, self._connection._execute_fetchall, sql, parameters)
+
+
+class InstrumentedCursor(aiosqlite.Cursor):
+    """Cursor whose statements and fetches are recorded on its connection's recorder."""
+
+    def __init__(self, conn: InstrumentedConnection, cursor: sqlite3.Cursor, sql: Optional[str] = None):
+        super().__init__(conn, cursor)
+        self._sql = sql
+
+    async def execute(self, sql: str, parameters: Optional[Iterable[Any]] = None) -> "InstrumentedCursor":
+        parameters = [] if parameters is None else parameters
+        await self._conn.run(sql, parameters, self._cursor.execute, sql, parameters)
+        self._sql = sql
+        return self
+
+    async def executemany(self, sql: str, parameters: Iterable[Iterable[Any]]) -> "InstrumentedCursor":
+        parameters = list(parameters)
+        await self._conn.run(sql, parameters[0] if parameters else [], self._cursor.executemany, sql, parameters)
+        self._sql = sql
+        return self
+
+    async def fetchone(self) -> Optional[sqlite3.Row]:
+        return await self._conn.fetch(self._sql, self._cursor.fetchone)
+
+    async def fetchmany(self, size: Optional[int] = None) -> Iterable[sqlite3.Row]:
+        args = () if size is None else (size,)
+        return await self._conn.fetch(self._sql, self._cursor.fetchmany, *args)
+
+    async def fetchall(self) -> Iterable[sqlite3.Row]:
+        return await self._conn.fetch(self._sql, self._cursor.fetchall)
+
+
+def format_top_queries(entries: List[Tuple[str, Dict[str, float]]], width: int = 120) -> str:
+    """Plain-text table of ``QueryRecorder.top()`` output."""
+    if not entries:
+        return "No queries recorded yet."
+    lines = [f"{'total ms':>9} {'avg ms':>8} {'max ms':>8} {'calls':>7} {'rows':>8}  statement"]
+    for statement, stats in entries:
+        text = statement if len(statement) <= width else f"{statement[: width - 3]}..."
+        lines.append(
+            f"{stats['total_seconds'] * 1000:>9.1f} {stats['average_seconds'] * 1000:>8.2f} "
+            f"{stats['max_seconds'] * 1000:>8.1f} {stats['calls']:>7} {stats['rows']:>8}  {text}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,157 @@
+import contextvars
+import functools
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from discord.http import HTTPClient, Route
+
+
+CORE_CALLER = "core"
+DEFAULT_MAX_ROUTES = 500
+OTHER_ROUTES = "(other routes)"
+SORT_KEYS = ("calls", "rate_limited", "wait_seconds", "http_seconds", "errors")
+MAX_CALLER_FRAMES = 40
+
+_current_call: contextvars.ContextVar[Optional["_RestCall"]] = contextvars.ContextVar("rest_call", default=None)
+
+
+class _RestCall:
+    __slots__ = ("http_seconds", "rate_limited")
+
+    def __init__(self):
+        self.http_seconds = 0.0
+        self.rate_limited = 0
+
+
+class RouteStats:
+    __slots__ = ("calls", "errors", "rate_limited", "wait_seconds", "http_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.wait_seconds = 0.0
+        self.http_seconds = 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "wait_seconds": self.wait_seconds,
+            "http_seconds": self.http_seconds,
+        }
+
+
+def _calling_cog(frame) -> str:
+    """Name of the innermost ``cogs.*`` module on the stack, or ``core`` for the bot itself."""
+    for _ in range(MAX_CALLER_FRAMES):
+        if frame is None:
+            break
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("cogs."):
+            return module[len("cogs.") :]
+        frame = frame.f_back
+    return CORE_CALLER
+
+
+class RestRecorder:
+    """Counts Discord REST calls per route template and calling cog.
+
+    ``install`` wraps the bot's ``HTTPClient.request``; ``trace_config`` must
+    be passed to the client as ``http_trace`` so individual HTTP attempts, and
+    the 429 responses discord.py retries internally, are seen as well. Time
+    spent in ``request`` that is not spent on the wire is reported as bucket
+    wait: discord.py holding the call back for a per-route or global limit.
+    """
+
+    def __init__(self, max_routes: int = DEFAULT_MAX_ROUTES):
+        self.max_routes = max(int(max_routes), 1)
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+
+    def _stats(self, route: str, cog: str) -> RouteStats:
+        key = (route, cog)
+        stats = self.routes.get(key)
+        if stats is None:
+            if len(self.routes) >= self.max_routes:
+                key = (OTHER_ROUTES, cog)
+                stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats()
+        return stats
+
+    def install(self, http: HTTPClient) -> None:
+        original = http.request
+
+        @functools.wraps(original)
+        async def request(route: Route, **kwargs: Any) -> Any:
+            cog = _calling_cog(sys._getframe(1))
+            call = _RestCall()
+            token = _current_call.set(call)
+            started = time.perf_counter()
+            failed = False
+            try:
+                return await original(route, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                _current_call.reset(token)
+                elapsed = time.perf_counter() - started
+                stats = self._stats(f"{route.method} {route.path}", cog)
+                stats.calls += 1
+                stats.errors += failed
+                stats.rate_limited += call.rate_limited
+                stats.http_seconds += call.http_seconds
+                stats.wait_seconds += max(elapsed - call.http_seconds, 0.0)
+
+        http.request = request
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        async def on_request_start(session, context, params) -> None:
+            context.started = time.perf_counter()
+
+        async def on_request_end(session, context, params) -> None:
+            call = _current_call.get()
+            if call is None:
+                return
+            call.http_seconds += time.perf_counter() - context.started
+            if params.response.status == 429:
+                call.rate_limited += 1
+
+        async def on_request_exception(session, context, params) -> None:
+            call = _current_call.get()
+            if call is not None:
+                call.http_seconds += time.perf_counter() - context.started
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+    def top(self, limit: int = 10, order: str = "calls") -> List[Tuple[str, str, Dict[str, float]]]:
+        if order not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key {order!r}; expected one of {', '.join(SORT_KEYS)}.")
+        snapshots = [(route, cog, stats.snapshot()) for (route, cog), stats in self.routes.items()]
+        snapshots.sort(key=lambda item: item[2][order], reverse=True)
+        return snapshots[:limit]
+
+    def reset(self) -> None:
+        self.routes.clear()
+
+
+def format_rest_stats(entries: List[Tuple[str, str, Dict[str, float]]], width: int = 120) -> str:
+    """Plain-text table of ``RestRecorder.top()`` output."""
+    if not entries:
+        return "No REST calls recorded yet."
+    lines = [f"{'calls':>7} {'429s':>5} {'errors':>6} {'wait ms':>9} {'http ms':>9}  {'cog':<12} route"]
+    for route, cog, stats in entries:
+        text = route if len(route) <= width else f"{route[: width - 3]}..."
+        lines.append(
+            f"{stats['calls']:>7} {stats['rate_limited']:>5} {stats['errors']:>6} "
+            f"{stats['wait_seconds'] * 1000:>9.1f} {stats['http_seconds'] * 1000:>9.1f}  {cog:<12} {text}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,205 @@
+import asyncio
+import datetime
+import logging
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import discord
+
+from storage import Storage
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MESSAGE_LOG_RETENTION_DAYS = 30
+DEFAULT_CHAT_USAGE_RETENTION_DAYS = 90
+DEFAULT_DISABLED_REMINDER_RETENTION_DAYS = 30
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_CHUNK_PAUSE_SECONDS = 0.05
+DEFAULT_TIME_BUDGET_SECONDS = 5.0
+INCREMENTAL_VACUUM_PAGES = 2000
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class RetentionPolicy:
+    """Deletes rows of one table whose age column is older than ``days``.
+
+    ``condition`` is a SQL predicate with one ``?`` placeholder, which receives
+    ``cutoff(now - days)``. A policy with ``days <= 0`` keeps rows forever.
+    """
+
+    __slots__ = ("table", "days", "condition", "cutoff")
+
+    def __init__(self, table: str, days: int, condition: str, cutoff: Callable[[datetime.datetime], Any]):
+        self.table = table
+        self.days = days
+        self.condition = condition
+        self.cutoff = cutoff
+
+    @property
+    def enabled(self) -> bool:
+        return self.days > 0
+
+    def cutoff_value(self, now: datetime.datetime) -> Any:
+        return self.cutoff(now - datetime.timedelta(days=self.days))
+
+
+def default_policies(runtime_config: Dict[str, Any]) -> List[RetentionPolicy]:
+    return [
+        RetentionPolicy(
+            "messages",
+            runtime_config.get("MESSAGE_LOG_RETENTION_DAYS", DEFAULT_MESSAGE_LOG_RETENTION_DAYS),
+            "message_id < ?",
+            discord.utils.time_snowflake,
+        ),
+        RetentionPolicy(
+            "chat_usage",
+            runtime_config.get("CHAT_USAGE_RETENTION_DAYS", DEFAULT_CHAT_USAGE_RETENTION_DAYS),
+            "usage_date < ?",
+            lambda when: when.date().isoformat(),
+        ),
+        RetentionPolicy(
+            "reminders",
+            runtime_config.get("DISABLED_REMINDER_RETENTION_DAYS", DEFAULT_DISABLED_REMINDER_RETENTION_DAYS),
+            "disabled = 1 AND remind_at < ?",
+            lambda when: when.isoformat(),
+        ),
+    ]
+
+
+def _rebuild_incremental(connection: sqlite3.Connection) -> None:
+    connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    connection.execute("VACUUM")
+
+
+async def enable_incremental_vacuum(storage: Storage, rebuild: bool = False) -> bool:
+    """Switch the database to incremental auto-vacuum. Returns True when the mode was changed.
+
+    Changing ``auto_vacuum`` only takes effect after a ``VACUUM``. On a new,
+    empty file that is instant; on an existing one it rewrites the whole
+    database and blocks every write meanwhile, so it only runs with
+    ``rebuild=True`` (``/owner vacuum``) and otherwise a recommendation is
+    logged. Afterwards free pages are returned to the OS in small steps by
+    ``PRAGMA incremental_vacuum``.
+    """
+    db = storage.write()
+    async with db.execute("PRAGMA auto_vacuum") as cursor:
+        row = await cursor.fetchone()
+    if row and row[0] == AUTO_VACUUM_INCREMENTAL:
+        return False
+
+    async with db.execute("SELECT 1 FROM sqlite_master LIMIT 1") as cursor:
+        empty = await cursor.fetchone() is None
+    if not empty and not rebuild:
+        logger.warning(
+            "The database does not use incremental auto-vacuum, so pruned rows do not shrink the file. "
+            "Run /owner vacuum at a quiet time to convert it; it rewrites the whole database."
+        )
+        return False
+
+    await storage.run_outside_transaction(_rebuild_incremental)
+    logger.info("Enabled incremental auto-vacuum on the database.")
+    return True
+
+
+def _delete_chunk(connection: sqlite3.Connection, statement: str, cutoff: Any, limit: int) -> int:
+    return connection.execute(statement, (cutoff, limit)).rowcount
+
+
+def _incremental_vacuum(connection: sqlite3.Connection, pages: int) -> None:
+    # sqlite3 steps a pragma statement only once, so free the pages one statement at a time.
+    for _ in range(pages):
+        connection.execute("PRAGMA incremental_vacuum(1)")
+
+
+class RetentionPruner:
+    """Applies retention policies in small chunks so the write connection is never held for long.
+
+    Each chunk deletes at most ``chunk_size`` rows as one unit of work and waits
+    for its group commit, then the pruner sleeps for ``pause`` seconds so queued
+    writes from cogs can run. A run stops once ``budget`` seconds have elapsed;
+    whatever is left is picked up by the next run.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        policies: Iterable[RetentionPolicy],
+        *,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        pause: float = DEFAULT_CHUNK_PAUSE_SECONDS,
+        budget: float = DEFAULT_TIME_BUDGET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.storage = storage
+        self.policies = [policy for policy in policies if policy.enabled]
+        self.chunk_size = max(int(chunk_size), 1)
+        self.pause = pause
+        self.budget = budget
+        self._clock = clock
+        self.deleted: Dict[str, int] = {policy.table: 0 for policy in self.policies}
+        self.chunks = 0
+        self.runs = 0
+        self.last_run_seconds = 0.0
+        self.reclaimed_pages = 0
+
+    async def run(self, now: Optional[datetime.datetime] = None) -> Dict[str, int]:
+        """Run every policy until it is caught up or the time budget is spent."""
+        now = now or discord.utils.utcnow()
+        started = self._clock()
+        deadline = started + self.budget
+        removed: Dict[str, int] = {}
+
+        for policy in self.policies:
+            if self._clock() >= deadline:
+                break
+            removed[policy.table] = await self._prune_policy(policy, policy.cutoff_value(now), deadline)
+
+        self.runs += 1
+        self.last_run_seconds = self._clock() - started
+        return removed
+
+    async def _prune_policy(self, policy: RetentionPolicy, cutoff: Any, deadline: float) -> int:
+        statement = (
+            f"DELETE FROM {policy.table} WHERE rowid IN "
+            f"(SELECT rowid FROM {policy.table} WHERE {policy.condition} LIMIT ?)"
+        )
+        removed = 0
+        while True:
+            try:
+                count = await self.storage.transaction(_delete_chunk, statement, cutoff, self.chunk_size)
+            except sqlite3.OperationalError as error:
+                if "no such table" in str(error):
+                    logger.debug("Skipping retention for missing table %s.", policy.table)
+                    return removed
+                raise
+
+            removed += count
+            self.deleted[policy.table] = self.deleted.get(policy.table, 0) + count
+            self.chunks += 1
+            if count < self.chunk_size or self._clock() >= deadline:
+                return removed
+            await asyncio.sleep(self.pause)
+
+    async def reclaim_space(self, pages: int = INCREMENTAL_VACUUM_PAGES) -> int:
+        """Return up to ``pages`` free pages to the file system. Returns how many were freed."""
+        async with self.storage.write().execute("PRAGMA freelist_count") as cursor:
+            row = await cursor.fetchone()
+        free_pages = row[0] if row else 0
+        if not free_pages:
+            return 0
+
+        freed = min(free_pages, int(pages))
+        await self.storage.transaction(_incremental_vacuum, freed)
+        self.reclaimed_pages += freed
+        return freed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "chunks": self.chunks,
+            "deleted": dict(self.deleted),
+            "last_run_seconds": self.last_run_seconds,
+            "reclaimed_pages": self.reclaimed_pages,
+        }
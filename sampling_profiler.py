@@ -0,0 +1,157 @@
+import asyncio
+import collections
+import linecache
+import os
+import sys
+import threading
+import time
+from typing import Counter, Dict, List, Optional, Tuple
+
+
+DEFAULT_INTERVAL_MS = 5
+MAX_DURATION_SECONDS = 120
+MAX_STACK_DEPTH = 64
+PROFILE_DIRECTORY = "profiles"
+# Leaf frames in these modules mean the thread is parked waiting for work.
+IDLE_MODULES = ("selectors.py", "threading.py", "queue.py")
+# Worker loops that block in a C-level ``SimpleQueue.get``, so no Python frame of queue.py shows up:
+# the thread is idle when the leaf frame is one of these functions sitting on its ``.get(`` line.
+IDLE_QUEUE_LOOPS = frozenset({("core.py", "_connection_worker_thread")})
+
+Stack = Tuple[str, ...]
+
+
+def _frame_label(code, labels: Dict[object, str]) -> str:
+    label = labels.get(code)
+    if label is None:
+        label = labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label
+
+
+def _is_idle(frame, idle_lines: Dict[Tuple[object, int], bool]) -> bool:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    if filename in IDLE_MODULES:
+        return True
+    if (filename, code.co_name) not in IDLE_QUEUE_LOOPS:
+        return False
+    key = (code, frame.f_lineno)
+    idle = idle_lines.get(key)
+    if idle is None:
+        idle = idle_lines[key] = ".get(" in linecache.getline(code.co_filename, frame.f_lineno)
+    return idle
+
+
+class ProfileResult:
+    __slots__ = ("duration", "interval", "stacks", "samples", "idle_samples")
+
+    def __init__(self, duration: float, interval: float, stacks: Counter[Stack], samples: Dict[str, int], idle: Dict[str, int]):
+        self.duration = duration
+        self.interval = interval
+        self.stacks = stacks
+        self.samples = samples
+        self.idle_samples = idle
+
+    @property
+    def busy_samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope: ``thread;outer;...;leaf count``."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 15) -> List[Tuple[str, int, int]]:
+        """``(function, self samples, total samples)`` for the functions seen most often at the top of a stack."""
+        own: Counter[str] = collections.Counter()
+        total: Counter[str] = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        return [(name, count, total[name]) for name, count in own.most_common(limit)]
+
+    def summary(self, limit: int = 15, width: int = 70) -> str:
+        lines = [f"{self.duration:.1f}s at {self.interval * 1000:.0f} ms intervals"]
+        for thread, samples in sorted(self.samples.items()):
+            busy = samples - self.idle_samples.get(thread, 0)
+            lines.append(f"  {thread}: {busy}/{samples} samples busy ({busy / samples:.0%})" if samples else f"  {thread}: no samples")
+        entries = self.top_functions(limit)
+        if not entries:
+            lines.append("No busy samples.")
+            return "\n".join(lines)
+        busy_total = self.busy_samples
+        lines.append(f"{'self':>6} {'total':>6}  function")
+        for name, own, total in entries:
+            text = name if len(name) <= width else f"...{name[-(width - 3):]}"
+            lines.append(f"{own / busy_total:>6.1%} {total / busy_total:>6.1%}  {text}")
+        return "\n".join(lines)
+
+
+class SamplingProfiler:
+    """Statistical profiler for a fixed set of threads, active only while ``run`` is in progress.
+
+    A daemon thread reads ``sys._current_frames()`` every ``interval_ms`` and
+    counts each sampled thread's stack. Nothing is installed on the profiled
+    threads themselves (no ``sys.setprofile`` hook), so the cost is confined
+    to the sampling thread and disappears when the session ends. Samples whose
+    leaf frame is a selector, lock or queue wait are counted as idle.
+    """
+
+    def __init__(self, threads: Dict[int, str], interval_ms: float = DEFAULT_INTERVAL_MS):
+        self.threads = dict(threads)
+        self.interval = max(float(interval_ms), 1.0) / 1000
+        self._stacks: Counter[Stack] = collections.Counter()
+        self._samples: Counter[str] = collections.Counter()
+        self._idle: Counter[str] = collections.Counter()
+        self._labels: Dict[object, str] = {}
+        self._idle_lines: Dict[Tuple[object, int], bool] = {}
+        self._stop = threading.Event()
+
+    def _sample_once(self) -> None:
+        frames = sys._current_frames()
+        for thread_id, name in self.threads.items():
+            frame = frames.get(thread_id)
+            if frame is None:
+                continue
+            self._samples[name] += 1
+            if _is_idle(frame, self._idle_lines):
+                self._idle[name] += 1
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame.f_code, self._labels))
+                frame = frame.f_back
+            stack.append(name)
+            stack.reverse()
+            self._stacks[tuple(stack)] += 1
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample_once()
+
+    async def run(self, duration: float) -> ProfileResult:
+        duration = min(max(float(duration), 0.0), MAX_DURATION_SECONDS)
+        thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        started = time.perf_counter()
+        thread.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            self._stop.set()
+            await asyncio.to_thread(thread.join)
+        return ProfileResult(
+            time.perf_counter() - started, self.interval, self._stacks, dict(self._samples), dict(self._idle)
+        )
+
+
+def write_profile(result: ProfileResult, directory: str = PROFILE_DIRECTORY, now: Optional[float] = None) -> str:
+    """Write ``result`` as a collapsed-stack file under ``directory`` and return its path."""
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    path = os.path.join(directory, f"profile-{stamp}.collapsed")
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(result.collapsed())
+    return path
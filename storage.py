@@ -0,0 +1,318 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, TypeVar
+
+import aiosqlite
+
+from query_stats import AIOSQLITE_INTERNALS as INSTRUMENTED_INTERNALS, InstrumentedConnection, QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READERS = 3
+DEFAULT_COMMIT_WINDOW_MS = 5
+BUSY_TIMEOUT_MS = 5000
+UNIT_OF_WORK_SAVEPOINT = "unit_of_work"
+# Private aiosqlite members Storage relies on (units of work run through ``_execute`` on ``_conn``,
+# profiling reads ``_thread``). They are not covered by aiosqlite's API guarantees, hence the pin in
+# requirements.txt.
+AIOSQLITE_INTERNALS = ("_execute", "_conn", "_thread")
+
+T = TypeVar("T")
+UnitOfWork = Callable[..., T]
+
+
+def execute_statements(connection: sqlite3.Connection, statements: List[tuple]) -> None:
+    """Unit of work that runs a prepared list of ``(sql, parameters)`` pairs."""
+    for sql, parameters in statements:
+        connection.execute(sql, parameters)
+
+
+def check_aiosqlite_internals(connection: aiosqlite.Connection, attributes: tuple = AIOSQLITE_INTERNALS) -> None:
+    """Fail fast with a clear message when the installed aiosqlite lacks internals this bot uses."""
+    missing = [name for name in attributes if not hasattr(connection, name)]
+    if missing:
+        raise RuntimeError(
+            f"aiosqlite {aiosqlite.__version__} is missing {', '.join(missing)}; "
+            "install the version range pinned in requirements.txt."
+        )
+
+
+def _run_unit_of_work(connection: sqlite3.Connection, fn: UnitOfWork, args: tuple) -> Any:
+    """Run ``fn`` atomically on the writer's own thread.
+
+    When nothing else is pending the unit gets its own transaction and a failure
+    rolls it back entirely. Otherwise it nests in a savepoint, so a failure only
+    undoes its own statements and leaves other callers' writes for the next
+    group commit.
+    """
+    if not connection.in_transaction:
+        connection.execute("BEGIN")
+        try:
+            return fn(connection, *args)
+        except BaseException:
+            connection.rollback()
+            raise
+
+    connection.execute(f"SAVEPOINT {UNIT_OF_WORK_SAVEPOINT}")
+    try:
+        result = fn(connection, *args)
+    except BaseException:
+        connection.execute(f"ROLLBACK TO {UNIT_OF_WORK_SAVEPOINT}")
+        connection.execute(f"RELEASE {UNIT_OF_WORK_SAVEPOINT}")
+        raise
+    connection.execute(f"RELEASE {UNIT_OF_WORK_SAVEPOINT}")
+    return result
+
+
+def _run_outside_transaction(connection: sqlite3.Connection, fn: UnitOfWork, args: tuple) -> Any:
+    """Commit whatever is pending, then run ``fn`` with no transaction open, all on the writer's thread."""
+    if connection.in_transaction:
+        # Writes that arrived after the last group commit; their own commit() then finds nothing left to do.
+        connection.commit()
+    return fn(connection, *args)
+
+
+class Storage:
+    """One aiosqlite writer plus a small pool of read-only connections.
+
+    The database runs in WAL mode, so readers see the last committed state and
+    never wait behind the writer's thread. Each connection owns its own worker
+    thread; ``read()`` borrows an idle reader and ``write()`` returns the writer,
+    which is also what reads that must see uncommitted writes should use.
+    In-memory databases cannot be shared between connections, so they are
+    served by the writer alone.
+
+    ``commit()`` is a group commit: callers arriving within ``commit_window_ms``
+    of each other share one COMMIT (and one fsync), and each of them resumes
+    only once that commit is durable. ``transaction()`` runs a synchronous
+    function over the raw ``sqlite3`` connection inside the writer thread, so a
+    multi-statement change costs a single hop.
+
+    With a ``recorder``, the connections handed out by ``open()``, ``read()`` and
+    ``write()`` time every statement; units of work and commits are recorded as a whole.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        readers: int = DEFAULT_READERS,
+        commit_window_ms: float = DEFAULT_COMMIT_WINDOW_MS,
+        recorder: Optional[QueryRecorder] = None,
+    ):
+        self.path = path
+        self.recorder = recorder
+        self.reader_count = max(int(readers), 0)
+        self.commit_window = max(float(commit_window_ms), 0.0) / 1000
+        self.writer: Optional[aiosqlite.Connection] = None
+        self._shared_writer: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._commit_waiters: List[asyncio.Future] = []
+        self._commit_task: Optional[asyncio.Task] = None
+        self.reads = 0
+        self.read_waits = 0
+        self.read_wait_seconds = 0.0
+        self.commit_requests = 0
+        self.commits = 0
+        self.max_commit_group = 0
+        self.commit_seconds_total = 0.0
+        self.units = 0
+        self.failed_units = 0
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path == ":memory:" or self.path.startswith("file::memory:")
+
+    def _wrap(self, connection: aiosqlite.Connection) -> aiosqlite.Connection:
+        if not self.recorder:
+            return connection
+        check_aiosqlite_internals(connection, INSTRUMENTED_INTERNALS)
+        return InstrumentedConnection(connection, self.recorder)
+
+    async def open(self) -> aiosqlite.Connection:
+        if self.path and not self.in_memory:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self.writer = await aiosqlite.connect(self.path)
+        try:
+            check_aiosqlite_internals(self.writer)
+        except RuntimeError:
+            await self.writer.close()
+            self.writer = None
+            raise
+        await self.writer.execute("PRAGMA journal_mode=WAL")
+        await self.writer.execute("PRAGMA foreign_keys=ON")
+        await self.writer.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        self._shared_writer = self._wrap(self.writer)
+
+        self._idle = asyncio.Queue()
+        if not self.in_memory:
+            uri = f"{Path(self.path).resolve().as_uri()}?mode=ro"
+            for _ in range(self.reader_count):
+                reader = await aiosqlite.connect(uri, uri=True)
+                await reader.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+                self._readers.append(reader)
+                self._idle.put_nowait(self._wrap(reader))
+        return self._shared_writer
+
+    def _raw_writer(self) -> aiosqlite.Connection:
+        # Units of work and commits need the plain connection's private members; they record their own timings.
+        if self.writer is None:
+            raise RuntimeError("Storage is not open.")
+        return self.writer
+
+    def write(self) -> aiosqlite.Connection:
+        """The writer, timed like the connections ``read()`` hands out."""
+        self._raw_writer()
+        return self._shared_writer
+
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection. Falls back to the writer when there is no pool."""
+        self.reads += 1
+        if not self._readers:
+            yield self.write()
+            return
+
+        reader = self._idle.get_nowait() if not self._idle.empty() else None
+        if reader is None:
+            self.read_waits += 1
+            started = time.perf_counter()
+            reader = await self._idle.get()
+            self.read_wait_seconds += time.perf_counter() - started
+        try:
+            yield reader
+        finally:
+            self._idle.put_nowait(reader)
+
+    async def transaction(self, fn: UnitOfWork, *args: Any) -> T:
+        """Run ``fn(connection, *args)`` as one transaction in the writer thread and commit it.
+
+        ``fn`` is a plain synchronous function receiving the ``sqlite3.Connection``;
+        it must not touch the event loop. Exceptions it raises roll back its
+        statements and propagate to the caller.
+        """
+        writer = self._raw_writer()
+        self.units += 1
+        started = time.perf_counter()
+        try:
+            result = await writer._execute(_run_unit_of_work, writer._conn, fn, args)
+        except BaseException:
+            self.failed_units += 1
+            self._record(f"-- unit of work {fn.__name__}", started, failed=True)
+            raise
+        self._record(f"-- unit of work {fn.__name__}", started)
+        await self.commit()
+        return result
+
+    async def run_outside_transaction(self, fn: UnitOfWork, *args: Any) -> T:
+        """Run ``fn(connection, *args)`` in the writer thread with no transaction open.
+
+        For statements SQLite refuses inside a transaction, such as ``VACUUM``.
+        Committing what is pending and running ``fn`` happen in one hop, so no
+        other write can open a transaction in between.
+        """
+        writer = self._raw_writer()
+        await self.flush_commits()
+        started = time.perf_counter()
+        try:
+            result = await writer._execute(_run_outside_transaction, writer._conn, fn, args)
+        except BaseException:
+            self._record(f"-- outside transaction {fn.__name__}", started, failed=True)
+            raise
+        self._record(f"-- outside transaction {fn.__name__}", started)
+        return result
+
+    def commit(self) -> "asyncio.Future[None]":
+        """Request a commit of everything written so far.
+
+        Returns a future that resolves once a COMMIT covering this request has
+        finished, or raises if that COMMIT failed. Awaiting it is the durable
+        acknowledgement.
+        """
+        self.commit_requests += 1
+        future = asyncio.get_running_loop().create_future()
+        self._commit_waiters.append(future)
+        if self._commit_task is None:
+            self._commit_task = asyncio.create_task(self._group_commit())
+        return future
+
+    async def _group_commit(self) -> None:
+        if self.commit_window:
+            await asyncio.sleep(self.commit_window)
+        waiters, self._commit_waiters = self._commit_waiters, []
+        self._commit_task = None
+
+        started = time.perf_counter()
+        try:
+            await self._raw_writer().commit()
+        except Exception as error:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(error)
+            return
+
+        self.commits += 1
+        self.commit_seconds_total += time.perf_counter() - started
+        self._record("COMMIT", started)
+        self.max_commit_group = max(self.max_commit_group, len(waiters))
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _record(self, label: str, started: float, failed: bool = False) -> None:
+        if self.recorder is not None:
+            self.recorder.record(label, time.perf_counter() - started, failed, normalize=False)
+
+    async def flush_commits(self) -> None:
+        """Wait for any pending group commit to finish."""
+        if self._commit_waiters:
+            await asyncio.gather(self.commit(), return_exceptions=True)
+
+    async def close(self) -> None:
+        await self.flush_commits()
+        for reader in self._readers:
+            try:
+                await reader.close()
+            except Exception:
+                logger.exception("Failed to close a database reader.")
+        self._readers.clear()
+        if self.writer is not None:
+            await self.writer.close()
+            self.writer = None
+            self._shared_writer = None
+
+    def worker_threads(self) -> Dict[int, str]:
+        """Thread id -> name of the aiosqlite worker thread behind each open connection."""
+        connections = [("sqlite-writer", self.writer)] + [
+            (f"sqlite-reader-{index}", reader) for index, reader in enumerate(self._readers, 1)
+        ]
+        return {
+            connection._thread.ident: name
+            for name, connection in connections
+            if connection is not None and connection._thread.ident is not None
+        }
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "readers": len(self._readers),
+            "idle_readers": self._idle.qsize() if self._idle else 0,
+            "reads": self.reads,
+            "read_waits": self.read_waits,
+            "read_wait_seconds": self.read_wait_seconds,
+            "commit_requests": self.commit_requests,
+            "commits": self.commits,
+            "commits_per_request": self.commits / self.commit_requests if self.commit_requests else 0.0,
+            "max_commit_group": self.max_commit_group,
+            "average_commit_seconds": self.commit_seconds_total / self.commits if self.commits else 0.0,
+            "units": self.units,
+            "failed_units": self.failed_units,
+        }
@@ -0,0 +1,136 @@
+"""Microbenchmark for the automod blocked-word matcher.
+
+Builds a ``WordMatcher`` over a generated word list and scans generated
+messages with it, reporting build time and scan throughput. With
+``--legacy-messages`` it also times the previous approach (one
+``re.compile`` and search per word per message) on a few of the same
+messages for comparison.
+
+Run ``python tests/automod_benchmark.py --help`` for options; the defaults
+use a 10k-word list and 2000-character messages.
+"""
+
+import argparse
+import json
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from word_matcher import WordMatcher  # noqa: E402
+
+
+DEFAULT_WORDS = 10000
+DEFAULT_MESSAGES = 500
+DEFAULT_MESSAGE_LENGTH = 2000
+# Share of messages that contain one blocked word; the rest are clean and must be scanned to the end.
+DEFAULT_HIT_RATE = 0.1
+
+
+def _random_word(rng: random.Random, low: int = 3, high: int = 10) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def generate_words(count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add(_random_word(rng, 4, 12))
+    return sorted(words)
+
+
+def generate_messages(words: Sequence[str], count: int, length: int, hit_rate: float, seed: int = 1) -> List[str]:
+    """Lower-cased chat-like messages; ``hit_rate`` of them have a blocked word dropped in somewhere."""
+    rng = random.Random(seed + 1)
+    vocabulary = [_random_word(rng) for _ in range(2000)]
+    messages = []
+    for _ in range(count):
+        parts: List[str] = []
+        size = 0
+        while size < length:
+            token = rng.choice(vocabulary)
+            if rng.random() < 0.1:
+                token += rng.choice(",.!?")
+            parts.append(token)
+            size += len(token) + 1
+        if words and rng.random() < hit_rate:
+            parts[rng.randrange(len(parts))] = rng.choice(words)
+        messages.append(" ".join(parts)[:length])
+    return messages
+
+
+def legacy_search(words: Sequence[str], text: str) -> Optional[str]:
+    """The pre-matcher automod loop: compile and search one pattern per word."""
+    for word in words:
+        pattern = re.compile(rf"(?<!\w){re.escape(word)}(?!\w)", re.IGNORECASE)
+        if pattern.search(text):
+            return word
+    return None
+
+
+def benchmark(
+    words: int = DEFAULT_WORDS,
+    messages: int = DEFAULT_MESSAGES,
+    length: int = DEFAULT_MESSAGE_LENGTH,
+    hit_rate: float = DEFAULT_HIT_RATE,
+    legacy_messages: int = 0,
+    seed: int = 1,
+) -> Dict[str, float]:
+    word_list = generate_words(words, seed)
+    texts = generate_messages(word_list, messages, length, hit_rate, seed)
+
+    started = time.perf_counter()
+    matcher = WordMatcher(word_list)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    hits = sum(matcher.search(text) is not None for text in texts)
+    scan_seconds = time.perf_counter() - started
+
+    summary = {
+        "words": len(word_list),
+        "messages": len(texts),
+        "message_length": length,
+        "hits": hits,
+        "build_ms": round(build_seconds * 1000, 2),
+        "messages_per_second": round(len(texts) / scan_seconds, 1) if scan_seconds else 0.0,
+        "megabytes_per_second": round(sum(map(len, texts)) / scan_seconds / 1e6, 2) if scan_seconds else 0.0,
+        "us_per_message": round(scan_seconds / len(texts) * 1e6, 1) if texts else 0.0,
+    }
+    if legacy_messages:
+        sample = texts[:legacy_messages]
+        started = time.perf_counter()
+        for text in sample:
+            legacy_search(word_list, text)
+        legacy_seconds = time.perf_counter() - started
+        summary["legacy_us_per_message"] = round(legacy_seconds / len(sample) * 1e6, 1)
+        summary["speedup"] = round(summary["legacy_us_per_message"] / summary["us_per_message"], 1)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=DEFAULT_WORDS)
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES)
+    parser.add_argument("--length", type=int, default=DEFAULT_MESSAGE_LENGTH, help="characters per message")
+    parser.add_argument("--hit-rate", type=float, default=DEFAULT_HIT_RATE)
+    parser.add_argument(
+        "--legacy-messages", type=int, default=0, help="also time the per-word regex loop on this many messages"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    summary = benchmark(args.words, args.messages, args.length, args.hit_rate, args.legacy_messages, args.seed)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
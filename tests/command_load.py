@@ -0,0 +1,310 @@
+"""Concurrent slash-command load harness.
+
+Fires many invocations of real command callbacks (``/balance``, ``/transfer``,
+``/farm harvest``, ``/warn``, ``/remindme``) with fake interactions at a
+temporary SQLite file, and records per command the latency distribution and
+how much of it was spent waiting: on the economy guild lock, for a read-only
+connection, and for the group commit.
+
+Run ``python tests/command_load.py --help`` for a standalone run; the pytest
+wrapper in ``test_command_load.py`` checks a short run against
+``command_baselines.json``. Each baseline entry is recorded at 600
+invocations with 50 in flight.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import datetime
+import json
+import random
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import discord  # noqa: E402
+from discord import app_commands  # noqa: E402
+
+from cogs.economy import Economy  # noqa: E402
+from cogs.farming import Farming  # noqa: E402
+from cogs.moderation import Moderation  # noqa: E402
+from cogs.utility import Utility  # noqa: E402
+from fakes import FakeGuild, FakeInteraction, close_offline_bot, start_offline_bot  # noqa: E402
+from loop_watchdog import percentile  # noqa: E402
+
+
+BASELINE_PATH = Path(__file__).with_name("command_baselines.json")
+DEFAULT_MIX = {"balance": 30, "transfer": 25, "farm harvest": 15, "warn": 10, "remindme": 20}
+DEFAULT_INVOCATIONS = 2000
+DEFAULT_CONCURRENCY = 200
+GUILD_ID = 5151
+MEMBERS = 100
+
+Call = Tuple[str, FakeInteraction, dict]
+
+_current: contextvars.ContextVar = contextvars.ContextVar("command_load_invocation")
+
+
+class _Waits:
+    __slots__ = ("lock", "read", "commit")
+
+    def __init__(self):
+        self.lock = 0.0
+        self.read = 0.0
+        self.commit = 0.0
+
+
+class CommandStats:
+    __slots__ = ("latencies", "errors", "unanswered", "lock_wait", "read_wait", "commit_wait")
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.unanswered = 0
+        self.lock_wait = 0.0
+        self.read_wait = 0.0
+        self.commit_wait = 0.0
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.latencies)
+        calls = len(ordered)
+
+        def mean_ms(total: float) -> float:
+            return round(total / calls * 1000, 3) if calls else 0.0
+
+        return {
+            "calls": calls,
+            "errors": self.errors,
+            "unanswered": self.unanswered,
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+            "max_ms": round((ordered[-1] if ordered else 0.0) * 1000, 3),
+            "lock_wait_ms": mean_ms(self.lock_wait),
+            "read_wait_ms": mean_ms(self.read_wait),
+            "commit_wait_ms": mean_ms(self.commit_wait),
+        }
+
+
+class _TimedLock:
+    """Async context manager around an ``asyncio.Lock`` that charges acquisition time to the running invocation."""
+
+    def __init__(self, lock: asyncio.Lock):
+        self._lock = lock
+
+    async def __aenter__(self):
+        started = time.perf_counter()
+        await self._lock.acquire()
+        waits = _current.get(None)
+        if waits is not None:
+            waits.lock += time.perf_counter() - started
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._lock.release()
+
+
+class CommandLoadHarness:
+    def __init__(self, bot):
+        self.bot = bot
+        self.stats: Dict[str, CommandStats] = {}
+        self._instrument()
+
+    def _instrument(self) -> None:
+        economy = self.bot.get_cog("Economy")
+        if economy is not None:
+            guild_lock = economy._guild_lock
+            economy._guild_lock = lambda guild_id: _TimedLock(guild_lock(guild_id))
+
+        storage = self.bot.storage
+        read, commit = storage.read, storage.commit
+
+        @asynccontextmanager
+        async def timed_read():
+            started = time.perf_counter()
+            async with read() as connection:
+                waits = _current.get(None)
+                if waits is not None:
+                    waits.read += time.perf_counter() - started
+                yield connection
+
+        def timed_commit():
+            future = commit()
+            waits = _current.get(None)
+            if waits is not None:
+                started = time.perf_counter()
+
+                def charge(_):
+                    waits.commit += time.perf_counter() - started
+
+                future.add_done_callback(charge)
+            return future
+
+        storage.read = timed_read
+        storage.commit = timed_commit
+
+    def resolve(self, name: str) -> app_commands.Command:
+        parent, *children = name.split()
+        command = self.bot.tree.get_command(parent)
+        for child in children:
+            command = command.get_command(child) if command is not None else None
+        if not isinstance(command, app_commands.Command):
+            raise LookupError(f"No slash command named /{name}.")
+        return command
+
+    async def invoke(self, name: str, interaction: FakeInteraction, **arguments) -> None:
+        """Run a command's callback directly, skipping checks such as cooldowns and permissions."""
+        command = self.resolve(name)
+        stats = self.stats.setdefault(name, CommandStats())
+        waits = _Waits()
+        token = _current.set(waits)
+        started = time.perf_counter()
+        try:
+            await command.callback(command.binding, interaction, **arguments)
+        except Exception:
+            stats.errors += 1
+        finally:
+            stats.latencies.append(time.perf_counter() - started)
+            _current.reset(token)
+        stats.lock_wait += waits.lock
+        stats.read_wait += waits.read
+        stats.commit_wait += waits.commit
+        if not interaction.responded:
+            stats.unanswered += 1
+
+    async def fire(self, calls: Iterable[Call], concurrency: int = DEFAULT_CONCURRENCY) -> float:
+        """Invoke every call with up to ``concurrency`` in flight. Returns the wall time in seconds."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(name: str, interaction: FakeInteraction, arguments: dict) -> None:
+            async with semaphore:
+                await self.invoke(name, interaction, **arguments)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run(name, interaction, arguments) for name, interaction, arguments in calls))
+        await self.bot.storage.flush_commits()
+        return time.perf_counter() - started
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {name: stats.summary() for name, stats in sorted(self.stats.items())}
+
+
+def build_guild(members: int = MEMBERS) -> Tuple[FakeGuild, discord.Member]:
+    guild = FakeGuild(GUILD_ID)
+    guild.add_channel(7000, "general")
+    for index in range(members):
+        guild.add_member(20_000 + index)
+    moderator = guild.add_member(19_999, name="moderator", permissions=discord.Permissions(manage_messages=True))
+    return guild, moderator
+
+
+async def create_bot(database_path: str, guild: FakeGuild):
+    """A FunBot with the economy, farming, moderation and utility cogs and a ready crop for every member."""
+    bot = await start_offline_bot(database_path, guild.me, (Economy, Farming, Moderation, Utility))
+    # The farming cog compares naive UTC timestamps; anything this old is ready to harvest.
+    planted = datetime.datetime(2020, 1, 1).isoformat()
+    farms = [(guild.id, member.id, "wheat", planted) for member in guild.members]
+
+    def seed(connection):
+        connection.executemany("INSERT INTO farms (guild_id, user_id, crop, plant_time) VALUES (?, ?, ?, ?)", farms)
+
+    await bot.storage.transaction(seed)
+    return bot
+
+
+def build_calls(bot, guild: FakeGuild, moderator, count: int, mix: Dict[str, int], seed: int = 1) -> List[Call]:
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    channel = guild.channels[0]
+    members = [member for member in guild.members if member is not moderator]
+    calls: List[Call] = []
+    for _ in range(count):
+        name = rng.choices(names, weights)[0]
+        user = rng.choice(members)
+        if name == "transfer":
+            receiver = rng.choice([member for member in members if member is not user])
+            arguments = {"member": receiver, "amount": rng.randint(1, 5)}
+        elif name == "warn":
+            user, arguments = moderator, {"member": rng.choice(members), "reason": "load test"}
+        elif name == "remindme":
+            arguments = {"time": f"{rng.randint(1, 59)}m", "reason": "stretch"}
+        else:
+            arguments = {}
+        calls.append((name, FakeInteraction(bot, user, channel, name), arguments))
+    return calls
+
+
+def parse_mix(raw: str) -> Dict[str, int]:
+    mix = {}
+    for item in raw.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown command {name!r}; expected one of {', '.join(DEFAULT_MIX)}.")
+        mix[name.strip()] = int(weight)
+    return mix
+
+
+async def run_load(
+    invocations: int = DEFAULT_INVOCATIONS,
+    mix: Optional[Dict[str, int]] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    seed: int = 1,
+    database_dir: Optional[str] = None,
+) -> Tuple[Dict[str, Dict[str, float]], float]:
+    """Returns the per-command report and the wall time of the run."""
+    with tempfile.TemporaryDirectory(dir=database_dir) as directory:
+        guild, moderator = build_guild()
+        bot = await create_bot(str(Path(directory) / "commands.db"), guild)
+        try:
+            harness = CommandLoadHarness(bot)
+            calls = build_calls(bot, guild, moderator, invocations, mix or DEFAULT_MIX, seed)
+            seconds = await harness.fire(calls, concurrency)
+            return harness.report(), seconds
+        finally:
+            await close_offline_bot(bot)
+
+
+def load_baselines(path: Path = BASELINE_PATH) -> Dict[str, Dict[str, Dict[str, float]]]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def check_baselines(report: Dict[str, Dict[str, float]], baselines: Dict[str, Dict[str, float]]) -> List[str]:
+    problems = []
+    for name, summary in report.items():
+        if summary["errors"] or summary["unanswered"]:
+            problems.append(f"/{name}: {summary['errors']} errors, {summary['unanswered']} unanswered")
+        baseline = baselines.get(name)
+        if baseline and summary["p99_ms"] > baseline["max_p99_ms"]:
+            problems.append(f"/{name}: p99 {summary['p99_ms']} ms, baseline allows {baseline['max_p99_ms']} ms")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invocations", type=int, default=DEFAULT_INVOCATIONS)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help='for example "balance=50,transfer=50"')
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="name of a baseline entry to check the run against")
+    args = parser.parse_args(argv)
+
+    report, seconds = asyncio.run(run_load(args.invocations, args.mix, args.concurrency, args.seed))
+    print(json.dumps({"seconds": round(seconds, 3), "commands": report}, indent=2))
+    if args.baseline:
+        problems = check_baselines(report, load_baselines()[args.baseline])
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
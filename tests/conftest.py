@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -5,3 +6,17 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: wall-clock baseline check; run with -m benchmark or RUN_BENCHMARKS=1")
+
+
+def pytest_collection_modifyitems(config, items):
+    # Timing baselines depend on the machine, so only the functional tests run by default.
+    if os.environ.get("RUN_BENCHMARKS") == "1" or "benchmark" in (config.getoption("markexpr") or ""):
+        return
+    kept = [item for item in items if item.get_closest_marker("benchmark") is None]
+    if len(kept) < len(items):
+        config.hook.pytest_deselected(items=[item for item in items if item.get_closest_marker("benchmark")])
+        items[:] = kept
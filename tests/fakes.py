@@ -0,0 +1,219 @@
+"""Offline stand-ins for discord.py models, for driving cogs without a gateway.
+
+Members and channels subclass the real discord.py classes so the cogs'
+``isinstance`` checks pass; anything that would hit the REST API is recorded
+on the object instead.
+"""
+
+import datetime
+import itertools
+from typing import List, Optional
+
+import discord
+from discord.ext import tasks
+
+
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+_message_ids = itertools.count(discord.utils.time_snowflake(EPOCH))
+_interaction_ids = itertools.count(discord.utils.time_snowflake(EPOCH))
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, name: str = "Test Guild"):
+        self.id = guild_id
+        self.name = name
+        self.members: List["FakeMember"] = []
+        self.channels: List["FakeTextChannel"] = []
+        self.me = FakeMember(self, 1, name="Milo", bot=True, permissions=discord.Permissions.all())
+
+    def get_member(self, member_id: int) -> Optional["FakeMember"]:
+        return next((member for member in self.members if member.id == member_id), None)
+
+    def get_channel(self, channel_id: int) -> Optional["FakeTextChannel"]:
+        return next((channel for channel in self.channels if channel.id == channel_id), None)
+
+    def add_member(self, member_id: int, **kwargs) -> "FakeMember":
+        member = FakeMember(self, member_id, **kwargs)
+        self.members.append(member)
+        return member
+
+    def add_channel(self, channel_id: int, name: str = "general") -> "FakeTextChannel":
+        channel = FakeTextChannel(self, channel_id, name)
+        self.channels.append(channel)
+        return channel
+
+
+class FakeMember(discord.Member):
+    def __init__(
+        self,
+        guild: FakeGuild,
+        member_id: int,
+        *,
+        name: Optional[str] = None,
+        bot: bool = False,
+        permissions: Optional[discord.Permissions] = None,
+    ):
+        self.guild = guild
+        self.nick = None
+        self._fake_id = member_id
+        self._fake_name = name or f"member-{member_id}"
+        self._fake_bot = bot
+        self._fake_permissions = permissions or discord.Permissions(send_messages=True, read_messages=True)
+        self.timeouts: List[datetime.datetime] = []
+
+    id = property(lambda self: self._fake_id)
+    name = property(lambda self: self._fake_name)
+    display_name = property(lambda self: self._fake_name)
+    bot = property(lambda self: self._fake_bot)
+    mention = property(lambda self: f"<@{self._fake_id}>")
+    guild_permissions = property(lambda self: self._fake_permissions)
+
+    def __hash__(self) -> int:
+        return hash(self._fake_id)
+
+    def __str__(self) -> str:
+        return self._fake_name
+
+    def __repr__(self) -> str:
+        return f"<FakeMember id={self._fake_id} name={self._fake_name!r}>"
+
+    async def timeout(self, until, *, reason=None):
+        self.timeouts.append(until)
+
+
+class FakeTextChannel(discord.TextChannel):
+    def __init__(self, guild: FakeGuild, channel_id: int, name: str):
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.category_id = None
+        self.sent: List[str] = []
+        self.bulk_deleted: List[int] = []
+
+    def permissions_for(self, member) -> discord.Permissions:
+        return member.guild_permissions
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+    async def delete_messages(self, messages, *, reason=None):
+        self.bulk_deleted.extend(message.id for message in messages)
+
+
+class FakeMessage:
+    def __init__(
+        self,
+        author: FakeMember,
+        channel: FakeTextChannel,
+        content: str,
+        *,
+        mentions: Optional[List[FakeMember]] = None,
+        message_id: Optional[int] = None,
+    ):
+        self.id = message_id if message_id is not None else next(_message_ids)
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.mentions = mentions or []
+        self.attachments = []
+        self.embeds = []
+        self.webhook_id = None
+        self.type = discord.MessageType.default
+        self.deleted = False
+        # commands.Context reads the connection state; prefix commands never touch it here.
+        self._state = None
+
+    async def delete(self, *, delay=None):
+        self.deleted = True
+
+    def __repr__(self) -> str:
+        return f"<FakeMessage id={self.id} author={self.author.id} content={self.content!r}>"
+
+
+class FakeResponse:
+    """Stands in for ``discord.InteractionResponse``; records what the command replied."""
+
+    def __init__(self):
+        self.messages: List[dict] = []
+        self.deferred = False
+        self.ephemeral = False
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    def _respond(self) -> None:
+        if self._done:
+            raise RuntimeError("This interaction has already been responded to.")
+        self._done = True
+
+    async def send_message(self, content=None, *, embed=None, ephemeral=False, **kwargs):
+        self._respond()
+        self.ephemeral = ephemeral
+        self.messages.append({"content": content, "embed": embed, **kwargs})
+
+    async def defer(self, *, ephemeral=False, thinking=False):
+        self._respond()
+        self.deferred = True
+        self.ephemeral = ephemeral
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.messages: List[dict] = []
+
+    async def send(self, content=None, *, embed=None, ephemeral=False, **kwargs):
+        self.messages.append({"content": content, "embed": embed, "ephemeral": ephemeral, **kwargs})
+
+
+class FakeInteraction:
+    def __init__(self, client, user: FakeMember, channel: FakeTextChannel, command_name: Optional[str] = None):
+        self.id = next(_interaction_ids)
+        self.client = client
+        self.user = user
+        self.guild = channel.guild
+        self.guild_id = channel.guild.id
+        self.channel = channel
+        self.channel_id = channel.id
+        self.type = discord.InteractionType.application_command
+        self.data = {"name": (command_name or "").split(" ")[0]}
+        self.command = None
+        self.extras: dict = {}
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+    @property
+    def replies(self) -> List[dict]:
+        return self.response.messages + self.followup.messages
+
+    @property
+    def responded(self) -> bool:
+        return self.response.is_done()
+
+
+async def start_offline_bot(database_path: str, me: FakeMember, cogs=()):
+    """A FunBot with an open database and the given cog classes added, never connected to Discord."""
+    from main import FunBot
+
+    bot = FunBot({}, database_path=database_path)
+    # Normally set by the gateway READY event; prefix command parsing and some cogs read it.
+    bot._connection.user = me
+    await bot.open_database()
+    for cog_class in cogs:
+        cog = cog_class(bot)
+        await bot.add_cog(cog)
+        # Background loops wait for a gateway login that never happens offline.
+        for name, attribute in vars(type(cog)).items():
+            if isinstance(attribute, tasks.Loop):
+                getattr(cog, name).cancel()
+    return bot
+
+
+async def close_offline_bot(bot) -> None:
+    for cog in list(bot.cogs):
+        await bot.remove_cog(cog)
+    await bot.spam_deleter.flush_all()
+    await bot.message_log.close()
+    await bot.storage.close()
+    bot.db = None
@@ -0,0 +1,230 @@
+"""Synthetic message firehose for the on_message hot path.
+
+Drives ``FunBot.on_message`` (message log, anti-spam, automod and AFK stages)
+with generated traffic against a real temporary SQLite database and reports
+throughput, per-message latency and database statements per message.
+
+Run ``python tests/firehose.py --help`` for a standalone run; the pytest
+wrapper in ``test_firehose_benchmark.py`` compares a short run with the stored
+baselines in ``firehose_baselines.json``.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import discord  # noqa: E402
+
+from cogs.moderation import Moderation  # noqa: E402
+from cogs.utility import Utility  # noqa: E402
+from fakes import FakeGuild, FakeMessage, close_offline_bot, start_offline_bot  # noqa: E402
+from loop_watchdog import percentile  # noqa: E402
+
+
+BASELINE_PATH = Path(__file__).with_name("firehose_baselines.json")
+DEFAULT_MIX = {"plain": 60, "mention": 15, "link": 10, "bad_word": 5, "spam_burst": 10}
+DEFAULT_MESSAGES = 2000
+DEFAULT_CONCURRENCY = 50
+BAD_WORDS = ("darn", "heck", "frick")
+GUILD_ID = 4242
+SPAM_BURST_LENGTH = 6
+AFK_EVERY = 20
+
+
+class FirehoseResult:
+    __slots__ = ("messages", "seconds", "latencies", "statements", "automod_hits", "spam_deleted")
+
+    def __init__(self, messages: int, seconds: float, latencies: List[float], statements: int):
+        self.messages = messages
+        self.seconds = seconds
+        self.latencies = sorted(latencies)
+        self.statements = statements
+        self.automod_hits = 0
+        self.spam_deleted = 0
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.messages / self.seconds if self.seconds else 0.0
+
+    @property
+    def statements_per_message(self) -> float:
+        return self.statements / self.messages if self.messages else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "messages": self.messages,
+            "messages_per_second": round(self.messages_per_second, 1),
+            "p50_ms": round(percentile(self.latencies, 0.50) * 1000, 3),
+            "p99_ms": round(percentile(self.latencies, 0.99) * 1000, 3),
+            "statements_per_message": round(self.statements_per_message, 3),
+            "automod_hits": self.automod_hits,
+            "spam_deleted": self.spam_deleted,
+        }
+
+
+def parse_mix(raw: str) -> Dict[str, int]:
+    mix = {}
+    for item in raw.split(","):
+        kind, _, weight = item.partition("=")
+        if kind.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown traffic kind {kind!r}; expected one of {', '.join(DEFAULT_MIX)}.")
+        mix[kind.strip()] = int(weight)
+    return mix
+
+
+def build_guild(members: int = 200, channels: int = 5) -> FakeGuild:
+    guild = FakeGuild(GUILD_ID)
+    for index in range(channels):
+        guild.add_channel(9000 + index, f"channel-{index}")
+    for index in range(members):
+        guild.add_member(10_000 + index)
+    return guild
+
+
+def generate_traffic(guild: FakeGuild, count: int, mix: Dict[str, int], seed: int = 1) -> List[FakeMessage]:
+    """``count`` messages drawn from ``mix``; a spam burst is several messages from one author in one channel."""
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    messages: List[FakeMessage] = []
+    while len(messages) < count:
+        kind = rng.choices(kinds, weights)[0]
+        author = rng.choice(guild.members)
+        channel = rng.choice(guild.channels)
+        if kind == "spam_burst":
+            burst = min(SPAM_BURST_LENGTH, count - len(messages))
+            messages.extend(FakeMessage(author, channel, "buy my stuff") for _ in range(burst))
+            continue
+        if kind == "mention":
+            mentioned = rng.sample(guild.members, 2)
+            content = " ".join(member.mention for member in mentioned) + " are you around?"
+            messages.append(FakeMessage(author, channel, content, mentions=mentioned))
+        elif kind == "link":
+            messages.append(FakeMessage(author, channel, f"look at https://example.com/{rng.randrange(1000)}"))
+        elif kind == "bad_word":
+            messages.append(FakeMessage(author, channel, f"oh {rng.choice(BAD_WORDS)}, that broke"))
+        else:
+            messages.append(FakeMessage(author, channel, f"just chatting about thing number {rng.randrange(1000)}"))
+    return messages
+
+
+async def create_bot(database_path: str, guild: FakeGuild):
+    """A FunBot with the Moderation and Utility cogs, an open database and seeded guild settings."""
+    bot = await start_offline_bot(database_path, guild.me, (Moderation, Utility))
+
+    set_at = discord.utils.utcnow().isoformat()
+    afk_rows = [(guild.id, member.id, "lunch", set_at) for member in guild.members[::AFK_EVERY]]
+
+    def seed(connection):
+        connection.execute(
+            """
+            INSERT INTO automod_settings (guild_id, filter_invites, filter_links, bad_words, action)
+            VALUES (?, 1, 1, ?, 'delete')
+            """,
+            (guild.id, ",".join(BAD_WORDS)),
+        )
+        connection.executemany("INSERT INTO afk_statuses (guild_id, user_id, reason, set_at) VALUES (?, ?, ?, ?)", afk_rows)
+
+    await bot.storage.transaction(seed)
+    bot.storage.recorder.reset()
+    return bot
+
+
+async def run_firehose(bot, messages: List[FakeMessage], concurrency: int = DEFAULT_CONCURRENCY) -> FirehoseResult:
+    """Dispatch ``messages`` through ``bot.on_message`` with up to ``concurrency`` in flight, like the gateway does."""
+    recorder = bot.storage.recorder
+    statements_before = sum(stats.calls for stats in recorder.statements.values())
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def deliver(message: FakeMessage) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await bot.on_message(message)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(deliver(message) for message in messages))
+    # Buffered work is part of the cost of absorbing the traffic.
+    await bot.message_log.close()
+    await bot.spam_deleter.flush_all()
+    await bot.storage.flush_commits()
+    elapsed = time.perf_counter() - started
+
+    statements = sum(stats.calls for stats in recorder.statements.values()) - statements_before
+    result = FirehoseResult(len(messages), elapsed, latencies, statements)
+    result.automod_hits = sum(message.deleted for message in messages)
+    result.spam_deleted = bot.spam_deleter.deleted
+    return result
+
+
+async def benchmark(
+    messages: int = DEFAULT_MESSAGES,
+    mix: Optional[Dict[str, int]] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    seed: int = 1,
+    database_dir: Optional[str] = None,
+) -> FirehoseResult:
+    with tempfile.TemporaryDirectory(dir=database_dir) as directory:
+        guild = build_guild()
+        bot = await create_bot(str(Path(directory) / "firehose.db"), guild)
+        try:
+            traffic = generate_traffic(guild, messages, mix or DEFAULT_MIX, seed)
+            return await run_firehose(bot, traffic, concurrency)
+        finally:
+            await close_offline_bot(bot)
+
+
+def load_baselines(path: Path = BASELINE_PATH) -> Dict[str, Dict[str, float]]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def check_baseline(result: FirehoseResult, baseline: Dict[str, float]) -> List[str]:
+    """Regressions of ``result`` against a baseline entry, as readable messages."""
+    summary = result.summary()
+    problems = []
+    if summary["statements_per_message"] > baseline["max_statements_per_message"]:
+        problems.append(
+            f"{summary['statements_per_message']} statements per message, "
+            f"baseline allows {baseline['max_statements_per_message']}"
+        )
+    if summary["messages_per_second"] < baseline["min_messages_per_second"]:
+        problems.append(
+            f"{summary['messages_per_second']} messages/s, baseline requires {baseline['min_messages_per_second']}"
+        )
+    if summary["p99_ms"] > baseline["max_p99_ms"]:
+        problems.append(f"p99 latency {summary['p99_ms']} ms, baseline allows {baseline['max_p99_ms']} ms")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="for example plain=70,link=20,spam_burst=10")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="name of a baseline entry to check the run against")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(benchmark(args.messages, args.mix, args.concurrency, args.seed))
+    print(json.dumps(result.summary(), indent=2))
+    if args.baseline:
+        problems = check_baseline(result, load_baselines()[args.baseline])
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
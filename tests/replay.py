@@ -0,0 +1,250 @@
+"""Replay a recorded gateway log against an offline bot.
+
+Feeds the events written by ``gateway_log.GatewayRecorder`` (see
+``GATEWAY_RECORD_PATH``) into a ``FunBot`` whose Discord objects are the fakes
+from ``fakes.py``, so nothing reaches the API. Guilds, channels and members
+are created as the log mentions them. Events can be replayed at their
+recorded pace (``--speed 1``, or faster with larger values) or as fast as
+possible (``--speed 0``), and the run reports per-event-kind latency and the
+number of database statements executed, for before/after comparisons.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import discord  # noqa: E402
+
+from cogs.community import Community  # noqa: E402
+from cogs.economy import Economy  # noqa: E402
+from cogs.farming import Farming  # noqa: E402
+from cogs.moderation import Moderation  # noqa: E402
+from cogs.utility import Utility  # noqa: E402
+from command_load import CommandLoadHarness  # noqa: E402
+from fakes import FakeGuild, FakeInteraction, FakeMember, FakeMessage, FakeTextChannel, close_offline_bot, start_offline_bot  # noqa: E402
+from gateway_log import (  # noqa: E402
+    INTERACTION,
+    MEMBER_JOIN,
+    MEMBER_REMOVE,
+    MESSAGE_CREATE,
+    MESSAGE_DELETE,
+    GatewayEvent,
+    read_events,
+)
+from loop_watchdog import percentile  # noqa: E402
+
+
+REPLAY_COGS = (Community, Economy, Farming, Moderation, Utility)
+DEFAULT_CONCURRENCY = 50
+# Recorded IDs start at 1; shift them clear of the fake bot user and other fixed IDs.
+ID_OFFSET = 1_000_000
+MAX_CACHED_MESSAGES = 10_000
+
+
+class ReplayResult:
+    __slots__ = ("seconds", "latencies", "errors", "skipped", "statements")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.skipped = 0
+        self.statements = 0
+
+    @property
+    def events(self) -> int:
+        return sum(len(latencies) for latencies in self.latencies.values())
+
+    def summary(self) -> Dict[str, object]:
+        kinds = {}
+        for kind, latencies in sorted(self.latencies.items()):
+            ordered = sorted(latencies)
+            kinds[kind] = {
+                "events": len(ordered),
+                "errors": self.errors.get(kind, 0),
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+            }
+        return {
+            "events": self.events,
+            "skipped": self.skipped,
+            "seconds": round(self.seconds, 3),
+            "statements": self.statements,
+            "kinds": kinds,
+        }
+
+
+class ReplayDriver:
+    def __init__(self, bot):
+        self.bot = bot
+        self.guilds: Dict[int, FakeGuild] = {}
+        self.messages: Dict[int, FakeMessage] = {}
+        self.commands = CommandLoadHarness(bot)
+        self.result = ReplayResult()
+
+    def guild(self, guild_id: int) -> FakeGuild:
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = self.guilds[guild_id] = FakeGuild(ID_OFFSET + guild_id)
+        return guild
+
+    def channel(self, guild: FakeGuild, channel_id: int) -> FakeTextChannel:
+        return guild.get_channel(ID_OFFSET + channel_id) or guild.add_channel(ID_OFFSET + channel_id, f"channel-{channel_id}")
+
+    def member(self, guild: FakeGuild, user_id: int, *, bot: bool = False) -> FakeMember:
+        return guild.get_member(ID_OFFSET + user_id) or guild.add_member(ID_OFFSET + user_id, bot=bot)
+
+    async def _dispatch(self, event: str, *args) -> None:
+        """Await every listener registered for ``event``, as ``Client.dispatch`` would schedule them."""
+        listeners = self.bot.extra_events.get(f"on_{event}", [])
+        results = await asyncio.gather(*(listener(*args) for listener in listeners), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def _deliver_message(self, message: FakeMessage) -> None:
+        await self.bot.on_message(message)
+        await self._dispatch("message", message)
+
+    def _prepare(self, event: GatewayEvent):
+        """Update the fake state for ``event`` and return the coroutine that delivers it, or None to skip it."""
+        data = event.data
+        guild = self.guild(data["g"])
+        if event.kind == MESSAGE_CREATE:
+            channel = self.channel(guild, data["c"])
+            author = self.member(guild, data["u"], bot=data.get("bot", False))
+            mentions = [self.member(guild, user_id) for user_id in data.get("mentions", [])]
+            message = FakeMessage(author, channel, data["text"], mentions=mentions)
+            self.messages[data["m"]] = message
+            if len(self.messages) > MAX_CACHED_MESSAGES:
+                self.messages.pop(next(iter(self.messages)))
+            return self._deliver_message(message)
+        if event.kind == MESSAGE_DELETE:
+            message = self.messages.pop(data["m"], None)
+            if message is None:
+                return None
+            message.deleted = True
+            return self._dispatch("message_delete", message)
+        if event.kind == MEMBER_JOIN:
+            return self._dispatch("member_join", self.member(guild, data["u"]))
+        if event.kind == MEMBER_REMOVE:
+            member = guild.get_member(ID_OFFSET + data["u"])
+            if member is None:
+                return None
+            guild.members.remove(member)
+            return self._dispatch("member_remove", member)
+        if event.kind == INTERACTION:
+            return self._prepare_interaction(guild, data)
+        return None
+
+    def _prepare_interaction(self, guild: FakeGuild, data: dict):
+        try:
+            command = self.commands.resolve(data["command"])
+        except LookupError:
+            return None
+        channel = self.channel(guild, data["c"])
+        arguments = {}
+        for parameter in command.parameters:
+            if parameter.name not in data["options"]:
+                continue
+            value = data["options"][parameter.name]
+            if parameter.type is discord.AppCommandOptionType.user:
+                value = self.member(guild, value)
+            elif parameter.type is discord.AppCommandOptionType.channel:
+                value = self.channel(guild, value)
+            elif parameter.type in (discord.AppCommandOptionType.role, discord.AppCommandOptionType.mentionable):
+                # Roles are not modelled by the fakes.
+                return None
+            arguments[parameter.name] = value
+        interaction = FakeInteraction(self.bot, self.member(guild, data["u"]), channel, data["command"])
+        return self.commands.invoke(data["command"], interaction, **arguments)
+
+    async def _deliver(self, kind: str, delivery) -> None:
+        started = time.perf_counter()
+        try:
+            await delivery
+        except Exception:
+            self.result.errors[kind] = self.result.errors.get(kind, 0) + 1
+        self.result.latencies.setdefault(kind, []).append(time.perf_counter() - started)
+
+    async def replay(
+        self, events: Iterable[GatewayEvent], speed: float = 0.0, concurrency: int = DEFAULT_CONCURRENCY
+    ) -> ReplayResult:
+        """Deliver ``events`` in order; ``speed`` 1 keeps the recorded pacing, 0 sends them as fast as possible."""
+        recorder = self.bot.storage.recorder
+        statements_before = sum(stats.calls for stats in recorder.statements.values())
+        semaphore = asyncio.Semaphore(concurrency)
+        pending = set()
+
+        async def run(kind: str, delivery) -> None:
+            try:
+                await self._deliver(kind, delivery)
+            finally:
+                semaphore.release()
+
+        started = time.perf_counter()
+        for event in events:
+            if speed > 0:
+                delay = started + event.offset / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await semaphore.acquire()
+            delivery = self._prepare(event)
+            if delivery is None:
+                semaphore.release()
+                self.result.skipped += 1
+                continue
+            # Like the gateway, handlers run as independent tasks so a slow one does not hold up the stream.
+            task = asyncio.create_task(run(event.kind, delivery))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+        await self.bot.message_log.close()
+        await self.bot.spam_deleter.flush_all()
+        await self.bot.storage.flush_commits()
+
+        self.result.seconds = time.perf_counter() - started
+        # The command harness swallows and counts command failures itself.
+        command_errors = sum(stats.errors for stats in self.commands.stats.values())
+        if command_errors:
+            self.result.errors[INTERACTION] = self.result.errors.get(INTERACTION, 0) + command_errors
+        self.result.statements = sum(stats.calls for stats in recorder.statements.values()) - statements_before
+        return self.result
+
+
+async def replay_log(
+    path: str, speed: float = 0.0, concurrency: int = DEFAULT_CONCURRENCY, database_dir: Optional[str] = None
+) -> ReplayResult:
+    with tempfile.TemporaryDirectory(dir=database_dir) as directory:
+        me = FakeGuild(0).me
+        bot = await start_offline_bot(str(Path(directory) / "replay.db"), me, REPLAY_COGS)
+        try:
+            return await ReplayDriver(bot).replay(read_events(path), speed, concurrency)
+        finally:
+            await close_offline_bot(bot)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", help="gateway log written with GATEWAY_RECORD_PATH")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 replays at the recorded pace, 0 as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(replay_log(args.log, args.speed, args.concurrency))
+    print(json.dumps(result.summary(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
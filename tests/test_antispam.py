@@ -0,0 +1,138 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from antispam import BulkDeleter, SpamTracker, content_fingerprint
+from cogs.moderation import FLOOD_THRESHOLD, Moderation
+from fakes import FakeGuild, FakeMessage, close_offline_bot, start_offline_bot
+
+
+def test_spam_tracker_flags_once_per_burst():
+    tracker = SpamTracker(threshold=3, timeframe=7)
+    key = (1, 2, 3)
+
+    results = [tracker.hit(key, now=float(second)) for second in range(6)]
+
+    assert results == [False, False, False, True, False, False]
+
+
+def test_spam_tracker_expires_old_messages_and_can_flag_again():
+    tracker = SpamTracker(threshold=2, timeframe=5)
+    key = (1, 2, 3)
+
+    assert [tracker.hit(key, now=t) for t in (0.0, 1.0, 2.0)] == [False, False, True]
+    assert tracker.hit(key, now=10.0) is False
+    assert tracker.hit(key, now=10.5) is False
+    assert tracker.hit(key, now=11.0) is True
+
+
+def test_spam_tracker_sweeps_idle_keys():
+    tracker = SpamTracker(threshold=5, timeframe=7)
+    tracker.hit("idle", now=0.0)
+    tracker.hit("active", now=9.0)
+
+    removed = tracker.sweep(now=10.0)
+
+    assert removed == 1
+    assert tracker.tracked_keys == 1
+
+
+def test_spam_tracker_evicts_least_recent_key_at_cap():
+    tracker = SpamTracker(threshold=5, timeframe=7, max_keys=2)
+    tracker.hit("a", now=0.0)
+    tracker.hit("b", now=1.0)
+    tracker.hit("a", now=2.0)
+    tracker.hit("c", now=3.0)
+
+    assert tracker.tracked_keys == 2
+    assert tracker.evicted_keys == 1
+    assert tracker.sweep(now=9.5) == 1
+
+
+def test_spam_tracker_records_window_message_ids():
+    tracker = SpamTracker(threshold=2, timeframe=5)
+    key = (1, 2, 3)
+
+    for message_id, now in ((100, 0.0), (101, 1.0), (102, 2.0), (103, 3.0)):
+        tracker.hit(key, message_id, now=now)
+
+    assert tracker.message_ids(key) == [101, 102, 103]
+    assert tracker.message_ids("unknown") == []
+    assert tracker.count(key) == 3
+    assert tracker.count("unknown") == 0
+
+
+def test_content_fingerprint_ignores_copy_paste_variations():
+    fingerprint = content_fingerprint("Claim FREE nitro now!!! <@123> 2024")
+
+    assert fingerprint is not None
+    assert content_fingerprint("claim free   niiitro now <@456> 99") == fingerprint
+    assert content_fingerprint("claim free nitro later") != fingerprint
+    assert content_fingerprint("lol 123") is None
+
+
+@pytest.mark.asyncio
+async def test_flood_stage_removes_every_copy_and_warns_every_poster(tmp_path):
+    guild = FakeGuild(1)
+    first, second = guild.add_channel(10, "general"), guild.add_channel(11, "memes")
+    raiders = [guild.add_member(100 + index) for index in range(FLOOD_THRESHOLD + 2)]
+    bot = await start_offline_bot(str(tmp_path / "flood.db"), guild.me, (Moderation,))
+    try:
+        await bot.get_cog("Moderation").update_automod(guild.id, filter_floods=1, action="warn")
+        messages = [
+            FakeMessage(raider, (first, second)[index % 2], f"join my server for free nitro {index}")
+            for index, raider in enumerate(raiders)
+        ]
+        other = FakeMessage(raiders[0], first, "anyone up for a game tonight?")
+        for message in messages + [other]:
+            await bot.on_message(message)
+        async with bot.storage.read() as db:
+            async with db.execute("SELECT user_id FROM moderation_warnings ORDER BY user_id") as cursor:
+                warned = [row[0] for row in await cursor.fetchall()]
+    finally:
+        await close_offline_bot(bot)
+
+    assert sorted(first.bulk_deleted + second.bulk_deleted) == [message.id for message in messages]
+    assert other.id not in first.bulk_deleted
+    assert warned == [raider.id for raider in raiders]
+
+
+@pytest.mark.asyncio
+async def test_flood_stage_acts_once_per_author(tmp_path):
+    guild = FakeGuild(1)
+    channels = [guild.add_channel(10 + index, f"channel-{index}") for index in range(FLOOD_THRESHOLD + 4)]
+    raider = guild.add_member(100)
+    bot = await start_offline_bot(str(tmp_path / "flood.db"), guild.me, (Moderation,))
+    try:
+        await bot.get_cog("Moderation").update_automod(guild.id, filter_floods=1, action="warn")
+        messages = [FakeMessage(raider, channel, "join my server for free nitro") for channel in channels]
+        for message in messages:
+            await bot.on_message(message)
+        async with bot.storage.read() as db:
+            async with db.execute("SELECT COUNT(*) FROM moderation_warnings WHERE user_id = ?", (raider.id,)) as cursor:
+                (warnings,) = await cursor.fetchone()
+    finally:
+        await close_offline_bot(bot)
+
+    notices = [text for channel in channels for text in channel.sent if text and "removed by automod" in text]
+    assert sum(len(channel.bulk_deleted) for channel in channels) == len(messages)
+    assert warnings == 1
+    assert len(notices) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_deleter_coalesces_offenders_per_channel():
+    deleter = BulkDeleter(delay=0.01)
+    channel = SimpleNamespace(id=7, delete_messages=AsyncMock())
+
+    deleter.queue(channel, [3, 1])
+    deleter.queue(channel, [2, 3])
+    await asyncio.sleep(0.05)
+
+    channel.delete_messages.assert_awaited_once()
+    deleted = channel.delete_messages.await_args.args[0]
+    assert [item.id for item in deleted] == [1, 2, 3]
+    assert deleter.requests == 1
+    assert deleter.pending_channels == 0
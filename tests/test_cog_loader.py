@@ -0,0 +1,79 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from cog_loader import LazyCommandTree, discover_app_commands, load_extensions
+
+
+COGS = Path(__file__).resolve().parents[1] / "cogs"
+
+
+def test_discover_app_commands_finds_top_level_commands_and_groups():
+    assert "tweet" in discover_app_commands(COGS / "fun.py")
+
+    utility = discover_app_commands(COGS / "utility.py")
+    assert {"help", "reminders"} <= set(utility)
+    assert "list" not in utility
+
+
+def test_discover_app_commands_skips_subgroups(tmp_path):
+    source = tmp_path / "sample.py"
+    source.write_text(
+        "class Sample:\n"
+        "    root = app_commands.Group(name='root', description='x')\n"
+        "    child = app_commands.Group(name='child', description='x', parent=root)\n"
+        "    @app_commands.command()\n"
+        "    async def ping(self, interaction): ...\n"
+        "    @root.command(name='leaf')\n"
+        "    async def leaf(self, interaction): ...\n",
+        encoding="utf-8",
+    )
+
+    assert discover_app_commands(source) == ["root", "ping"]
+
+
+class FakeBot:
+    def __init__(self, fail=()):
+        self.extensions = {}
+        self.loaded = []
+        self.fail = set(fail)
+
+    async def load_extension(self, name):
+        if name in self.fail:
+            raise RuntimeError("boom")
+        self.loaded.append(name)
+        self.extensions[name] = object()
+
+
+@pytest.mark.asyncio
+async def test_load_extensions_times_successful_loads_only():
+    bot = FakeBot(fail={"cogs.broken"})
+
+    timings = await load_extensions(bot, ["cogs.a", "cogs.broken", "cogs.b"])
+
+    assert set(timings) == {"cogs.a", "cogs.b"}
+    assert bot.loaded == ["cogs.a", "cogs.b"]
+
+
+@pytest.mark.asyncio
+async def test_lazy_tree_loads_extension_on_first_invocation():
+    bot = FakeBot()
+    tree = LazyCommandTree.__new__(LazyCommandTree)
+    tree.client = bot
+    tree.lazy_extensions = {}
+    tree._lazy_lock = asyncio.Lock()
+    tree.register_lazy("cogs.fun", ["tweet", "meme"])
+
+    interaction = SimpleNamespace(type=discord.InteractionType.application_command, data={"name": "tweet"}, extras={})
+    assert await tree.interaction_check(interaction) is True
+    assert await tree.interaction_check(interaction) is True
+
+    other = SimpleNamespace(type=discord.InteractionType.application_command, data={"name": "ping"}, extras={})
+    assert await tree.interaction_check(other) is True
+
+    assert bot.loaded == ["cogs.fun"]
+    assert tree.lazy_extensions == {}
+    assert "started_at" in interaction.extras
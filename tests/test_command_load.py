@@ -0,0 +1,56 @@
+import pytest
+
+from command_load import (
+    CommandLoadHarness,
+    build_guild,
+    check_baselines,
+    create_bot,
+    load_baselines,
+    run_load,
+)
+from fakes import FakeInteraction, close_offline_bot
+
+
+@pytest.mark.asyncio
+async def test_harness_invokes_commands_and_charges_lock_waits(tmp_path):
+    guild, moderator = build_guild(members=4)
+    bot = await create_bot(str(tmp_path / "commands.db"), guild)
+    channel = guild.channels[0]
+    sender, receiver = guild.members[0], guild.members[1]
+    try:
+        harness = CommandLoadHarness(bot)
+        transfer = FakeInteraction(bot, sender, channel, "transfer")
+        warn = FakeInteraction(bot, moderator, channel, "warn")
+        await harness.fire(
+            [
+                ("transfer", transfer, {"member": receiver, "amount": 5}),
+                ("warn", warn, {"member": receiver, "reason": "test"}),
+                ("farm harvest", FakeInteraction(bot, sender, channel, "farm"), {}),
+            ],
+            concurrency=1,
+        )
+        economy = bot.get_cog("Economy")
+        assert await economy.get_or_create_user(guild.id, receiver.id) == 105
+    finally:
+        await close_offline_bot(bot)
+
+    report = harness.report()
+    assert set(report) == {"transfer", "warn", "farm harvest"}
+    assert all(summary["errors"] == 0 and summary["unanswered"] == 0 for summary in report.values())
+    assert transfer.responded and warn.responded
+
+
+@pytest.mark.asyncio
+async def test_command_load_answers_every_invocation(tmp_path):
+    report, _ = await run_load(invocations=600, concurrency=50, database_dir=str(tmp_path))
+
+    assert all(summary["errors"] == 0 and summary["unanswered"] == 0 for summary in report.values())
+    assert sum(summary["calls"] for summary in report.values()) == 600
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_command_load_meets_stored_baselines(tmp_path):
+    report, _ = await run_load(invocations=600, concurrency=50, database_dir=str(tmp_path))
+
+    assert check_baselines(report, load_baselines()["default"]) == []
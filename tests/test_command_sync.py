@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import discord
+import pytest
+from discord import app_commands
+
+from command_sync import sync_commands, tree_fingerprint
+from migrations import migrate
+from storage import Storage
+
+
+def _tree(description="Replies with pong."):
+    tree = app_commands.CommandTree(discord.Client(intents=discord.Intents.none()))
+
+    @tree.command(name="ping", description=description)
+    async def ping(interaction: discord.Interaction):
+        pass
+
+    @tree.command(name="echo", description="Echo text.")
+    async def echo(interaction: discord.Interaction, text: str):
+        pass
+
+    tree.sync = AsyncMock(return_value=[])
+    return tree
+
+
+@pytest.mark.asyncio
+async def test_fingerprint_is_stable_and_tracks_definition_changes():
+    assert tree_fingerprint(_tree()) == tree_fingerprint(_tree())
+    assert tree_fingerprint(_tree()) != tree_fingerprint(_tree(description="Different."))
+
+
+@pytest.mark.asyncio
+async def test_sync_only_runs_when_fingerprint_changes():
+    storage = Storage(":memory:")
+    await storage.open()
+    await storage.transaction(migrate)
+    bot = SimpleNamespace(tree=_tree(), storage=storage)
+    try:
+        assert await sync_commands(bot) == ["global"]
+        assert await sync_commands(bot) == []
+        assert await sync_commands(bot, force=True) == ["global"]
+        assert bot.tree.sync.await_count == 2
+
+        bot.tree = _tree(description="Changed.")
+        assert await sync_commands(bot) == ["global"]
+    finally:
+        await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_dev_guilds_receive_global_commands_instead_of_a_global_sync():
+    storage = Storage(":memory:")
+    await storage.open()
+    await storage.transaction(migrate)
+    bot = SimpleNamespace(tree=_tree(), storage=storage)
+    try:
+        assert await sync_commands(bot, [123, 456]) == ["guild:123", "guild:456"]
+        synced_guilds = [call.kwargs["guild"].id for call in bot.tree.sync.await_args_list]
+        assert synced_guilds == [123, 456]
+        assert {command.name for command in bot.tree.get_commands(guild=discord.Object(id=123))} == {"ping", "echo"}
+    finally:
+        await storage.close()
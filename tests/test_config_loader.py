@@ -67,3 +67,24 @@ def test_load_runtime_config_falls_back_to_config_json(monkeypatch, tmp_path):
     assert config["ALLOWED_CHAT_MODELS"] == ["gpt-test", "gpt-other"]
     assert config["GOOGLE_API_KEY"] == "google-key"
     assert config["GOOGLE_CSE_ID"] == "search-id"
+
+
+def test_load_runtime_config_parses_integer_limits(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SPAM_TRACKER_MAX_KEYS", "1234")
+    assert load_runtime_config()["SPAM_TRACKER_MAX_KEYS"] == 1234
+
+    monkeypatch.setenv("SPAM_TRACKER_MAX_KEYS", "not-a-number")
+    assert load_runtime_config()["SPAM_TRACKER_MAX_KEYS"] == 50000
+
+
+def test_load_runtime_config_reads_message_log_limits(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    assert load_runtime_config()["MESSAGE_LOG_OVERFLOW"] == "drop-oldest"
+
+    monkeypatch.setenv("MESSAGE_LOG_QUEUE_MAX", "250")
+    monkeypatch.setenv("MESSAGE_LOG_OVERFLOW", " Sample ")
+    config = load_runtime_config()
+
+    assert config["MESSAGE_LOG_QUEUE_MAX"] == 250
+    assert config["MESSAGE_LOG_OVERFLOW"] == "sample"
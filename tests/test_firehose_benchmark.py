@@ -0,0 +1,41 @@
+import pytest
+
+from fakes import FakeMessage, close_offline_bot
+from firehose import benchmark, build_guild, check_baseline, create_bot, load_baselines, run_firehose
+
+
+@pytest.mark.asyncio
+async def test_firehose_stages_act_on_generated_traffic(tmp_path):
+    guild = build_guild(members=40, channels=1)
+    bot = await create_bot(str(tmp_path / "firehose.db"), guild)
+    channel = guild.channels[0]
+    author, afk_member = guild.members[1], guild.members[0]
+    try:
+        messages = [
+            FakeMessage(author, channel, "hello there"),
+            FakeMessage(author, channel, "oh heck, that broke"),
+            FakeMessage(author, channel, f"{afk_member.mention} ping", mentions=[afk_member]),
+        ]
+        result = await run_firehose(bot, messages, concurrency=1)
+    finally:
+        await close_offline_bot(bot)
+
+    assert [message.deleted for message in messages] == [False, True, False]
+    assert any("is AFK" in text for text in channel.sent)
+    assert result.statements > 0
+
+
+@pytest.mark.asyncio
+async def test_firehose_deletes_blocked_words_and_spam(tmp_path):
+    result = await benchmark(messages=1000, database_dir=str(tmp_path))
+
+    assert result.automod_hits > 0
+    assert result.spam_deleted > 0
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_firehose_meets_stored_baseline(tmp_path):
+    result = await benchmark(messages=1000, database_dir=str(tmp_path))
+
+    assert check_baseline(result, load_baselines()["default"]) == []
@@ -0,0 +1,146 @@
+import threading
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+import gateway_log
+
+from fakes import FakeGuild, FakeMessage, close_offline_bot, start_offline_bot
+from gateway_log import (
+    FLUSH_EVERY,
+    INTERACTION,
+    MEMBER_JOIN,
+    MESSAGE_CREATE,
+    MESSAGE_DELETE,
+    Anonymizer,
+    GatewayRecorder,
+    read_events,
+)
+from replay import ID_OFFSET, REPLAY_COGS, ReplayDriver
+
+
+def test_anonymizer_keeps_message_shape_but_not_content():
+    anonymizer = Anonymizer()
+
+    text = anonymizer.text("hey <@!555> see https://secret.example/path or discord.gg/abc123 at 10pm")
+
+    assert text == "xxx <@!1> xxx https://example.com/link xx discord.gg/invite xx 00xx"
+    assert anonymizer.id(555) == 1
+    assert anonymizer.id(777) == 2
+
+
+def test_anonymizer_remembers_only_recent_message_ids():
+    anonymizer = Anonymizer(max_message_ids=2)
+
+    numbers = [anonymizer.message_id(message_id) for message_id in (900, 901, 902)]
+
+    assert numbers == [1, 2, 3]
+    assert anonymizer.message_id(902, forget=True) == 3
+    assert anonymizer.message_id(900, forget=True) == 4
+    assert anonymizer.message_id(901) == 2
+    assert len(anonymizer._message_ids) == 1
+    assert anonymizer.id(555) == 1
+
+
+def _interaction(guild_id, channel_id, user_id, data):
+    return SimpleNamespace(
+        type=discord.InteractionType.application_command,
+        guild_id=guild_id,
+        channel_id=channel_id,
+        user=SimpleNamespace(id=user_id),
+        data=data,
+    )
+
+
+@pytest.mark.asyncio
+async def test_recorded_log_round_trips(tmp_path):
+    path = str(tmp_path / "events.jsonl.gz")
+    guild = FakeGuild(900)
+    channel = guild.add_channel(901)
+    alice, bob = guild.add_member(902), guild.add_member(903)
+    recorder = GatewayRecorder(path)
+
+    message = FakeMessage(alice, channel, f"hi {bob.mention}", mentions=[bob])
+    await recorder.on_message(message)
+    await recorder.on_raw_message_delete(SimpleNamespace(guild_id=900, channel_id=901, message_id=message.id))
+    await recorder.on_member_join(bob)
+    await recorder.on_interaction(
+        _interaction(
+            900,
+            901,
+            902,
+            {
+                "name": "farm",
+                "options": [{"type": 1, "name": "harvest", "options": []}],
+            },
+        )
+    )
+    recorder.close()
+
+    events = list(read_events(path))
+    assert [event.kind for event in events] == [MESSAGE_CREATE, MESSAGE_DELETE, MEMBER_JOIN, INTERACTION]
+    bob_id = recorder.anonymizer.id(bob.id)
+    assert events[0].data["text"] == f"xx <@{bob_id}>"
+    assert events[0].data["mentions"] == [bob_id]
+    assert events[1].data["m"] == events[0].data["m"]
+    assert events[3].data["command"] == "farm harvest"
+
+
+def test_recorder_writes_on_its_own_thread(tmp_path, monkeypatch):
+    opened_on = []
+    real_open = gateway_log._open
+
+    def tracking_open(path, mode):
+        opened_on.append(threading.current_thread().name)
+        return real_open(path, mode)
+
+    monkeypatch.setattr(gateway_log, "_open", tracking_open)
+    path = str(tmp_path / "events.jsonl")
+    recorder = GatewayRecorder(path)
+    for _ in range(FLUSH_EVERY + 1):
+        recorder.record(MEMBER_JOIN, {"g": 1, "u": 2})
+    recorder.close()
+
+    assert opened_on == ["gateway-recorder"]
+    assert len(list(read_events(path))) == FLUSH_EVERY + 1
+
+
+@pytest.mark.asyncio
+async def test_replay_drives_messages_members_and_commands(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    guild = FakeGuild(900)
+    channel = guild.add_channel(901)
+    alice, bob = guild.add_member(902), guild.add_member(903)
+    recorder = GatewayRecorder(path)
+    for index in range(3):
+        await recorder.on_message(FakeMessage(alice, channel, f"message {index}"))
+    await recorder.on_member_join(bob)
+    await recorder.on_interaction(
+        _interaction(
+            900,
+            901,
+            902,
+            {"name": "transfer", "options": [{"type": 6, "name": "member", "value": "903"}, {"type": 4, "name": "amount", "value": 7}]},
+        )
+    )
+    await recorder.on_interaction(_interaction(900, 901, 902, {"name": "no-such-command"}))
+    recorder.close()
+
+    bot = await start_offline_bot(str(tmp_path / "replay.db"), FakeGuild(0).me, REPLAY_COGS)
+    try:
+        driver = ReplayDriver(bot)
+        result = await driver.replay(read_events(path))
+        replayed = driver.guild(1)
+        receiver = replayed.get_member(ID_OFFSET + recorder.anonymizer.id(bob.id))
+        balance = await bot.get_cog("Economy").get_or_create_user(replayed.id, receiver.id)
+    finally:
+        await close_offline_bot(bot)
+
+    summary = result.summary()
+    assert summary["kinds"][MESSAGE_CREATE]["events"] == 3
+    assert summary["kinds"][MEMBER_JOIN]["events"] == 1
+    assert summary["skipped"] == 1
+    assert not result.errors
+    assert balance == 107
+    assert result.statements > 0
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from cogs.chat import Chat
+from cogs.community import Community
+from cogs.moderation import Moderation
+from fakes import FakeGuild, close_offline_bot, start_offline_bot
+from guild_config import ChatGuildConfig, GuildConfigCache
+
+
+class _SlowLoader:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, guild_id: int) -> ChatGuildConfig:
+        self.calls += 1
+        persona = f"load {self.calls}"
+        await self.release.wait()
+        return ChatGuildConfig(openai_key=None, persona=persona)
+
+
+def test_snapshots_are_immutable():
+    snapshot = ChatGuildConfig(openai_key="key", persona=None)
+
+    with pytest.raises(AttributeError):
+        snapshot.persona = "changed"
+    with pytest.raises(TypeError):
+        ChatGuildConfig(openai_key=None, persona=None, model="gpt")
+    assert snapshot == ChatGuildConfig(openai_key="key", persona=None)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    cache = GuildConfigCache()
+    loader = _SlowLoader()
+    cache.register("chat_config", loader)
+
+    waiters = [asyncio.create_task(cache.get("chat_config", 1)) for _ in range(200)]
+    await asyncio.sleep(0)
+    loader.release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert loader.calls == 1
+    assert {result.persona for result in results} == {"load 1"}
+    assert await cache.get("chat_config", 1) is results[0]
+    assert cache.cache_stats() == {"guild_config.chat_config": (200, 1)}
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_discards_the_stale_result():
+    cache = GuildConfigCache()
+    loader = _SlowLoader()
+    cache.register("chat_config", loader)
+
+    stale = asyncio.create_task(cache.get("chat_config", 1))
+    await asyncio.sleep(0)
+    cache.invalidate("chat_config", 1)
+    fresh = asyncio.create_task(cache.get("chat_config", 1))
+    await asyncio.sleep(0)
+    loader.release.set()
+
+    assert (await stale).persona == "load 1"
+    assert (await fresh).persona == "load 2"
+    assert (await cache.get("chat_config", 1)).persona == "load 2"
+
+
+@pytest.mark.asyncio
+async def test_failed_loads_are_not_cached_and_evictions_are_lru():
+    cache = GuildConfigCache(max_entries=2)
+    attempts = []
+
+    async def loader(guild_id: int) -> ChatGuildConfig:
+        attempts.append(guild_id)
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+        return ChatGuildConfig(openai_key=None, persona=str(guild_id))
+
+    cache.register("chat_config", loader)
+    with pytest.raises(RuntimeError):
+        await cache.get("chat_config", 1)
+    for guild_id in (1, 2, 1, 3, 1):
+        await cache.get("chat_config", guild_id)
+
+    assert attempts == [1, 1, 2, 3]
+    assert len(cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_cog_writers_invalidate_their_snapshots(tmp_path):
+    guild = FakeGuild(1)
+    bot = await start_offline_bot(str(tmp_path / "bot.db"), guild.me, (Moderation, Community, Chat))
+    try:
+        moderation = bot.get_cog("Moderation")
+        community = bot.get_cog("Community")
+        chat = bot.get_cog("Chat")
+
+        assert (await moderation.get_automod_settings(guild.id)).bad_words == ()
+        assert await moderation.mutate_whitelist(guild.id, 55, add=True) == [55]
+        await moderation.update_automod(guild.id, bad_words="spam,scam")
+        settings = await moderation.get_automod_settings(guild.id)
+        assert settings.bad_words == ("spam", "scam")
+        assert settings.whitelist_channel_ids == (55,)
+
+        assert (await community.get_settings(guild.id)).modlog_channel_id is None
+        await community.update_setting(guild.id, "modlog_channel_id", 77)
+        assert (await community.get_settings(guild.id)).modlog_channel_id == 77
+
+        await chat.set_guild_persona(guild.id, "pirate")
+        await chat.update_policy(guild.id, cooldown_seconds=30)
+        assert (await chat.get_guild_config(guild.id)).persona == "pirate"
+        assert (await chat.get_policy(guild.id)).cooldown_seconds == 30
+        assert (await chat.get_policy(None)).cooldown_seconds == 8
+
+        hits, misses = bot.cache_stats()["guild_config.automod"]
+        assert (hits, misses) == (1, 2)
+    finally:
+        await close_offline_bot(bot)
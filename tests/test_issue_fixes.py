@@ -2,6 +2,7 @@ from datetime import timedelta
 from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
+import aiohttp
 import discord
 import pytest
 
@@ -9,6 +10,9 @@ from cogs.chat import COOLDOWN_RETENTION, Chat
 from cogs.community import Community, SCHEDULE_BATCH_SIZE
 from cogs.economy import Economy
 from cogs.utility import REMINDER_BATCH_SIZE, Utility
+from fakes import FakeGuild, FakeMessage, close_offline_bot, start_offline_bot
+from main import SPAM_THRESHOLD
+from message_pipeline import MessageContext
 
 
 class FakeCursor:
@@ -44,6 +48,10 @@ class FakeDB:
         self.commit_calls += 1
 
 
+def _storage_bot(db, **attributes):
+    return SimpleNamespace(db=db, storage=SimpleNamespace(write=lambda: db), **attributes)
+
+
 @pytest.mark.asyncio
 async def test_afk_listener_deduplicates_repeated_mentions():
     utility = Utility.__new__(Utility)
@@ -63,7 +71,7 @@ async def test_afk_listener_deduplicates_repeated_mentions():
         mentions=[mentioned_user, mentioned_user],
     )
 
-    await Utility.afk_message_listener(utility, message)
+    await Utility.afk_stage(utility, MessageContext(message))
 
     utility.get_many_afk_statuses.assert_awaited_once_with(555, [42])
     channel.send.assert_awaited_once()
@@ -74,7 +82,7 @@ async def test_afk_listener_deduplicates_repeated_mentions():
 @pytest.mark.asyncio
 async def test_reminder_loop_queries_due_work_in_bounded_batches():
     utility = Utility.__new__(Utility)
-    utility.bot = SimpleNamespace(db=FakeDB(), get_user=lambda user_id: None)
+    utility.bot = _storage_bot(FakeDB(), get_user=lambda user_id: None)
 
     await Utility.reminder_loop.coro(utility)
 
@@ -82,10 +90,43 @@ async def test_reminder_loop_queries_due_work_in_bounded_batches():
     assert cursor.executed[0][1][1] == REMINDER_BATCH_SIZE
 
 
+@pytest.mark.asyncio
+async def test_reminder_loop_keeps_delivered_state_when_a_later_send_raises(tmp_path):
+    guild = FakeGuild(1)
+    bot = await start_offline_bot(str(tmp_path / "reminders.db"), guild.me, (Utility,))
+    try:
+        utility = bot.get_cog("Utility")
+        due = discord.utils.utcnow() - timedelta(minutes=1)
+        for user_id in (11, 12, 13):
+            await utility.create_reminder(user_id, None, guild.id, due + timedelta(seconds=user_id), f"task {user_id}")
+
+        sent = []
+
+        async def send(user_id, text):
+            if user_id == 12:
+                raise aiohttp.ClientError("connection reset")
+            sent.append(user_id)
+
+        bot.get_user = lambda user_id: SimpleNamespace(
+            id=user_id, mention=f"<@{user_id}>", send=lambda text: send(user_id, text)
+        )
+        with pytest.raises(aiohttp.ClientError):
+            await Utility.reminder_loop.coro(utility)
+
+        async with bot.storage.read() as db, db.cursor() as cursor:
+            await cursor.execute("SELECT user_id FROM reminders ORDER BY user_id")
+            remaining = [row[0] for row in await cursor.fetchall()]
+    finally:
+        await close_offline_bot(bot)
+
+    assert sent == [11]
+    assert remaining == [12, 13]
+
+
 @pytest.mark.asyncio
 async def test_schedule_loop_queries_due_work_in_bounded_batches():
     community = Community.__new__(Community)
-    community.bot = SimpleNamespace(db=FakeDB())
+    community.bot = _storage_bot(FakeDB())
 
     await Community.schedule_loop.coro(community)
 
@@ -120,3 +161,21 @@ def test_economy_guild_lock_is_scoped_per_guild():
 
     assert guild_one_lock is same_guild_lock
     assert guild_one_lock is not other_guild_lock
+
+
+@pytest.mark.asyncio
+async def test_anti_spam_ignores_direct_messages(tmp_path):
+    guild = FakeGuild(1)
+    channel = guild.add_channel(10, "dm")
+    author = guild.add_member(100)
+    bot = await start_offline_bot(str(tmp_path / "dm.db"), guild.me, ())
+    try:
+        for _ in range(SPAM_THRESHOLD + 2):
+            message = FakeMessage(author, channel, "hello?")
+            message.guild = None
+            await bot.on_message(message)
+    finally:
+        await close_offline_bot(bot)
+
+    assert channel.sent == []
+    assert channel.bulk_deleted == []
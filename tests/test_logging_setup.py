@@ -0,0 +1,59 @@
+import io
+import json
+import logging
+
+import pytest
+
+from logging_setup import LOG_FORMAT_JSON, SamplingFilter, parse_sample_rates, setup_logging
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def _record(name: str, level: int = logging.ERROR) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, "boom", None, None)
+
+
+def test_parse_sample_rates_skips_malformed_entries():
+    assert parse_sample_rates(["cogs.fun=10", "cogs.chat", "x=abc", "y=1", " cogs.media = 3 "]) == {
+        "cogs.fun": 10,
+        "cogs.media": 3,
+    }
+
+
+def test_sampling_filter_keeps_one_in_n_per_logger_tree():
+    sampler = SamplingFilter({"cogs.interactions": 3})
+
+    kept = [sampler.filter(_record("cogs.interactions.gifs")) for _ in range(7)]
+
+    assert kept == [True, False, False, True, False, False, True]
+    assert sampler.filter(_record("cogs.fun"))
+    assert sampler.filter(_record("cogs.interactions", logging.CRITICAL))
+
+
+def test_setup_logging_writes_json_from_the_listener_thread(restore_root_logger):
+    stream = io.StringIO()
+    listener = setup_logging("info", LOG_FORMAT_JSON, {"noisy": 2}, stream=stream)
+    try:
+        log = logging.getLogger("milo.test")
+        log.debug("hidden")
+        log.info("hello %s", "world")
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            log.exception("failed")
+        for _ in range(3):
+            logging.getLogger("noisy").warning("again")
+    finally:
+        listener.stop()
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [entry["message"] for entry in entries] == ["hello world", "failed", "again", "again"]
+    assert "ValueError: bad" in entries[1]["exception"]
+    assert entries[3]["suppressed"] == 1
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import pytest
+
+from loop_watchdog import LoopWatchdog, percentile
+
+
+def test_percentile_picks_nearest_rank():
+    values = [float(value) for value in range(101)]
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0.0
+
+
+def _block_the_loop():
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_watchdog_captures_the_blocking_task():
+    watchdog = LoopWatchdog(interval=0.02, stall_ms=60)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.1)
+
+        async def tweet():
+            _block_the_loop()
+
+        await asyncio.create_task(tweet(), name="command:tweet")
+        await asyncio.sleep(0.1)
+    finally:
+        await watchdog.stop()
+
+    assert watchdog.stall_count == 1
+    report = watchdog.stalls[-1]
+    assert report.task_name == "command:tweet"
+    assert "_block_the_loop" in report.stack
+    assert report.duration >= 0.25
+    assert watchdog.max_lag >= 0.2
+    assert watchdog.percentiles()["p99"] >= watchdog.percentiles()["p50"]
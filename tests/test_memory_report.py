@@ -0,0 +1,71 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from memory_report import (
+    deep_sizeof,
+    format_memory_report,
+    memory_report,
+    start_allocation_tracing,
+    stop_allocation_tracing,
+    top_allocations,
+)
+
+
+class _Slotted:
+    __slots__ = ("payload",)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+
+def test_deep_sizeof_counts_nested_values_once():
+    text = "x" * 10_000
+    shared = {"a": text, "b": text}
+
+    assert deep_sizeof(shared) >= sys.getsizeof(text)
+    assert deep_sizeof(shared) < 2 * sys.getsizeof(text)
+    assert deep_sizeof(_Slotted([text])) > sys.getsizeof(text)
+
+
+def test_deep_sizeof_extrapolates_large_containers():
+    values = {index: f"value-{index:06d}" for index in range(5000)}
+
+    exact = deep_sizeof(values, sample_limit=10_000)
+    sampled = deep_sizeof(values, sample_limit=100)
+
+    assert abs(sampled - exact) / exact < 0.05
+
+
+def test_deep_sizeof_does_not_follow_library_objects():
+    lock = asyncio.Lock()
+
+    assert deep_sizeof({"lock": lock}) < 2000
+
+
+def test_memory_report_collects_bot_and_cog_structures():
+    conversations = {("guild", 1): [{"role": "user", "content": "hi" * 50}]}
+    cog = SimpleNamespace(memory_stats=lambda: {"conversations": (len(conversations), conversations)})
+    bot = SimpleNamespace(memory_stats=lambda: {"spam_tracker": (0, {})}, cogs={"Chat": cog})
+
+    report = memory_report(bot)
+
+    assert [name for name, _, _ in report] == ["chat.conversations", "bot.spam_tracker"]
+    assert report[0][1] == 1
+    assert "chat.conversations" in format_memory_report(report)
+
+
+@pytest.mark.asyncio
+async def test_allocation_tracing_reports_top_sites():
+    assert await top_allocations() is None
+    assert start_allocation_tracing()
+    try:
+        retained = [bytearray(1024) for _ in range(200)]
+        report = await top_allocations(5)
+    finally:
+        assert stop_allocation_tracing()
+
+    assert "test_memory_report.py" in report
+    assert retained
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from message_log import OVERFLOW_SAMPLE, MessageLogWriter
+
+
+class RecordingFlush:
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, batch):
+        self.batches.append(list(batch))
+
+
+def test_drop_oldest_keeps_newest_rows_when_full():
+    writer = MessageLogWriter(RecordingFlush(), max_queue=3)
+
+    for row in range(5):
+        assert writer.submit((row,)) is True
+
+    assert writer.depth == 3
+    assert writer.dropped == 2
+    assert list(writer._buffer) == [(2,), (3,), (4,)]
+
+
+def test_sample_policy_keeps_one_in_ten_overflowing_rows():
+    writer = MessageLogWriter(RecordingFlush(), max_queue=2, overflow=OVERFLOW_SAMPLE)
+    writer.submit((0,))
+    writer.submit((1,))
+
+    accepted = [writer.submit((row,)) for row in range(2, 22)]
+
+    assert accepted.count(True) == 2
+    assert writer.dropped == 20
+    assert writer.depth == 2
+
+
+def test_batch_size_grows_with_queue_depth():
+    writer = MessageLogWriter(RecordingFlush(), min_batch=10, max_batch=100)
+    assert writer.batch_size() == 10
+
+    for row in range(40):
+        writer.submit((row,))
+    assert writer.batch_size() == 40
+
+    for row in range(200):
+        writer.submit((row,))
+    assert writer.batch_size() == 100
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_on_interval_and_drains_on_close():
+    flush = RecordingFlush()
+    writer = MessageLogWriter(flush, min_batch=10, max_batch=20, flush_interval=0.01)
+    writer.start()
+
+    writer.submit((1,))
+    writer.submit((2,))
+    await asyncio.sleep(0.05)
+    assert flush.batches == [[(1,), (2,)]]
+
+    for row in range(45):
+        writer.submit((row,))
+    await writer.close()
+
+    assert [len(batch) for batch in flush.batches] == [2, 20, 20, 5]
+    assert writer.submit((99,)) is False
+    stats = writer.stats()
+    assert stats["rows_written"] == 47
+    assert stats["flushes"] == 4
+    assert stats["depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_counted_and_writer_keeps_running():
+    calls = []
+
+    async def flaky(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("disk full")
+
+    writer = MessageLogWriter(flaky, min_batch=1, flush_interval=0.01)
+    writer.start()
+    writer.submit((1,))
+    await asyncio.sleep(0.02)
+    writer.submit((2,))
+    await writer.close()
+
+    assert writer.failed == 1
+    assert writer.rows_written == 1
+
+
+@pytest.mark.asyncio
+async def test_paused_writer_holds_batches_until_resumed():
+    flush = RecordingFlush()
+    writer = MessageLogWriter(flush, min_batch=1, flush_interval=0.01)
+    writer.start()
+
+    async with writer.paused():
+        writer.submit((1,))
+        writer.submit((2,))
+        await asyncio.sleep(0.03)
+        assert flush.batches == []
+    await writer.close()
+
+    assert flush.batches == [[(1,), (2,)]]
+
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from message_pipeline import MessagePipeline
+
+
+def make_message(content="Hello There", bot=False, guild=True):
+    return SimpleNamespace(
+        content=content,
+        author=SimpleNamespace(id=1, bot=bot),
+        guild=SimpleNamespace(id=10) if guild else None,
+        channel=SimpleNamespace(id=20),
+    )
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_bot_messages_in_prefilter():
+    pipeline = MessagePipeline()
+    stage = AsyncMock()
+    pipeline.register("stage", stage)
+
+    context = await pipeline.dispatch(make_message(bot=True))
+
+    assert context is None
+    stage.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_stages_in_order_and_shares_context():
+    pipeline = MessagePipeline()
+    seen = []
+
+    async def late(context):
+        seen.append(("late", context.lowered))
+
+    async def early(context):
+        seen.append(("early", context.lowered))
+
+    pipeline.register("late", late, order=20)
+    pipeline.register("early", early, order=10)
+
+    await pipeline.dispatch(make_message())
+
+    assert seen == [("early", "hello there"), ("late", "hello there")]
+    assert pipeline.timings()["early"]["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_honours_guild_only_stop_and_failures():
+    pipeline = MessagePipeline()
+    guild_stage = AsyncMock()
+    after_stop = AsyncMock()
+
+    async def failing(context):
+        raise RuntimeError("boom")
+
+    async def stopping(context):
+        context.stop()
+
+    pipeline.register("guild", guild_stage, order=0, guild_only=True)
+    pipeline.register("failing", failing, order=1)
+    pipeline.register("stopping", stopping, order=2)
+    pipeline.register("after", after_stop, order=3)
+
+    await pipeline.dispatch(make_message(guild=False))
+
+    guild_stage.assert_not_awaited()
+    after_stop.assert_not_awaited()
+    assert pipeline.timings()["failing"]["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_context_loads_guild_settings_once():
+    pipeline = MessagePipeline()
+    loader = AsyncMock(return_value={"enabled": True})
+
+    async def reader(context):
+        await context.guild_settings("automod", loader)
+
+    pipeline.register("one", reader, order=0)
+    pipeline.register("two", reader, order=1)
+
+    await pipeline.dispatch(make_message())
+
+    loader.assert_awaited_once_with(10)
@@ -0,0 +1,52 @@
+import aiohttp
+import pytest
+
+from metrics import MetricsRegistry, MetricsServer
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("command_seconds", "Command latency.", ("command",), buckets=(0.1, 1.0))
+    latency.observe(0.05, command="ping")
+    latency.observe(0.5, command="ping")
+    latency.observe(3, command="ping")
+
+    text = registry.render()
+
+    assert "# TYPE command_seconds histogram" in text
+    assert 'command_seconds_bucket{command="ping",le="0.1"} 1' in text
+    assert 'command_seconds_bucket{command="ping",le="1"} 2' in text
+    assert 'command_seconds_bucket{command="ping",le="+Inf"} 3' in text
+    assert 'command_seconds_sum{command="ping"} 3.55' in text
+    assert 'command_seconds_count{command="ping"} 3' in text
+
+
+def test_counters_and_callbacks_escape_labels():
+    registry = MetricsRegistry()
+    registry.counter("errors_total", "Errors.", ("reason",)).inc(reason='bad "quote"\n')
+    registry.callback("queue_depth", "Queue depth.", lambda: [({}, 7)])
+    registry.callback("broken", "Raises on collect.", lambda: 1 / 0)
+
+    text = registry.render()
+
+    assert 'errors_total{reason="bad \\"quote\\"\\n"} 1' in text
+    assert "queue_depth 7" in text
+    assert "# TYPE queue_depth gauge" in text
+
+
+@pytest.mark.asyncio
+async def test_server_serves_prometheus_text():
+    registry = MetricsRegistry()
+    registry.gauge("up", "Always one.").set(1)
+    server = MetricsServer(registry, port=0)
+    await server.start()
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{server.port}/metrics") as response:
+                body = await response.text()
+                content_type = response.headers["Content-Type"]
+    finally:
+        await server.stop()
+
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert "up 1" in body.splitlines()
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+from migrations import MIGRATIONS, migrate
+
+
+def _columns(connection, table):
+    return [row[1] for row in connection.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def test_fresh_database_reaches_latest_versions_and_then_only_selects():
+    connection = sqlite3.connect(":memory:")
+
+    applied = migrate(connection)
+    assert applied == {component: len(steps) for component, steps in MIGRATIONS.items()}
+    assert "persona" in _columns(connection, "guild_configs")
+    assert "last_error" in _columns(connection, "reminders")
+
+    statements = []
+    connection.set_trace_callback(statements.append)
+    assert migrate(connection) == {}
+    assert statements == ["SELECT component, version FROM schema_version"]
+
+
+def test_legacy_message_log_drops_timestamp_column():
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE messages (message_id INTEGER PRIMARY KEY, guild_id INTEGER, user_id INTEGER, timestamp TEXT)"
+    )
+    connection.execute("CREATE INDEX idx_messages_timestamp ON messages(timestamp)")
+    connection.execute("INSERT INTO messages VALUES (1, 2, 3, '2024-01-01T00:00:00')")
+
+    migrate(connection)
+
+    assert _columns(connection, "messages") == ["message_id", "guild_id", "user_id"]
+    assert connection.execute("SELECT name FROM sqlite_master WHERE name = 'idx_messages_timestamp'").fetchone() is None
+    assert connection.execute("SELECT * FROM messages").fetchall() == [(1, 2, 3)]
+
+
+def test_legacy_global_balances_are_split_per_guild():
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, balance INTEGER)")
+    connection.execute("INSERT INTO users VALUES (7, 450)")
+    connection.execute("CREATE TABLE messages (message_id INTEGER PRIMARY KEY, guild_id INTEGER, user_id INTEGER)")
+    connection.executemany("INSERT INTO messages VALUES (?, ?, 7)", [(1, 100), (2, 200)])
+
+    migrate(connection)
+
+    assert connection.execute("SELECT guild_id, user_id, balance FROM users ORDER BY guild_id").fetchall() == [
+        (100, 7, 450),
+        (200, 7, 450),
+    ]
+
+
+def test_only_pending_steps_run_and_failures_raise():
+    connection = sqlite3.connect(":memory:")
+    calls = []
+    registry = {"demo": [lambda conn: calls.append(1)]}
+    migrate(connection, registry)
+
+    registry["demo"].append(lambda conn: calls.append(2))
+    assert migrate(connection, registry) == {"demo": 2}
+    assert calls == [1, 2]
+
+    with pytest.raises(RuntimeError, match="newer than this build"):
+        migrate(connection, {"demo": [lambda conn: None]})
@@ -0,0 +1,85 @@
+import logging
+
+import aiosqlite
+import pytest
+
+from query_stats import InstrumentedConnection, QueryRecorder, format_top_queries, normalize_sql
+from storage import Storage
+
+
+def test_normalize_sql_groups_equivalent_statements():
+    assert normalize_sql("SELECT *\n  FROM farms WHERE user_id = 42 AND crop = 'wheat'") == (
+        "SELECT * FROM farms WHERE user_id = ? AND crop = ?"
+    )
+    assert normalize_sql("SELECT 1 FROM t1 WHERE id IN (?, ?, ?)") == "SELECT ? FROM t1 WHERE id IN (?)"
+
+
+def test_recorder_folds_statements_past_the_cap():
+    recorder = QueryRecorder(max_statements=2)
+    for sql in ("SELECT a FROM x", "SELECT b FROM x", "SELECT c FROM x", "SELECT d FROM x"):
+        recorder.record(sql, 0.01)
+
+    assert list(recorder.statements) == ["SELECT a FROM x", "SELECT b FROM x", "(other statements)"]
+    assert recorder.statements["(other statements)"].calls == 2
+
+
+@pytest.mark.asyncio
+async def test_instrumented_connection_times_statements_and_fetches():
+    recorder = QueryRecorder(slow_ms=0)
+    async with aiosqlite.connect(":memory:") as raw:
+        db = InstrumentedConnection(raw, recorder)
+        await db.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, balance INTEGER)")
+        await db.executemany("INSERT INTO users VALUES (?, ?)", [(1, 10), (2, 30), (3, 20)])
+        async with db.cursor() as cursor:
+            await cursor.execute("SELECT user_id FROM users ORDER BY balance DESC LIMIT 2")
+            rows = await cursor.fetchall()
+        async with db.execute("SELECT balance FROM users WHERE user_id = ?", (2,)) as cursor:
+            row = await cursor.fetchone()
+        with pytest.raises(Exception):
+            await db.execute("SELECT missing FROM users")
+
+    assert rows == [(2,), (3,)]
+    assert row == (30,)
+    leaderboard = recorder.statements["SELECT user_id FROM users ORDER BY balance DESC LIMIT ?"]
+    assert (leaderboard.calls, leaderboard.rows) == (1, 2)
+    assert recorder.statements["INSERT INTO users VALUES (?, ?)"].calls == 1
+    assert recorder.statements["SELECT missing FROM users"].errors == 1
+    assert recorder.top(1, "calls")[0][1]["calls"] == 1
+    assert "statement" in format_top_queries(recorder.top())
+
+
+@pytest.mark.asyncio
+async def test_slow_queries_are_logged_with_their_plan(caplog):
+    recorder = QueryRecorder(slow_ms=1)
+    recorder.slow_seconds = 1e-9
+    async with aiosqlite.connect(":memory:") as raw:
+        db = InstrumentedConnection(raw, recorder)
+        await db.execute("CREATE TABLE farms (guild_id INTEGER, user_id INTEGER, crop TEXT)")
+        with caplog.at_level(logging.WARNING, logger="query_stats"):
+            await db.execute("SELECT * FROM farms WHERE user_id = ?", (5,))
+
+    assert "SCAN farms" in recorder.plans["SELECT * FROM farms WHERE user_id = ?"]
+    assert any("Slow query" in record.getMessage() and "SCAN farms" in record.getMessage() for record in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_storage_records_reads_units_and_commits(tmp_path):
+    recorder = QueryRecorder(slow_ms=0)
+    storage = Storage(str(tmp_path / "stats.db"), readers=1, commit_window_ms=0, recorder=recorder)
+    db = await storage.open()
+    try:
+        await db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+
+        def add_item(connection, item_id):
+            connection.execute("INSERT INTO items (id) VALUES (?)", (item_id,))
+
+        await storage.transaction(add_item, 1)
+        async with storage.read() as reader, reader.execute("SELECT COUNT(*) FROM items") as cursor:
+            count = (await cursor.fetchone())[0]
+    finally:
+        await storage.close()
+
+    assert count == 1
+    assert recorder.statements["-- unit of work add_item"].calls == 1
+    assert recorder.statements["COMMIT"].calls >= 1
+    assert recorder.statements["SELECT COUNT(*) FROM items"].rows == 1
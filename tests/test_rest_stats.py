@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+from discord.http import HTTPClient, Route
+
+from rest_stats import CORE_CALLER, RestRecorder, _calling_cog, format_rest_stats
+
+
+def _discord_json(payload, status=200, headers=None):
+    # discord.py only parses bodies whose content type is exactly application/json.
+    return web.Response(
+        body=json.dumps(payload).encode(), status=status, headers={"Content-Type": "application/json", **(headers or {})}
+    )
+
+
+def test_calling_cog_finds_the_innermost_cog_module():
+    namespace = {"__name__": "cogs.fun", "_calling_cog": _calling_cog, "sys": __import__("sys")}
+    exec("def caller():\n    return _calling_cog(sys._getframe())", namespace)
+
+    assert namespace["caller"]() == "fun"
+    assert _calling_cog(None) == CORE_CALLER
+
+
+@pytest.mark.asyncio
+async def test_recorder_counts_routes_and_retried_rate_limits(monkeypatch):
+    hits = []
+
+    async def channel(request):
+        hits.append(request.path)
+        if len(hits) == 1:
+            return _discord_json(
+                {"message": "You are being rate limited.", "retry_after": 0.01, "global": False},
+                status=429,
+                headers={"Via": "1.1 google"},
+            )
+        return _discord_json({"id": "1"})
+
+    async def me(request):
+        return _discord_json({"id": "1", "username": "milo", "discriminator": "0"})
+
+    app = web.Application()
+    app.router.add_get("/channels/{channel_id}", channel)
+    app.router.add_get("/users/@me", me)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    monkeypatch.setattr(Route, "BASE", f"http://127.0.0.1:{port}")
+
+    recorder = RestRecorder()
+    http = HTTPClient(asyncio.get_running_loop(), http_trace=recorder.trace_config())
+    recorder.install(http)
+    try:
+        await http.static_login("token")
+        recorder.reset()
+        await http.request(Route("GET", "/channels/{channel_id}", channel_id=123))
+    finally:
+        await http.close()
+        await runner.cleanup()
+
+    (route, cog, stats), = recorder.top()
+    assert (route, cog) == ("GET /channels/{channel_id}", CORE_CALLER)
+    assert stats["calls"] == 1
+    assert stats["rate_limited"] == 1
+    assert stats["errors"] == 0
+    assert stats["wait_seconds"] >= 0.01
+    assert len(hits) == 2
+    assert "GET /channels/{channel_id}" in format_rest_stats(recorder.top())
@@ -0,0 +1,160 @@
+import asyncio
+import datetime
+from contextlib import asynccontextmanager
+
+import discord
+import pytest
+
+from retention import RetentionPolicy, RetentionPruner, default_policies, enable_incremental_vacuum
+from storage import Storage
+
+
+NOW = datetime.datetime(2024, 6, 1, tzinfo=datetime.timezone.utc)
+
+
+@asynccontextmanager
+async def _open_storage(path=":memory:"):
+    storage = Storage(str(path), readers=0, commit_window_ms=0)
+    db = await storage.open()
+    try:
+        yield storage, db
+    finally:
+        await storage.close()
+
+
+async def _fetch_column(db, query):
+    async with db.execute(query) as cursor:
+        return [row[0] for row in await cursor.fetchall()]
+
+
+@pytest.mark.asyncio
+async def test_pruner_applies_each_table_policy():
+    old_id = discord.utils.time_snowflake(NOW - datetime.timedelta(days=40))
+    new_id = discord.utils.time_snowflake(NOW - datetime.timedelta(days=1))
+
+    async with _open_storage() as (storage, db):
+        await db.execute("CREATE TABLE messages (message_id INTEGER PRIMARY KEY, guild_id INTEGER, user_id INTEGER)")
+        await db.execute("CREATE TABLE chat_usage (guild_id INTEGER, usage_date TEXT, usage_count INTEGER)")
+        await db.execute("CREATE TABLE reminders (id INTEGER PRIMARY KEY, remind_at TEXT, disabled INTEGER)")
+        await db.executemany("INSERT INTO messages VALUES (?, 1, 1)", [(old_id,), (new_id,)])
+        await db.executemany(
+            "INSERT INTO chat_usage VALUES (1, ?, 3)", [("2024-01-01",), ("2024-05-31",)]
+        )
+        await db.executemany(
+            "INSERT INTO reminders (remind_at, disabled) VALUES (?, ?)",
+            [
+                ((NOW - datetime.timedelta(days=60)).isoformat(), 1),
+                ((NOW - datetime.timedelta(days=60)).isoformat(), 0),
+                ((NOW - datetime.timedelta(days=2)).isoformat(), 1),
+            ],
+        )
+        await db.commit()
+
+        pruner = RetentionPruner(storage, default_policies({}))
+        removed = await pruner.run(now=NOW)
+
+        messages = await _fetch_column(db, "SELECT message_id FROM messages")
+        usage = await _fetch_column(db, "SELECT usage_date FROM chat_usage")
+        reminders = await _fetch_column(db, "SELECT id FROM reminders ORDER BY id")
+
+    assert removed == {"messages": 1, "chat_usage": 1, "reminders": 1}
+    assert messages == [new_id]
+    assert usage == ["2024-05-31"]
+    assert reminders == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_pruner_deletes_in_chunks_and_skips_missing_tables():
+    async with _open_storage() as (storage, db):
+        await db.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, age INTEGER)")
+        await db.executemany("INSERT INTO events (age) VALUES (?)", [(100,)] * 25)
+        await db.commit()
+
+        policies = [
+            RetentionPolicy("missing", 1, "age < ?", lambda when: 50),
+            RetentionPolicy("events", 1, "age > ?", lambda when: 50),
+            RetentionPolicy("disabled", 0, "age > ?", lambda when: 50),
+        ]
+        pruner = RetentionPruner(storage, policies, chunk_size=10, pause=0)
+        removed = await pruner.run(now=NOW)
+
+    assert removed == {"missing": 0, "events": 25}
+    assert pruner.chunks == 3
+    assert storage.commits == 3
+    assert [policy.table for policy in pruner.policies] == ["missing", "events"]
+
+
+@pytest.mark.asyncio
+async def test_pruner_stops_when_time_budget_is_spent():
+    ticks = iter(range(100))
+
+    async with _open_storage() as (storage, db):
+        await db.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, age INTEGER)")
+        await db.executemany("INSERT INTO events (age) VALUES (?)", [(100,)] * 50)
+        await db.commit()
+
+        pruner = RetentionPruner(
+            storage,
+            [RetentionPolicy("events", 1, "age > ?", lambda when: 50)],
+            chunk_size=10,
+            pause=0,
+            budget=3,
+            clock=lambda: next(ticks),
+        )
+        removed = await pruner.run(now=NOW)
+
+    assert removed == {"events": 20}
+
+
+@pytest.mark.asyncio
+async def test_new_database_gets_incremental_vacuum_without_a_rebuild(tmp_path):
+    async with _open_storage(tmp_path / "retention.db") as (storage, db):
+        assert await enable_incremental_vacuum(storage) is True
+        assert await _fetch_column(db, "PRAGMA auto_vacuum") == [2]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_commits_writes_that_arrive_meanwhile(tmp_path):
+    async with _open_storage(tmp_path / "retention.db") as (storage, db):
+        await db.execute("CREATE TABLE events (id INTEGER PRIMARY KEY)")
+        await db.commit()
+
+        rebuilt = asyncio.Event()
+
+        async def keep_writing():
+            while not rebuilt.is_set():
+                await db.execute("INSERT INTO events DEFAULT VALUES")
+
+        writer = asyncio.create_task(keep_writing())
+        try:
+            converted = await enable_incremental_vacuum(storage, rebuild=True)
+        finally:
+            rebuilt.set()
+            await writer
+        await storage.commit()
+
+        assert converted is True
+        assert await _fetch_column(db, "PRAGMA auto_vacuum") == [2]
+        assert (await _fetch_column(db, "SELECT COUNT(*) FROM events"))[0] > 0
+
+
+@pytest.mark.asyncio
+async def test_incremental_vacuum_reclaims_free_pages(tmp_path):
+    async with _open_storage(tmp_path / "retention.db") as (storage, db):
+        await db.execute("CREATE TABLE blobs (id INTEGER PRIMARY KEY, data BLOB)")
+        await db.executemany("INSERT INTO blobs (data) VALUES (?)", [(b"x" * 4000,)] * 200)
+        await db.commit()
+
+        assert await enable_incremental_vacuum(storage) is False
+        assert await _fetch_column(db, "PRAGMA auto_vacuum") == [0]
+        assert await enable_incremental_vacuum(storage, rebuild=True) is True
+        assert await enable_incremental_vacuum(storage, rebuild=True) is False
+
+        await db.execute("DELETE FROM blobs")
+        await db.commit()
+        pruner = RetentionPruner(storage, [])
+        freed = await pruner.reclaim_space()
+        remaining = await _fetch_column(db, "PRAGMA freelist_count")
+
+    assert freed > 0
+    assert remaining == [0]
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from sampling_profiler import SamplingProfiler, write_profile
+from storage import Storage
+
+
+def _spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def _block_loop() -> None:
+    await asyncio.sleep(0)
+    _spin(0.3)
+
+
+@pytest.mark.asyncio
+async def test_profiler_attributes_busy_samples_to_the_blocking_function(tmp_path):
+    profiler = SamplingProfiler({threading.get_ident(): "event-loop"}, interval_ms=2)
+    blocker = asyncio.create_task(_block_loop())
+
+    result = await profiler.run(0.2)
+    await blocker
+
+    assert result.samples["event-loop"] > 0
+    (name, own, total), *_ = result.top_functions()
+    assert name.startswith("_spin (test_sampling_profiler.py")
+    assert own <= total
+    assert "event-loop" in result.summary()
+
+    path = write_profile(result, str(tmp_path))
+    first_line = open(path, encoding="utf-8").readline()
+    assert first_line.startswith("event-loop;")
+    assert first_line.rstrip().rsplit(" ", 1)[1].isdigit()
+
+
+@pytest.mark.asyncio
+async def test_storage_reports_its_worker_threads(tmp_path):
+    storage = Storage(str(tmp_path / "bot.db"), readers=2)
+    await storage.open()
+    try:
+        threads = storage.worker_threads()
+    finally:
+        await storage.close()
+
+    assert sorted(threads.values()) == ["sqlite-reader-1", "sqlite-reader-2", "sqlite-writer"]
+    assert threading.get_ident() not in threads
+
+
+@pytest.mark.asyncio
+async def test_idle_storage_threads_are_reported_idle(tmp_path):
+    storage = Storage(str(tmp_path / "bot.db"), readers=2)
+    await storage.open()
+    try:
+        result = await SamplingProfiler(storage.worker_threads(), interval_ms=2).run(0.2)
+    finally:
+        await storage.close()
+
+    assert sorted(result.samples) == ["sqlite-reader-1", "sqlite-reader-2", "sqlite-writer"]
+    for thread, samples in result.samples.items():
+        assert result.idle_samples.get(thread, 0) >= samples * 0.9, thread
+    assert result.busy_samples <= sum(result.samples.values()) * 0.1
@@ -0,0 +1,171 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from query_stats import QueryRecorder
+from storage import Storage, check_aiosqlite_internals, execute_statements
+
+
+@pytest.mark.asyncio
+async def test_readers_see_committed_writes_and_cannot_write(tmp_path):
+    storage = Storage(str(tmp_path / "db" / "main.db"), readers=2)
+    writer = await storage.open()
+    try:
+        await writer.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        await writer.execute("INSERT INTO items (name) VALUES ('apple')")
+        await writer.commit()
+
+        async with storage.read() as db, db.cursor() as cursor:
+            assert db is not writer
+            await cursor.execute("SELECT name FROM items")
+            assert await cursor.fetchall() == [("apple",)]
+
+            with pytest.raises(Exception, match="readonly"):
+                await cursor.execute("INSERT INTO items (name) VALUES ('pear')")
+    finally:
+        await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_read_waits_for_a_free_reader(tmp_path):
+    storage = Storage(str(tmp_path / "main.db"), readers=1)
+    await storage.open()
+
+    async def borrow():
+        async with storage.read() as db:
+            return db
+
+    try:
+        async with storage.read() as first:
+            waiter = asyncio.create_task(borrow())
+            await asyncio.sleep(0)
+            assert not waiter.done()
+        second = await waiter
+        assert second is first
+        assert storage.stats()["read_waits"] == 1
+    finally:
+        await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_in_memory_storage_reads_through_the_writer():
+    storage = Storage(":memory:")
+    writer = await storage.open()
+    try:
+        async with storage.read() as db:
+            assert db is writer
+        assert storage.write() is writer
+    finally:
+        await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_commits_within_the_window_share_one_transaction(tmp_path):
+    storage = Storage(str(tmp_path / "main.db"), readers=1, commit_window_ms=50)
+    writer = await storage.open()
+    try:
+        await writer.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+        await storage.commit()
+
+        async def insert(item_id):
+            await writer.execute("INSERT INTO items (id) VALUES (?)", (item_id,))
+            await storage.commit()
+
+        await asyncio.gather(*(insert(item_id) for item_id in range(10)))
+
+        async with storage.read() as db, db.execute("SELECT COUNT(*) FROM items") as cursor:
+            assert await cursor.fetchone() == (10,)
+        stats = storage.stats()
+        assert stats["commit_requests"] == 11
+        assert stats["commits"] == 2
+        assert stats["max_commit_group"] == 10
+    finally:
+        await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_is_raised_to_every_waiter():
+    storage = Storage(":memory:", commit_window_ms=0)
+    writer = await storage.open()
+
+    async def broken_commit():
+        raise RuntimeError("disk I/O error")
+
+    writer.commit = broken_commit
+    try:
+        results = await asyncio.gather(storage.commit(), storage.commit(), return_exceptions=True)
+        assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+        assert storage.commits == 0
+    finally:
+        del writer.commit
+        await storage.close()
+
+
+def _insert_pair(connection, first, second):
+    connection.execute("INSERT INTO items (id) VALUES (?)", (first,))
+    connection.execute("INSERT INTO items (id) VALUES (?)", (second,))
+    return connection.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+
+@pytest.mark.asyncio
+async def test_transaction_runs_function_and_commits(tmp_path):
+    storage = Storage(str(tmp_path / "main.db"), readers=1, commit_window_ms=0)
+    writer = await storage.open()
+    try:
+        await writer.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+        await storage.commit()
+
+        assert await storage.transaction(_insert_pair, 1, 2) == 2
+        await storage.transaction(execute_statements, [("DELETE FROM items WHERE id = ?", (1,))])
+
+        async with storage.read() as db, db.execute("SELECT id FROM items") as cursor:
+            assert await cursor.fetchall() == [(2,)]
+        assert storage.stats()["units"] == 2
+    finally:
+        await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_transaction_only_rolls_back_its_own_statements():
+    storage = Storage(":memory:", commit_window_ms=0)
+    writer = await storage.open()
+    try:
+        await writer.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+        await writer.execute("INSERT INTO items (id) VALUES (1)")
+
+        with pytest.raises(Exception, match="UNIQUE"):
+            await storage.transaction(_insert_pair, 2, 1)
+        await storage.commit()
+
+        async with writer.execute("SELECT id FROM items") as cursor:
+            assert await cursor.fetchall() == [(1,)]
+        assert storage.failed_units == 1
+
+        with pytest.raises(Exception, match="UNIQUE"):
+            await storage.transaction(_insert_pair, 3, 3)
+        assert not writer.in_transaction
+    finally:
+        await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_write_connection_is_timed(tmp_path):
+    recorder = QueryRecorder()
+    storage = Storage(str(tmp_path / "main.db"), readers=1, commit_window_ms=0, recorder=recorder)
+    await storage.open()
+    try:
+        await storage.write().execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+        await storage.write().execute("INSERT INTO items DEFAULT VALUES")
+        await storage.commit()
+    finally:
+        await storage.close()
+
+    assert "INSERT INTO items DEFAULT VALUES" in recorder.statements
+
+
+def test_missing_aiosqlite_internals_are_reported_clearly():
+    connection = SimpleNamespace(_execute=None, _conn=None)
+
+    with pytest.raises(RuntimeError, match="missing _thread"):
+        check_aiosqlite_internals(connection)
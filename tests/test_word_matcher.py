@@ -0,0 +1,60 @@
+import random
+
+from automod_benchmark import benchmark, generate_messages, generate_words, legacy_search
+from word_matcher import WordMatcher, compile_words
+
+
+def test_matches_whole_words_only():
+    matcher = WordMatcher(["heck", "dang it", "c++"])
+
+    assert matcher.search("oh heck!") == "heck"
+    assert matcher.search("play checkers or heckle") is None
+    assert matcher.search("well, dang it.") == "dang it"
+    assert matcher.search("i write c++ daily") == "c++"
+    assert matcher.search("heck_yes") is None
+    assert not WordMatcher([]) and WordMatcher([]).search("heck") is None
+
+
+def test_overlapping_words_respect_boundaries():
+    matcher = WordMatcher(["she", "he", "hers", "ushers"])
+
+    assert matcher.search("ushers") == "ushers"
+    assert matcher.search("hers") == "hers"
+    assert matcher.search("ushe he") == "he"
+    assert matcher.search("usher") is None
+
+
+def test_agrees_with_per_word_regex():
+    rng = random.Random(7)
+    alphabet = "ab_ -!é1"
+    for _ in range(2000):
+        words = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(0, 5))]
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+
+        expected = {word for word in words if word and legacy_search([word], text)}
+        found = WordMatcher(words).search(text)
+
+        assert (found is None) == (not expected), (words, text)
+        assert found is None or found in expected
+
+
+def test_compiled_lists_are_shared():
+    assert compile_words(("darn", "heck")) is compile_words(("darn", "heck"))
+
+
+def test_generated_traffic_hits_the_expected_messages():
+    words = generate_words(500)
+    texts = generate_messages(words, 200, 500, hit_rate=0.2)
+    matcher = WordMatcher(words)
+
+    found = [matcher.search(text) is not None for text in texts[:20]]
+
+    assert found == [legacy_search(words, text) is not None for text in texts[:20]]
+    assert any(found)
+
+
+def test_benchmark_beats_per_word_regex():
+    summary = benchmark(words=1000, messages=50, length=1000, legacy_messages=3)
+
+    assert summary["hits"] > 0
+    assert summary["speedup"] > 10
@@ -0,0 +1,84 @@
+import functools
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+COMPILED_LISTS_CACHE_SIZE = 256
+
+
+def _is_word_char(char: str) -> bool:
+    # Same definition as ``\w`` in a str pattern.
+    return char.isalnum() or char == "_"
+
+
+class WordMatcher:
+    """Aho-Corasick automaton over a list of blocked words, built once and shared.
+
+    ``search`` scans the text a single time however many words there are and
+    reports a word only where ``(?<!\\w)word(?!\\w)`` would match, so
+    ``heck`` matches in ``oh heck!`` but not in ``checkers``. Words and text
+    are expected to be lower-cased already.
+    """
+
+    __slots__ = ("words", "_goto", "_fail", "_outputs")
+
+    def __init__(self, words: Iterable[str]):
+        self.words: Tuple[str, ...] = tuple(dict.fromkeys(word for word in words if word))
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[str, ...]] = [()]
+        for word in self.words:
+            state = 0
+            for char in word:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = goto[state][char] = len(goto)
+                    goto.append({})
+                    outputs.append(())
+                state = next_state
+            outputs[state] = (word,)
+
+        # Breadth-first, so every failure target is complete before it is inherited from.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                target = fail[state]
+                while target and char not in goto[target]:
+                    target = fail[target]
+                fail[next_state] = goto[target].get(char, 0) if state else 0
+                outputs[next_state] += outputs[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def __bool__(self) -> bool:
+        return bool(self.words)
+
+    def search(self, text: str) -> Optional[str]:
+        """The first blocked word (by end position) found as a whole word in ``text``, or None."""
+        if not self.words:
+            return None
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        last = len(text) - 1
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            matches = outputs[state]
+            if not matches or (index < last and _is_word_char(text[index + 1])):
+                continue
+            for word in matches:
+                start = index - len(word) + 1
+                if start == 0 or not _is_word_char(text[start - 1]):
+                    return word
+        return None
+
+
+@functools.lru_cache(maxsize=COMPILED_LISTS_CACHE_SIZE)
+def compile_words(words: Tuple[str, ...]) -> WordMatcher:
+    """Shared matcher for ``words``; guilds with the same list, and reloads of an unchanged list, reuse it."""
+    return WordMatcher(words)